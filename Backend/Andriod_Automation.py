@@ -1,5 +1,10 @@
 # ======================== Android_Automation.py ========================
 
+from Backend.Logger import GetLogger
+from Backend.ResponseTemplates import DescribeTasks, DefaultLocale
+
+log = GetLogger("android")
+
 SUPPORTED_APPS = {
     "whatsapp": "com.whatsapp",
     "telegram": "org.telegram.messenger",
@@ -37,7 +42,7 @@ def TranslateAndroidCommand(commands):
         processed_cmd = process_android_command(cmd)
         if processed_cmd:
             processed_commands.append(processed_cmd)
-            print(f"[ANDROID] Processed command: {processed_cmd}")
+            log.debug("Processed command: %s", processed_cmd)
 
     return processed_commands
 
@@ -248,7 +253,7 @@ def handle_legacy_command(cmd):
         if app in SUPPORTED_APPS:
             return f"app::open::{app}"
         else:
-            print(f"[ANDROID OPEN] App '{app}' not supported.")
+            log.warning("App '%s' not supported.", app)
             return None
 
     elif cmd.startswith("play "):
@@ -265,7 +270,7 @@ def handle_legacy_command(cmd):
         return None
 
     else:
-        print(f"[ANDROID] Command not handled: {cmd}")
+        log.debug("Command not handled: %s", cmd)
         return None
 
 def extract_app_name_from_command(cmd):
@@ -291,42 +296,9 @@ def extract_percentage_from_command(cmd):
     matches = re.findall(percentage_pattern, cmd)
     return int(matches[0]) if matches else None
 
-def human_friendly_responses(device_tasks: dict) -> str:
+def human_friendly_responses(device_tasks: dict, locale: str = DefaultLocale) -> str:
     """Generate human-friendly responses for device tasks"""
-    responses = []
-    
-    if "android" in device_tasks and device_tasks["android"]:
-        android_cmds = device_tasks['android']
-        cmd_descriptions = []
-        
-        for cmd in android_cmds:
-            if cmd.startswith("app::open::"):
-                app = cmd.split("::")[-1]
-                cmd_descriptions.append(f"open {app}")
-            elif cmd.startswith("media::play_song::"):
-                song = cmd.split("::")[-1]
-                cmd_descriptions.append(f"play {song}")
-            elif cmd.startswith("device::brightness::"):
-                level = cmd.split("::")[-1]
-                cmd_descriptions.append(f"set brightness to {level}")
-            elif cmd.startswith("device::volume::"):
-                parts = cmd.split("::")
-                direction = parts[2]
-                level = parts[3]
-                cmd_descriptions.append(f"turn volume {direction} to {level}")
-            else:
-                cmd_descriptions.append(cmd.replace("::", " "))
-        
-        responses.append(f"On your phone, I'll: {', '.join(cmd_descriptions)}.")
-
-    if "pc" in device_tasks and device_tasks["pc"]:
-        pc_cmds = ', '.join([cmd for cmd in device_tasks['pc']])
-        responses.append(f"On your computer: {pc_cmds}.")
-
-    if not responses:
-        responses.append("No valid tasks were found for your devices.")
-
-    return " ".join(responses)
+    return DescribeTasks(device_tasks, locale)
 
 # ==================== TESTING ====================
 
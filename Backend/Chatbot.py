@@ -1,8 +1,13 @@
-import cohere
-from groq import Groq
-from json import load, dump
+from json import load, dump, JSONDecodeError
 import datetime
+import threading
 from dotenv import dotenv_values
+from Backend.Logger import GetLogger
+from Backend.LLMGateway import CompleteSync
+from Backend.ConcurrencyLimiter import Overloaded
+from Backend.MemoryHandler import memory_prompt
+
+log = GetLogger("chatbot")
 
 
 env_vars = dotenv_values(".env")
@@ -10,10 +15,6 @@ env_vars = dotenv_values(".env")
 
 Username = env_vars.get("Username")
 Assistantname = env_vars.get("Assistantname")
-GroqAPIKey = env_vars.get("GroqAPIKey")
-
-client = Groq(api_key=GroqAPIKey)
-
 messages = []
 
 System = f"""Hello, I am {Username}, You are a very accurate and advanced AI chatbot named {Assistantname} which has real-time up-to-date information from the internet.
@@ -59,45 +60,55 @@ def AnswerMofifier(Answer):
     return modified_answer
 
 
-def ChatBot(Query):
-    """Send the user's query to the chatbot and return the AI's response."""
+# Serializes ChatLog.json reads/writes so concurrent requests (e.g. /ask_batch) don't drop turns
+ChatLogLock = threading.Lock()
+
+
+def LoadChatLog():
+    try:
+        with open(r"Data\ChatLog.json", "r") as f:
+            return load(f)
+    except (FileNotFoundError, JSONDecodeError):
+        return []
+
+
+def ChatBot(Query, owner=None):
+    """Send the user's query to the chatbot and return the AI's response (personalized for owner)."""
     try:
         # Try reading chat history
-        try:
-            with open(r"Data\ChatLog.json", "r") as f:
-                messages = load(f)
-        except (FileNotFoundError, json.decoder.JSONDecodeError):
-            messages = []
+        with ChatLogLock:
+            messages = LoadChatLog()
 
         messages.append({"role": 'user', "content": f"{Query}"})
 
-        # Send request to Groq
-        completion = client.chat.completions.create(
-            model="llama3-70b-8192",
-            messages=SystemChatBot + [{"role": "system", "content": RealtimeInformation()}] + messages,
-            max_tokens=1024,
-            temperature=0.7,
-            top_p=1,
-            stream=True,
-            stop=None
-        )
+        # Top-k relevant long-term memories, bounded to MemoryPromptTokens
+        memories = memory_prompt(owner, Query)
+        context = [{"role": "system", "content": memories}] if memories else []
 
-        Answer = ""
-        for chunk in completion:
-            if chunk.choices[0].delta.content:
-                Answer += chunk.choices[0].delta.content
+        # Send request to Groq (through the gateway, which may fail over to Cohere)
+        Answer = CompleteSync(
+            SystemChatBot + [{"role": "system", "content": RealtimeInformation()}] + context + messages,
+            max_tokens=1024
+        )
 
         Answer = Answer.replace("</ s>", "")
-        messages.append({"role": "assistant", "content": Answer})
 
-        # Save conversation history
-        with open(r"Data\ChatLog.json", "w") as f:
-            dump(messages, f, indent=4)
+        # Save conversation history (re-read so turns written meanwhile are kept)
+        with ChatLogLock:
+            messages = LoadChatLog()
+            messages.append({"role": 'user', "content": f"{Query}"})
+            messages.append({"role": "assistant", "content": Answer})
+            with open(r"Data\ChatLog.json", "w") as f:
+                dump(messages, f, indent=4)
 
         return AnswerMofifier(Answer=Answer)
 
+    except Overloaded as e:
+        log.warning("ChatBot shed: %s", e)
+        return "I'm a little busy right now. Please ask me again in a moment."
+
     except Exception as e:
-        print(f"Error: {e}")
+        log.error("ChatBot failed: %s", e)
         return "An error occurred. Please try again later."
 
     
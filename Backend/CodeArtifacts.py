@@ -0,0 +1,84 @@
+# ======================== CodeArtifacts.py ========================
+# Store for generated programs. Each artifact is addressed by a hash of its code (so it can be
+# cached forever by clients) and indexed by the normalized description that produced it, so a
+# repeated "write a program to ..." request is answered without calling the LLM again.
+# Code is kept zlib-compressed in SQLite; devices receive code::<description>::artifact::<id>
+# and download the program from /artifacts/<id>.
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from dotenv import dotenv_values
+
+env_vars = dotenv_values(".env")
+CodeArtifactsPath = env_vars.get("CodeArtifactsPath") or os.getenv("CODE_ARTIFACTS_PATH") or "Data/artifacts.sqlite3"
+
+DESCRIPTION_FILLERS = {"a", "an", "the", "to", "for", "in", "python", "program", "code", "script", "write", "please"}
+
+_lock = threading.Lock()
+_conn = None
+
+def NormalizeDescription(description):
+    """
+    Index key for a code request: lowercase words without fillers, in their original order.
+    A description made only of fillers ("write a python program") keeps all its words, so such
+    requests do not all share one empty key.
+    """
+    words = re.sub(r"[^a-z0-9 ]", " ", description.lower()).split()
+    return " ".join(word for word in words if word not in DESCRIPTION_FILLERS) or " ".join(words)
+
+def _db():
+    global _conn
+    if _conn is None:
+        os.makedirs(os.path.dirname(CodeArtifactsPath) or ".", exist_ok=True)
+        _conn = sqlite3.connect(CodeArtifactsPath, timeout=10, check_same_thread=False, isolation_level=None)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute("""CREATE TABLE IF NOT EXISTS artifacts (
+            id TEXT PRIMARY KEY, description TEXT NOT NULL, language TEXT NOT NULL,
+            code BLOB NOT NULL, size INTEGER NOT NULL, created_at REAL NOT NULL)""")
+        _conn.execute("""CREATE TABLE IF NOT EXISTS descriptions (
+            key TEXT PRIMARY KEY, artifact_id TEXT NOT NULL REFERENCES artifacts(id),
+            hits INTEGER NOT NULL DEFAULT 0, last_used REAL NOT NULL)""")
+    return _conn
+
+def _artifact(row, with_code=True):
+    artifact_id, description, language, code, size, created_at = row
+    artifact = {"id": artifact_id, "description": description, "language": language,
+                "size": size, "created_at": created_at}
+    if with_code:
+        artifact["code"] = zlib.decompress(code).decode("utf-8")
+    return artifact
+
+def StoreArtifact(description, code, language="python"):
+    """Save generated code for a description; returns the artifact (without code)"""
+    artifact_id = hashlib.sha256(code.encode("utf-8")).hexdigest()[:16]
+    now = time.time()
+    with _lock:
+        db = _db()
+        db.execute("INSERT OR IGNORE INTO artifacts VALUES (?, ?, ?, ?, ?, ?)", (
+            artifact_id, description, language, zlib.compress(code.encode("utf-8"), 9), len(code), now
+        ))
+        db.execute("INSERT OR REPLACE INTO descriptions (key, artifact_id, hits, last_used) VALUES (?, ?, 0, ?)",
+                   (NormalizeDescription(description), artifact_id, now))
+        row = db.execute("SELECT * FROM artifacts WHERE id = ?", (artifact_id,)).fetchone()
+    return _artifact(row, with_code=False)
+
+def FindArtifact(description):
+    """Previously generated artifact (without code) for an equivalent description, or None"""
+    key = NormalizeDescription(description)
+    with _lock:
+        db = _db()
+        row = db.execute("SELECT a.* FROM descriptions d JOIN artifacts a ON a.id = d.artifact_id WHERE d.key = ?",
+                         (key,)).fetchone()
+        if row:
+            db.execute("UPDATE descriptions SET hits = hits + 1, last_used = ? WHERE key = ?", (time.time(), key))
+    return _artifact(row, with_code=False) if row else None
+
+def GetArtifact(artifact_id, with_code=True):
+    with _lock:
+        row = _db().execute("SELECT * FROM artifacts WHERE id = ?", (artifact_id,)).fetchone()
+    return _artifact(row, with_code) if row else None
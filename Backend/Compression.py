@@ -0,0 +1,121 @@
+# ======================== Compression.py ========================
+# Response compression (Brotli or gzip, negotiated via Accept-Encoding) and ETag revalidation.
+# Bodies carrying a strong ETag (app lists, device records, anything whose ETag is a content
+# version) are compressed once per (ETag, encoding) and served from a small LRU afterwards.
+
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from dotenv import dotenv_values
+from Backend.Metrics import RecordCache
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; gzip is always available
+    brotli = None
+
+env_vars = dotenv_values(".env")
+CompressMinBytes = int(env_vars.get("CompressMinBytes", 512))
+CompressCacheEntries = int(env_vars.get("CompressCacheEntries", 256))
+GzipLevel = int(env_vars.get("GzipLevel", 6))
+BrotliQuality = int(env_vars.get("BrotliQuality", 5))
+
+COMPRESSIBLE_TYPES = ("application/json", "application/vnd.nexon", "application/msgpack", "text/")
+ENCODING_SUFFIX = {"br": "-br", "gzip": "-gz"}
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+def ChooseEncoding(accept_encoding):
+    """Best supported encoding the client accepts (q > 0), preferring Brotli"""
+    accepted = {}
+    for part in (accept_encoding or "").lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            accepted[name] = q
+    if brotli and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", accepted.get("*", 0)) > 0:
+        return "gzip"
+    return None
+
+def CompressBody(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=BrotliQuality)
+    return gzip.compress(body, compresslevel=GzipLevel)
+
+def _cached_compress(etag, mimetype, body, encoding):
+    key = (etag, mimetype, encoding)
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            RecordCache("compressed_body", True)
+            return _cache[key]
+    RecordCache("compressed_body", False)
+    compressed = CompressBody(body, encoding)
+    with _cache_lock:
+        _cache[key] = compressed
+        while len(_cache) > CompressCacheEntries:
+            _cache.popitem(last=False)
+    return compressed
+
+def ClientETags(if_none_match):
+    """Tags from If-None-Match with W/ prefixes and our encoding suffixes removed"""
+    tags = set()
+    for tag in (if_none_match or "").split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        tag = tag.strip('"')
+        for suffix in ENCODING_SUFFIX.values():
+            if tag.endswith(suffix):
+                tag = tag[:-len(suffix)]
+        if tag:
+            tags.add(tag)
+    return tags
+
+def Finalize(request, response, etag_endpoints=None):
+    """
+    after_request hook: give GET responses from etag_endpoints an ETag, answer matching
+    If-None-Match with 304, then compress what is worth compressing.
+    """
+    if response.direct_passthrough or response.is_streamed:
+        return response
+    etag = response.get_etag()[0]
+    if request.method == "GET" and response.status_code == 200:
+        if not etag and etag_endpoints is not None and request.endpoint in etag_endpoints:
+            etag = hashlib.sha256(response.get_data()).hexdigest()[:16]
+            response.set_etag(etag)
+        if etag:
+            tags = ClientETags(request.headers.get("If-None-Match"))
+            if etag in tags or "*" in tags:
+                response.status_code = 304
+                response.set_data(b"")
+                return response
+
+    if response.status_code < 200 or response.status_code in (204, 304) or "Content-Encoding" in response.headers:
+        return response
+    if not (response.mimetype or "").startswith(COMPRESSIBLE_TYPES):
+        return response
+    body = response.get_data()
+    if len(body) < CompressMinBytes:
+        return response
+    encoding = ChooseEncoding(request.headers.get("Accept-Encoding"))
+    response.vary.add("Accept-Encoding")
+    if not encoding:
+        return response
+    compressed = _cached_compress(etag, response.mimetype, body, encoding) if etag else CompressBody(body, encoding)
+    if len(compressed) >= len(body):
+        return response
+    response.set_data(compressed)
+    response.headers["Content-Encoding"] = encoding
+    if etag:
+        response.set_etag(etag + ENCODING_SUFFIX[encoding])
+    return response
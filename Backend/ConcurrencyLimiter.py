@@ -0,0 +1,175 @@
+# ======================== ConcurrencyLimiter.py ========================
+# AIMD concurrency limits for upstream LLM providers, shared by all gunicorn workers.
+# Each provider's global limit grows by roughly one slot per round trip of healthy calls and
+# shrinks multiplicatively on rate limits or timeouts. Workers meet in a small state file
+# (flock-protected) and each enforces limit / live_workers locally. Device-command work may
+# use the whole limit, chat only LLMChatShare of it, and chat is shed as soon as its queue
+# is long instead of waiting into a timeout.
+
+import asyncio
+import heapq
+import itertools
+import json
+import os
+import time
+from dotenv import dotenv_values
+from Backend.Metrics import Counter
+from Backend.Logger import GetLogger
+
+try:
+    import fcntl
+except ImportError:  # Windows dev boxes: limits stay per process
+    fcntl = None
+
+env_vars = dotenv_values(".env")
+LLMLimitFile = env_vars.get("LLMLimitFile") or os.getenv("LLM_LIMIT_FILE") or "Data/llm_limits.json"
+LLMInitialLimit = float(env_vars.get("LLMInitialLimit", 8))
+LLMMinLimit = float(env_vars.get("LLMMinLimit", 1))
+LLMMaxLimit = float(env_vars.get("LLMMaxLimit", 64))
+LLMBackoff = float(env_vars.get("LLMBackoff", 0.7))
+LLMChatShare = float(env_vars.get("LLMChatShare", 0.75))  # rest of the limit is kept for device commands
+LLMMaxChatQueue = int(env_vars.get("LLMMaxChatQueue", 8))
+LLMLimitSyncInterval = float(env_vars.get("LLMLimitSyncInterval", 1.0))
+WORKER_STALE = 15.0
+
+DEVICE = 0
+CHAT = 1
+PRIORITY_NAMES = {DEVICE: "device", CHAT: "chat"}
+
+LoadShed = Counter("nexon_llm_shed_total", "LLM calls rejected by the concurrency limiter", ["provider", "priority"])
+
+log = GetLogger("limiter")
+
+class Overloaded(Exception):
+    """The provider is saturated and this call was shed"""
+
+class AdaptiveLimiter:
+    """Per-process view of one provider's shared AIMD limit. Only used from the gateway loop."""
+
+    def __init__(self, provider):
+        self.provider = provider
+        self.global_limit = LLMInitialLimit
+        self.workers = 1
+        self.inflight = 0
+        self._waiters = []  # heap of (priority, seq, future)
+        self._seq = itertools.count()
+        self._successes = 0
+        self._throttled = False
+        self._synced = 0.0
+
+    @property
+    def limit(self):
+        return max(LLMMinLimit, self.global_limit / self.workers)
+
+    def _capacity(self, priority):
+        return self.limit if priority == DEVICE else max(1.0, self.limit * LLMChatShare)
+
+    def _queued(self, priority):
+        return sum(1 for p, _, future in self._waiters if p == priority and not future.done())
+
+    def try_acquire(self, priority):
+        """Take a slot without waiting (used for hedged attempts)"""
+        self._maybe_sync()
+        if self.inflight < self._capacity(priority) and not any(
+                p <= priority and not f.done() for p, _, f in self._waiters):
+            self.inflight += 1
+            return True
+        return False
+
+    async def acquire(self, priority):
+        if self.try_acquire(priority):
+            return
+        if priority != DEVICE and self._queued(priority) >= LLMMaxChatQueue:
+            LoadShed.inc(provider=self.provider, priority=PRIORITY_NAMES[priority])
+            raise Overloaded(f"{self.provider} saturated ({self.inflight} in flight, limit {self.limit:.1f})")
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()  # the slot was handed over just as we were cancelled
+            else:
+                future.cancel()
+            raise
+
+    def release(self, latency=None, throttled=False):
+        self.inflight -= 1
+        if throttled:
+            self._throttled = True
+        elif latency is not None:
+            self._successes += 1
+        self._wake()
+
+    def penalize(self):
+        """Count a call that timed out after its slot was released (e.g. cancelled at the deadline)"""
+        self._throttled = True
+
+    def _wake(self):
+        while self._waiters:
+            priority, _, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            if self.inflight >= self._capacity(priority):
+                break
+            heapq.heappop(self._waiters)
+            self.inflight += 1
+            future.set_result(None)
+
+    # ==================== CROSS-WORKER STATE ====================
+
+    def _adjust(self, limit):
+        if self._throttled:
+            limit = max(LLMMinLimit, limit * LLMBackoff)
+        elif self._successes:
+            limit = min(LLMMaxLimit, limit + self._successes / max(limit, 1.0))
+        self._successes = 0
+        self._throttled = False
+        return limit
+
+    def _maybe_sync(self):
+        now = time.monotonic()
+        if now - self._synced < LLMLimitSyncInterval:
+            return
+        self._synced = now
+        before = self.limit
+        if fcntl is None:
+            self.global_limit = self._adjust(self.global_limit)
+        else:
+            try:
+                self._sync_file()
+            except (OSError, ValueError) as e:
+                log.warning("Limit sync failed: %s", e)
+                self.global_limit = self._adjust(self.global_limit)
+        if abs(self.limit - before) >= 1:
+            log.info("%s concurrency limit %.1f → %.1f (%d workers)", self.provider, before, self.limit, self.workers)
+        self._wake()
+
+    def _sync_file(self):
+        os.makedirs(os.path.dirname(LLMLimitFile) or ".", exist_ok=True)
+        with open(LLMLimitFile, "a+") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                raw = f.read()
+                state = json.loads(raw) if raw.strip() else {}
+                now = time.time()
+                workers = {pid: seen for pid, seen in state.get("workers", {}).items() if now - seen < WORKER_STALE}
+                workers[str(os.getpid())] = now
+                limits = state.get("limits", {})
+                limits[self.provider] = self._adjust(limits.get(self.provider, LLMInitialLimit))
+                f.seek(0)
+                f.truncate()
+                json.dump({"limits": limits, "workers": workers}, f)
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+        self.global_limit = limits[self.provider]
+        self.workers = len(workers)
+
+def IsThrottle(error):
+    """Rate limit or timeout: the signals that should shrink the limit"""
+    if isinstance(error, asyncio.TimeoutError):
+        return True
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    return status in (429, 503)
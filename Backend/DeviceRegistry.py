@@ -0,0 +1,233 @@
+# ======================== DeviceRegistry.py ========================
+# One indexed store for devices: addresses, interfaces, capabilities and installed-app catalogs.
+# Catalogs are stored as zlib-compressed JSON blobs in SQLite and kept in an in-process
+# read-through cache. A reader only re-decodes a catalog when its version hash changes, so
+# catalogs written by another gunicorn worker are picked up without re-parsing on every request.
+# Phones can update a catalog with add/remove deltas against the version they last uploaded.
+# The legacy device_apps/<id>.json files and LocalDeviceManager/device_list.json are imported
+# the first time the store is opened.
+
+import glob
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from difflib import get_close_matches
+from dotenv import dotenv_values
+from Backend.Logger import GetLogger
+
+env_vars = dotenv_values(".env")
+DeviceRegistryPath = env_vars.get("DeviceRegistryPath") or os.getenv("DEVICE_REGISTRY_PATH") or "Data/devices.sqlite3"
+LegacyAppsDir = "device_apps"
+LegacyDeviceList = "LocalDeviceManager/device_list.json"
+
+log = GetLogger("devices")
+
+_lock = threading.Lock()
+_conn = None
+_catalogs = {}  # device_id -> CachedCatalog
+
+class VersionConflict(Exception):
+    """A delta was based on a catalog version that is no longer current"""
+
+    def __init__(self, current):
+        super().__init__(f"catalog is at version {current}")
+        self.current = current
+
+class CachedCatalog:
+    """Decoded app catalog plus the lowercase index used for fuzzy matching"""
+
+    def __init__(self, version, apps):
+        self.version = version
+        self.apps = apps
+        self.by_lower = {name.lower(): name for name in apps}
+
+    def apply(self, version, add, remove):
+        """Update the catalog and its index in place instead of rebuilding them"""
+        for name in remove:
+            if self.apps.pop(name, None) is not None and self.by_lower.get(name.lower()) == name:
+                del self.by_lower[name.lower()]
+        for name, package in add.items():
+            self.apps[name] = package
+            self.by_lower[name.lower()] = name
+        self.version = version
+
+def _db():
+    global _conn
+    if _conn is None:
+        os.makedirs(os.path.dirname(DeviceRegistryPath) or ".", exist_ok=True)
+        _conn = sqlite3.connect(DeviceRegistryPath, timeout=10, check_same_thread=False, isolation_level=None)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute("""CREATE TABLE IF NOT EXISTS devices (
+            device_id TEXT PRIMARY KEY, name TEXT, address TEXT, type TEXT, interface TEXT,
+            capabilities TEXT NOT NULL DEFAULT '[]', updated_at REAL NOT NULL)""")
+        _conn.execute("CREATE INDEX IF NOT EXISTS devices_name ON devices (name)")
+        _conn.execute("""CREATE TABLE IF NOT EXISTS app_catalogs (
+            device_id TEXT PRIMARY KEY, version TEXT NOT NULL, apps BLOB NOT NULL, updated_at REAL NOT NULL)""")
+        _conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        _migrate_legacy(_conn)
+    return _conn
+
+# ==================== ENCODING ====================
+
+def CatalogVersion(apps):
+    """
+    Stable hash of an app catalog that clients can compute too: the first 16 hex digits of
+    sha256 over UTF-8 JSON with sorted keys and no whitespace.
+    """
+    canonical = json.dumps(apps, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+def _pack(apps):
+    return zlib.compress(json.dumps(apps, separators=(",", ":"), ensure_ascii=False).encode("utf-8"))
+
+def _unpack(blob):
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+# ==================== DEVICES ====================
+
+def _device_row(row):
+    if row is None:
+        return None
+    device_id, name, address, kind, interface, capabilities, updated_at = row
+    return {"device_id": device_id, "name": name, "address": address, "type": kind,
+            "interface": interface, "capabilities": json.loads(capabilities), "updated_at": updated_at}
+
+def RegisterDevice(device_id, name=None, address=None, type=None, interface=None, capabilities=None):
+    """Create or update a device; fields left as None keep their stored value"""
+    with _lock:
+        db = _db()
+        current = _device_row(db.execute("SELECT * FROM devices WHERE device_id = ?", (device_id,)).fetchone()) or {}
+        db.execute("INSERT OR REPLACE INTO devices VALUES (?, ?, ?, ?, ?, ?, ?)", (
+            device_id,
+            name if name is not None else current.get("name"),
+            address if address is not None else current.get("address"),
+            type if type is not None else current.get("type"),
+            interface if interface is not None else current.get("interface"),
+            json.dumps(capabilities if capabilities is not None else current.get("capabilities", [])),
+            time.time()
+        ))
+
+def GetDevice(device_id):
+    with _lock:
+        return _device_row(_db().execute("SELECT * FROM devices WHERE device_id = ?", (device_id,)).fetchone())
+
+def FindDevice(name):
+    """Device by id or by its friendly name"""
+    with _lock:
+        row = _db().execute("SELECT * FROM devices WHERE device_id = ? OR name = ? LIMIT 1", (name, name)).fetchone()
+    return _device_row(row)
+
+def ListDevices():
+    with _lock:
+        return [_device_row(row) for row in _db().execute("SELECT * FROM devices ORDER BY device_id")]
+
+# ==================== APP CATALOGS ====================
+
+def SaveApps(device_id, apps):
+    """Store a device's full {app name: package} catalog; returns its version"""
+    version = CatalogVersion(apps)
+    with _lock:
+        db = _db()
+        db.execute("INSERT OR IGNORE INTO devices (device_id, updated_at) VALUES (?, ?)", (device_id, time.time()))
+        db.execute("INSERT OR REPLACE INTO app_catalogs VALUES (?, ?, ?, ?)", (device_id, version, _pack(apps), time.time()))
+        _catalogs[device_id] = CachedCatalog(version, dict(apps))
+    return version
+
+def ApplyAppsDelta(device_id, base_version, add=None, remove=None):
+    """
+    Apply {name: package} additions and name removals to the catalog at base_version.
+    Returns the new version; raises VersionConflict when base_version is stale.
+    """
+    add, remove = add or {}, remove or []
+    with _lock:
+        db = _db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            row = db.execute("SELECT version, apps FROM app_catalogs WHERE device_id = ?", (device_id,)).fetchone()
+            if row is None or row[0] != base_version:
+                raise VersionConflict(row[0] if row else None)
+            cached = _catalogs.get(device_id)
+            if cached is None or cached.version != row[0]:
+                cached = CachedCatalog(row[0], _unpack(row[1]))
+            # Work on a copy so a failed write leaves the cache untouched
+            apps = dict(cached.apps)
+            for name in remove:
+                apps.pop(name, None)
+            apps.update(add)
+            version = CatalogVersion(apps)
+            db.execute("UPDATE app_catalogs SET version = ?, apps = ?, updated_at = ? WHERE device_id = ?",
+                       (version, _pack(apps), time.time(), device_id))
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        cached.apply(version, add, remove)
+        _catalogs[device_id] = cached
+    return version
+
+def _catalog(device_id):
+    """Read-through: one primary-key lookup for the version, decode only when it changed"""
+    with _lock:
+        db = _db()
+        row = db.execute("SELECT version FROM app_catalogs WHERE device_id = ?", (device_id,)).fetchone()
+        if row is None:
+            _catalogs.pop(device_id, None)
+            return None
+        cached = _catalogs.get(device_id)
+        if cached is None or cached.version != row[0]:
+            version, blob = db.execute("SELECT version, apps FROM app_catalogs WHERE device_id = ?", (device_id,)).fetchone()
+            cached = _catalogs[device_id] = CachedCatalog(version, _unpack(blob))
+        return cached
+
+def GetApps(device_id):
+    """A device's app catalog, or None if it never uploaded one"""
+    cached = _catalog(device_id)
+    return dict(cached.apps) if cached else None
+
+def AppsVersion(device_id):
+    cached = _catalog(device_id)
+    return cached.version if cached else None
+
+def MatchApp(device_id, target, cutoff=0.6):
+    """Closest installed app name for a spoken app name, or None"""
+    cached = _catalog(device_id)
+    if not cached:
+        return None
+    target = target.lower()
+    if target in cached.by_lower:
+        return cached.by_lower[target]
+    matches = get_close_matches(target, list(cached.by_lower), n=1, cutoff=cutoff)
+    return cached.by_lower[matches[0]] if matches else None
+
+# ==================== LEGACY IMPORT ====================
+
+def _migrate_legacy(db):
+    if db.execute("SELECT 1 FROM meta WHERE key = 'legacy_imported'").fetchone():
+        return
+    now = time.time()
+    for path in glob.glob(os.path.join(LegacyAppsDir, "*.json")):
+        device_id = os.path.splitext(os.path.basename(path))[0]
+        try:
+            with open(path, "r") as f:
+                apps = json.load(f)
+        except (OSError, ValueError) as e:
+            log.warning("Skipping legacy app list %s: %s", path, e)
+            continue
+        db.execute("INSERT OR IGNORE INTO devices (device_id, updated_at) VALUES (?, ?)", (device_id, now))
+        db.execute("INSERT OR IGNORE INTO app_catalogs VALUES (?, ?, ?, ?)", (device_id, CatalogVersion(apps), _pack(apps), now))
+    try:
+        with open(LegacyDeviceList, "r") as f:
+            legacy_devices = json.load(f)
+    except (OSError, ValueError):
+        legacy_devices = {}
+    for name, device in legacy_devices.items():
+        db.execute("INSERT OR IGNORE INTO devices VALUES (?, ?, ?, ?, ?, ?, ?)", (
+            name, name, device.get("ip"), device.get("type"), device.get("interface"),
+            json.dumps(device.get("commands", [])), now
+        ))
+    db.execute("INSERT OR REPLACE INTO meta VALUES ('legacy_imported', ?)", (str(now),))
+    log.info("Imported legacy device files into %s", DeviceRegistryPath)
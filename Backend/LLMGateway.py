@@ -0,0 +1,226 @@
+# ======================== LLMGateway.py ========================
+# Single async entry point for every Groq / Cohere completion.
+# Calls run on one background event loop that owns pooled HTTP/2 clients, so connections are
+# reused across requests and worker threads. Each call has a deadline, can be hedged with a
+# second attempt once it runs past the provider's rolling p95, and fails over to the other
+# provider when the first one errors or times out. Admission goes through a per-provider
+# adaptive concurrency limiter (ConcurrencyLimiter.py) with device commands ahead of chat.
+
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+import cohere
+import httpx
+from groq import AsyncGroq
+from dotenv import dotenv_values
+from Backend.Metrics import span, UpstreamErrors
+from Backend.Logger import GetLogger
+from Backend.Profiler import ProfileHelper
+from Backend.ConcurrencyLimiter import AdaptiveLimiter, Overloaded, IsThrottle, DEVICE, CHAT
+
+env_vars = dotenv_values(".env")
+GroqAPIKey = env_vars.get("GroqAPIKey") or os.getenv("GROQ_API_KEY")
+CohereAPIKey = env_vars.get("CohereAPIKey") or os.getenv("CO_API_KEY")
+LLMDeadline = float(env_vars.get("LLMDeadline", 20))
+LLMHedge = env_vars.get("LLMHedge", "true").lower() == "true"
+LLMHedgeMinDelay = float(env_vars.get("LLMHedgeMinDelay", 1.0))
+LLMHedgeMinSamples = int(env_vars.get("LLMHedgeMinSamples", 20))
+LLMFailover = env_vars.get("LLMFailover", "true").lower() == "true"
+LLMPrimaryShare = float(env_vars.get("LLMPrimaryShare", 0.6))  # of the deadline, when failover is possible
+LLMMaxConnections = int(env_vars.get("LLMMaxConnections", 20))
+
+DEFAULT_MODELS = {"groq": "llama3-70b-8192", "cohere": "command-r-plus"}
+FAILOVER = {"groq": "cohere", "cohere": "groq"}
+
+log = GetLogger("llm")
+
+try:
+    import h2  # noqa: F401  (httpx only speaks HTTP/2 when h2 is installed)
+    HTTP2 = True
+except ImportError:
+    HTTP2 = False
+
+# ==================== BACKGROUND LOOP ====================
+
+_loop = None
+_loop_lock = threading.Lock()
+_clients = {}
+
+def _gateway_loop():
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="llm-gateway", daemon=True).start()
+            _loop = loop
+    return _loop
+
+def _http_client():
+    return httpx.AsyncClient(
+        http2=HTTP2,
+        limits=httpx.Limits(max_connections=LLMMaxConnections, max_keepalive_connections=LLMMaxConnections),
+        timeout=httpx.Timeout(LLMDeadline, connect=5.0)
+    )
+
+def _client(provider):
+    """Provider SDK clients, created on (and only used from) the gateway loop"""
+    if provider not in _clients:
+        if provider == "groq":
+            _clients[provider] = AsyncGroq(api_key=GroqAPIKey, http_client=_http_client(), max_retries=0)
+        else:
+            _clients[provider] = cohere.AsyncClient(api_key=CohereAPIKey, httpx_client=_http_client(), max_retries=0)
+    return _clients[provider]
+
+# ==================== LATENCY TRACKING ====================
+
+_latencies = {provider: deque(maxlen=200) for provider in DEFAULT_MODELS}
+
+def P95(provider):
+    """Rolling p95 of successful calls, or None until there are enough samples to trust"""
+    samples = sorted(_latencies[provider])
+    if len(samples) < LLMHedgeMinSamples:
+        return None
+    return samples[int(len(samples) * 0.95) - 1]
+
+# ==================== PROVIDER CALLS ====================
+
+async def _call_groq(messages, model, max_tokens, temperature):
+    stream = await _client("groq").chat.completions.create(
+        model=model or DEFAULT_MODELS["groq"],
+        messages=messages,
+        max_tokens=max_tokens,
+        temperature=temperature,
+        top_p=1,
+        stream=True,
+        stop=None
+    )
+    answer = ""
+    async for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            answer += chunk.choices[0].delta.content
+    return answer
+
+async def _call_cohere(messages, model, max_tokens, temperature):
+    # Cohere's v1 chat takes a preamble, prior turns and the final user message separately
+    preamble = "\n".join(m["content"] for m in messages if m["role"] == "system")
+    turns = [m for m in messages if m["role"] != "system"]
+    history = [{"role": "USER" if m["role"] == "user" else "CHATBOT", "message": m["content"]} for m in turns[:-1]]
+    answer = ""
+    async for event in _client("cohere").chat_stream(
+        model=model or DEFAULT_MODELS["cohere"],
+        message=turns[-1]["content"] if turns else "",
+        preamble=preamble or None,
+        chat_history=history,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        prompt_truncation="OFF",
+        connectors=[]
+    ):
+        if event.event_type == "text-generation":
+            answer += event.text
+    return answer
+
+PROVIDERS = {"groq": _call_groq, "cohere": _call_cohere}
+PRIORITIES = {"device": DEVICE, "chat": CHAT}
+
+_limiters = {provider: AdaptiveLimiter(provider) for provider in PROVIDERS}
+
+async def _attempt(provider, messages, model, max_tokens, temperature, priority, acquired=False):
+    limiter = _limiters[provider]
+    if not acquired:
+        await limiter.acquire(priority)
+    started = time.perf_counter()
+    try:
+        with span(f"llm_{provider}"), ProfileHelper():
+            answer = await PROVIDERS[provider](messages, model, max_tokens, temperature)
+    except asyncio.CancelledError:
+        limiter.release()
+        raise
+    except Exception as e:
+        limiter.release(throttled=IsThrottle(e))
+        raise
+    latency = time.perf_counter() - started
+    limiter.release(latency)
+    _latencies[provider].append(latency)
+    return answer
+
+async def _hedged(provider, messages, model, max_tokens, temperature, timeout, priority):
+    """One attempt, plus a second identical one if the first outlives the provider's p95"""
+    deadline = time.monotonic() + timeout
+    attempts = [asyncio.ensure_future(_attempt(provider, messages, model, max_tokens, temperature, priority))]
+    try:
+        p95 = P95(provider) if LLMHedge else None
+        if p95 is not None:
+            delay = max(p95, LLMHedgeMinDelay)
+            if delay < timeout:
+                done, _ = await asyncio.wait(attempts, timeout=delay)
+                # Hedges only use spare slots; they never queue behind real work
+                if not done and _limiters[provider].try_acquire(priority):
+                    log.debug("Hedging %s call after %.2fs", provider, delay)
+                    attempts.append(asyncio.ensure_future(
+                        _attempt(provider, messages, model, max_tokens, temperature, priority, acquired=True)))
+        pending = set(attempts)
+        error = None
+        while pending:
+            remaining = deadline - time.monotonic()
+            done, pending = await asyncio.wait(pending, timeout=max(remaining, 0), return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                _limiters[provider].penalize()
+                raise asyncio.TimeoutError()
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in attempts:
+            task.cancel()
+
+async def _complete(messages, provider, model, max_tokens, temperature, deadline, priority):
+    started = time.monotonic()
+    priority = PRIORITIES[priority]
+    fallback = FAILOVER[provider] if LLMFailover else None
+    budget = deadline * LLMPrimaryShare if fallback else deadline
+    try:
+        return await _hedged(provider, messages, model, max_tokens, temperature, budget, priority)
+    except Exception as e:
+        if not isinstance(e, Overloaded):
+            UpstreamErrors.inc(upstream=provider)
+        remaining = deadline - (time.monotonic() - started)
+        if not fallback or remaining <= 0:
+            raise
+        log.warning("%s call failed (%s: %s), failing over to %s", provider, type(e).__name__, e, fallback)
+    try:
+        return await _hedged(fallback, messages, None, max_tokens, temperature, remaining, priority)
+    except Exception as e:
+        if not isinstance(e, Overloaded):
+            UpstreamErrors.inc(upstream=fallback)
+        raise
+
+# ==================== PUBLIC API ====================
+
+async def Complete(messages, provider="groq", model=None, max_tokens=1024, temperature=0.7,
+                   deadline=LLMDeadline, priority="chat"):
+    """
+    Chat completion text for OpenAI-style messages. Awaitable from any event loop;
+    the upstream work itself runs on the gateway loop. priority is "device" for calls a
+    device command waits on and "chat" for conversation; chat is shed first (Overloaded).
+    """
+    future = asyncio.run_coroutine_threadsafe(
+        _complete(messages, provider, model, max_tokens, temperature, deadline, priority), _gateway_loop()
+    )
+    try:
+        return await asyncio.wrap_future(future)
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+
+def CompleteSync(messages, provider="groq", model=None, max_tokens=1024, temperature=0.7,
+                 deadline=LLMDeadline, priority="chat"):
+    """Blocking twin of Complete() for sync call sites (runs on worker threads, never on the gateway loop)"""
+    future = asyncio.run_coroutine_threadsafe(
+        _complete(messages, provider, model, max_tokens, temperature, deadline, priority), _gateway_loop()
+    )
+    return future.result()
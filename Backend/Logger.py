@@ -0,0 +1,94 @@
+# ======================== Logger.py ========================
+# Leveled, structured logging for the server.
+# Records are handed to a queue on the request path and formatted/written by a background
+# listener thread, so stdout contention never blocks a request. Debug records are dropped
+# before any formatting when LogLevel is above DEBUG (use %-style arguments, not f-strings).
+
+import atexit
+import contextvars
+import datetime
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import uuid
+from dotenv import dotenv_values
+
+env_vars = dotenv_values(".env")
+LogLevel = (env_vars.get("LogLevel") or os.getenv("LOG_LEVEL") or "INFO").upper()
+LogFormat = (env_vars.get("LogFormat") or os.getenv("LOG_FORMAT") or "json").lower()
+
+RequestId = contextvars.ContextVar("request_id", default="-")
+
+# ==================== FORMATTERS ====================
+
+_RESERVED = set(logging.makeLogRecord({}).__dict__) | {"message", "request_id", "asctime"}
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line with level, logger, request id and any extra fields"""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "msg": record.getMessage()
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s [%(request_id)s] %(name)s: %(message)s")
+
+# ==================== NON-BLOCKING HANDLER ====================
+
+class _RequestQueueHandler(logging.handlers.QueueHandler):
+    """Stamp the request id and resolve the message in the caller, leave formatting to the listener"""
+
+    def prepare(self, record):
+        record.request_id = RequestId.get()
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass  # Never block a request on logging; drop instead
+
+_log_queue = queue.Queue(maxsize=10000)
+_stream_handler = logging.StreamHandler(sys.stdout)
+_stream_handler.setFormatter(JSONFormatter() if LogFormat == "json" else TextFormatter())
+_listener = logging.handlers.QueueListener(_log_queue, _stream_handler, respect_handler_level=False)
+
+_root = logging.getLogger("nexon")
+_root.setLevel(LogLevel)
+_root.propagate = False
+if not _root.handlers:
+    _root.addHandler(_RequestQueueHandler(_log_queue))
+    _listener.start()
+    atexit.register(_listener.stop)
+
+# ==================== PUBLIC API ====================
+
+def GetLogger(name):
+    """Logger under the shared non-blocking 'nexon' hierarchy"""
+    return _root.getChild(name)
+
+def NewRequestId(value=None):
+    """Set (or generate) the correlation id for the current request/context and return it"""
+    request_id = value or uuid.uuid4().hex[:16]
+    RequestId.set(request_id)
+    return request_id
@@ -1,38 +1,181 @@
+# ======================== MemoryHandler.py ========================
+# Long-term memory per owner (device / user id) in SQLite.
+# Facts ("remember that ...") and tasks (pending / done, optional due time) are rows indexed by
+# owner, and an FTS5 index over their text gives ranked keyword search. relevant_memories()
+# returns the top-k matches for a query within a token budget, which ChatBot adds to its prompt.
+# The old single-owner helpers (save_task, load_memory, add_pending_task) keep working on top.
+
 import json
 import os
+import re
+import sqlite3
+import threading
+import time
 from datetime import datetime
+from dotenv import dotenv_values
 
-MEMORY_FILE = "Data/memory.json"
+env_vars = dotenv_values(".env")
+MEMORY_DB = env_vars.get("MemoryPath") or os.getenv("MEMORY_PATH") or "Data/memory.sqlite3"
+MEMORY_FILE = "Data/memory.json"  # legacy single-owner file, imported once
+MemoryTopK = int(env_vars.get("MemoryTopK", 5))
+MemoryPromptTokens = int(env_vars.get("MemoryPromptTokens", 200))
+DEFAULT_OWNER = "default"
 
-def init_memory():
-    if not os.path.exists(MEMORY_FILE):
-        with open(MEMORY_FILE, "w") as f:
-            json.dump({}, f)
-
-def save_task(task, pending=None):
-    data = {
-        "last_task": task,
-        "last_session_time": str(datetime.now()),
-        "pending_tasks": pending if pending else []
-    }
-    with open(MEMORY_FILE, "w") as f:
-        json.dump(data, f)
-
-def load_memory():
-    file_path = "Data/Status.data"
-
-    if not os.path.exists(file_path) or os.stat(file_path).st_size == 0:
-        # File doesn't exist or is empty
-        return []
+STOPWORDS = {"a", "an", "the", "is", "are", "was", "what", "who", "when", "where", "how", "do", "does", "did",
+             "i", "me", "my", "you", "your", "to", "of", "in", "on", "for", "and", "or", "it", "that", "this"}
 
-    with open(file_path, "r") as f:
+_lock = threading.Lock()
+_conn = None
+_fts = True
+
+def _db():
+    global _conn, _fts
+    if _conn is None:
+        os.makedirs(os.path.dirname(MEMORY_DB) or ".", exist_ok=True)
+        _conn = sqlite3.connect(MEMORY_DB, timeout=10, check_same_thread=False, isolation_level=None)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute("""CREATE TABLE IF NOT EXISTS memories (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, owner TEXT NOT NULL, kind TEXT NOT NULL,
+            text TEXT NOT NULL, status TEXT, due_at REAL, created_at REAL NOT NULL, updated_at REAL NOT NULL)""")
+        _conn.execute("CREATE INDEX IF NOT EXISTS memories_tasks ON memories (owner, kind, status, due_at)")
+        _conn.execute("""CREATE TABLE IF NOT EXISTS sessions (
+            owner TEXT PRIMARY KEY, last_task TEXT, last_session_time TEXT)""")
         try:
-            return json.load(f)
-        except json.JSONDecodeError:
-            return []  # Handle corrupted JSON gracefully
-
-def add_pending_task(task):
-    memory = load_memory()
-    memory.setdefault("pending_tasks", []).append(task)
-    with open(MEMORY_FILE, "w") as f:
-        json.dump(memory, f)
+            _conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS memories_fts USING fts5(text, content='memories', content_rowid='id')")
+            _conn.execute("""CREATE TRIGGER IF NOT EXISTS memories_ai AFTER INSERT ON memories BEGIN
+                INSERT INTO memories_fts(rowid, text) VALUES (new.id, new.text); END""")
+            _conn.execute("""CREATE TRIGGER IF NOT EXISTS memories_ad AFTER DELETE ON memories BEGIN
+                INSERT INTO memories_fts(memories_fts, rowid, text) VALUES ('delete', old.id, old.text); END""")
+            _conn.execute("""CREATE TRIGGER IF NOT EXISTS memories_au AFTER UPDATE OF text ON memories BEGIN
+                INSERT INTO memories_fts(memories_fts, rowid, text) VALUES ('delete', old.id, old.text);
+                INSERT INTO memories_fts(rowid, text) VALUES (new.id, new.text); END""")
+        except sqlite3.OperationalError:
+            _fts = False  # SQLite built without FTS5: fall back to LIKE matching
+        _import_legacy(_conn)
+    return _conn
+
+def _row(row):
+    memory_id, owner, kind, text, status, due_at, created_at, updated_at = row
+    return {"id": memory_id, "owner": owner, "kind": kind, "text": text, "status": status,
+            "due_at": due_at, "created_at": created_at, "updated_at": updated_at}
+
+# ==================== FACTS & TASKS ====================
+
+def remember_fact(owner, text):
+    """Store a fact about the owner; returns its id"""
+    now = time.time()
+    with _lock:
+        return _db().execute("INSERT INTO memories (owner, kind, text, created_at, updated_at) VALUES (?, 'fact', ?, ?, ?)",
+                             (owner or DEFAULT_OWNER, text.strip(), now, now)).lastrowid
+
+def add_task(owner, text, due_at=None):
+    """Store a pending task (due_at is a unix timestamp or None); returns its id"""
+    now = time.time()
+    with _lock:
+        return _db().execute(
+            "INSERT INTO memories (owner, kind, text, status, due_at, created_at, updated_at) VALUES (?, 'task', ?, 'pending', ?, ?, ?)",
+            (owner or DEFAULT_OWNER, text.strip(), due_at, now, now)).lastrowid
+
+def complete_task(owner, task_id):
+    with _lock:
+        return bool(_db().execute("UPDATE memories SET status = 'done', updated_at = ? WHERE id = ? AND owner = ? AND kind = 'task'",
+                                  (time.time(), task_id, owner or DEFAULT_OWNER)).rowcount)
+
+def list_tasks(owner, status="pending", due_before=None):
+    """Tasks by status, earliest due first (undated last)"""
+    sql = "SELECT * FROM memories WHERE owner = ? AND kind = 'task' AND status = ?"
+    params = [owner or DEFAULT_OWNER, status]
+    if due_before is not None:
+        sql += " AND due_at <= ?"
+        params.append(due_before)
+    sql += " ORDER BY due_at IS NULL, due_at, id"
+    with _lock:
+        return [_row(row) for row in _db().execute(sql, params)]
+
+def forget(owner, memory_id):
+    with _lock:
+        return bool(_db().execute("DELETE FROM memories WHERE id = ? AND owner = ?", (memory_id, owner or DEFAULT_OWNER)).rowcount)
+
+# ==================== RETRIEVAL ====================
+
+def _terms(query):
+    return [word for word in re.findall(r"[a-z0-9]+", query.lower()) if word not in STOPWORDS]
+
+def search_memories(owner, query, k=MemoryTopK):
+    """Top-k facts and pending tasks for the owner ranked by keyword relevance (BM25 with FTS5)"""
+    terms = _terms(query)
+    if not terms:
+        return []
+    owner = owner or DEFAULT_OWNER
+    with _lock:
+        db = _db()
+        if _fts:
+            match = " OR ".join(f'"{term}"' for term in terms)
+            rows = db.execute(
+                """SELECT m.* FROM memories_fts f JOIN memories m ON m.id = f.rowid
+                   WHERE memories_fts MATCH ? AND m.owner = ? AND (m.kind = 'fact' OR m.status = 'pending')
+                   ORDER BY bm25(memories_fts) LIMIT ?""", (match, owner, k)).fetchall()
+        else:
+            where = " OR ".join("text LIKE ?" for _ in terms)
+            rows = db.execute(
+                f"""SELECT * FROM memories WHERE owner = ? AND (kind = 'fact' OR status = 'pending') AND ({where})
+                    ORDER BY updated_at DESC LIMIT ?""", (owner, *[f"%{term}%" for term in terms], k)).fetchall()
+    return [_row(row) for row in rows]
+
+def relevant_memories(owner, query, k=MemoryTopK, max_tokens=MemoryPromptTokens):
+    """Texts of the most relevant memories that fit in max_tokens (about 4 characters per token)"""
+    budget = max_tokens * 4
+    selected = []
+    for memory in search_memories(owner, query, k):
+        text = memory["text"] if memory["kind"] == "fact" else f"Pending task: {memory['text']}"
+        if len(text) > budget:
+            break
+        selected.append(text)
+        budget -= len(text)
+    return selected
+
+def memory_prompt(owner, query):
+    """System message content with the owner's relevant memories, or None if there are none"""
+    memories = relevant_memories(owner, query)
+    if not memories:
+        return None
+    return "Things you know about the user (use only if relevant):\n" + "\n".join(f"- {text}" for text in memories)
+
+# ==================== SESSION (legacy API) ====================
+
+def init_memory():
+    _db()
+
+def save_task(task, pending=None, owner=DEFAULT_OWNER):
+    with _lock:
+        _db().execute("INSERT OR REPLACE INTO sessions VALUES (?, ?, ?)", (owner or DEFAULT_OWNER, task, str(datetime.now())))
+    for item in pending or []:
+        add_task(owner, item)
+
+def load_memory(owner=DEFAULT_OWNER):
+    with _lock:
+        row = _db().execute("SELECT last_task, last_session_time FROM sessions WHERE owner = ?", (owner or DEFAULT_OWNER,)).fetchone()
+    memory = {"pending_tasks": [task["text"] for task in list_tasks(owner)]}
+    if row:
+        memory["last_task"], memory["last_session_time"] = row
+    return memory
+
+def add_pending_task(task, owner=DEFAULT_OWNER):
+    return add_task(owner, task)
+
+def _import_legacy(db):
+    if not os.path.exists(MEMORY_FILE):
+        return
+    try:
+        with open(MEMORY_FILE, "r") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        data = {}
+    now = time.time()
+    if data.get("last_task"):
+        db.execute("INSERT OR IGNORE INTO sessions VALUES (?, ?, ?)",
+                   (DEFAULT_OWNER, data["last_task"], data.get("last_session_time")))
+    for task in data.get("pending_tasks", []):
+        db.execute("INSERT INTO memories (owner, kind, text, status, created_at, updated_at) VALUES (?, 'task', ?, 'pending', ?, ?)",
+                   (DEFAULT_OWNER, str(task), now, now))
+    os.replace(MEMORY_FILE, MEMORY_FILE + ".imported")
@@ -0,0 +1,211 @@
+# ======================== Metrics.py ========================
+# Stage timing spans, histograms and counters rendered in the Prometheus text format.
+# With MetricsDir set, every process (gunicorn worker) periodically writes its samples
+# there and /metrics merges them, so any worker can answer a scrape.
+
+import asyncio
+import functools
+import glob
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dotenv import dotenv_values
+from Backend.Logger import GetLogger
+
+log = GetLogger("metrics")
+
+env_vars = dotenv_values(".env")
+MetricsDir = env_vars.get("MetricsDir") or os.getenv("METRICS_DIR")
+MetricsFlushInterval = float(env_vars.get("MetricsFlushInterval", 5))
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_registry = []
+
+# ==================== METRIC TYPES ====================
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(label, "")) for label in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return {"|".join(key): value for key, value in self._values.items()}
+
+    @staticmethod
+    def merge(into, other):
+        for key, value in other.items():
+            into[key] = into.get(key, 0) + value
+        return into
+
+    def render(self, samples):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(samples.items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, key.split('|') if self.labelnames else [])} {value}")
+        return lines
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels"""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(label, "")) for label in self.labelnames)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = {"buckets": [0] * len(self.buckets), "count": 0, "sum": 0.0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry["buckets"][index] += 1
+                    break
+            entry["count"] += 1
+            entry["sum"] += value
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "|".join(key): {"buckets": list(entry["buckets"]), "count": entry["count"], "sum": entry["sum"]}
+                for key, entry in self._values.items()
+            }
+
+    @staticmethod
+    def merge(into, other):
+        for key, entry in other.items():
+            target = into.setdefault(key, {"buckets": [0] * len(entry["buckets"]), "count": 0, "sum": 0.0})
+            target["buckets"] = [a + b for a, b in zip(target["buckets"], entry["buckets"])]
+            target["count"] += entry["count"]
+            target["sum"] += entry["sum"]
+        return into
+
+    def render(self, samples):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for key, entry in sorted(samples.items()):
+            values = key.split("|") if self.labelnames else []
+            cumulative = 0
+            for bound, count in zip(self.buckets, entry["buckets"]):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames + ('le',), values + [_number(bound)])} {cumulative}")
+            lines.append(f"{self.name}_bucket{_labels(self.labelnames + ('le',), values + ['+Inf'])} {entry['count']}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, values)} {entry['sum']}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, values)} {entry['count']}")
+        return lines
+
+def _number(value):
+    return repr(float(value))
+
+def _labels(names, values):
+    if not names:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in values)
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(names, escaped)) + "}"
+
+# ==================== METRICS ====================
+
+StageLatency = Histogram("nexon_stage_duration_seconds", "Time spent in each processing stage", ["stage"])
+RequestLatency = Histogram("nexon_request_duration_seconds", "End-to-end HTTP request latency", ["endpoint", "status"])
+CacheEvents = Counter("nexon_cache_events_total", "Cache lookups by cache and result (hit/miss)", ["cache", "result"])
+UpstreamErrors = Counter("nexon_upstream_errors_total", "Failed calls to upstream services", ["upstream"])
+
+# ==================== SPANS ====================
+
+@contextmanager
+def span(stage, upstream=None):
+    """Time a block as one stage; exceptions escaping the block count as upstream errors"""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        if upstream:
+            UpstreamErrors.inc(upstream=upstream)
+        raise
+    finally:
+        StageLatency.observe(time.perf_counter() - started, stage=stage)
+
+def timed(stage, upstream=None):
+    """Decorator version of span() for sync and async functions"""
+    def decorator(fn):
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(stage, upstream):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(stage, upstream):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def RecordCache(cache, hit):
+    CacheEvents.inc(cache=cache, result="hit" if hit else "miss")
+
+# ==================== EXPOSITION ====================
+
+def _snapshot():
+    return {metric.name: metric.snapshot() for metric in _registry}
+
+def _flush():
+    path = os.path.join(MetricsDir, f"{os.getpid()}.json")
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(_snapshot(), f)
+    os.replace(f"{path}.tmp", path)
+
+def _flush_loop():
+    while True:
+        time.sleep(MetricsFlushInterval)
+        try:
+            _flush()
+        except OSError as e:
+            log.warning("Flush failed: %s", e)
+
+def RenderMetrics():
+    """Prometheus text exposition of every metric, merged across processes when MetricsDir is set"""
+    merged = _snapshot()
+    if MetricsDir:
+        _flush()
+        merged = {metric.name: {} for metric in _registry}
+        for path in glob.glob(os.path.join(MetricsDir, "*.json")):
+            try:
+                with open(path) as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for metric in _registry:
+                metric.merge(merged[metric.name], data.get(metric.name, {}))
+
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render(merged[metric.name]))
+    return "\n".join(lines) + "\n"
+
+if MetricsDir:
+    os.makedirs(MetricsDir, exist_ok=True)
+    threading.Thread(target=_flush_loop, name="metrics-flush", daemon=True).start()
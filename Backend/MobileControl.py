@@ -1,21 +1,43 @@
 import requests
+from Backend import DeviceRegistry
+from Backend import PushHub
 
-MOBILE_IP = "http://192.168.1.100:5000"  # 🔁 Replace with your phone IP
+MOBILE_IP = "http://192.168.1.100:5000"  # 🔁 Fallback when the device hasn't registered an address
+PUSH_TIMEOUT = 10
 
-def speak_on_phone(msg):
-    return requests.post(f"{MOBILE_IP}/say", json={"message": msg}).json()
+def mobile_url(device_id=None):
+    """Base URL of a registered phone, falling back to MOBILE_IP"""
+    device = DeviceRegistry.FindDevice(device_id) if device_id else None
+    if device and device.get("address"):
+        address = device["address"]
+        return address if address.startswith("http") else f"http://{address}:5000"
+    return MOBILE_IP
 
-def vibrate_phone(duration=300):
-    return requests.post(f"{MOBILE_IP}/vibrate", json={"duration": duration}).json()
+def send_to_phone(action, payload=None, device_id=None, method="post"):
+    """Use the push channel when the phone is connected to it, otherwise call the phone directly"""
+    if device_id and PushHub.IsConnected(device_id):
+        message = PushHub.WaitForAck(PushHub.Push(device_id, action, payload), PUSH_TIMEOUT)
+        if message and message["acked_at"]:
+            return message["result"] if message["result"] is not None else {"status": message["status"]}
+        return {"status": "pending", "id": message["id"] if message else None}
+    if method == "get":
+        return requests.get(f"{mobile_url(device_id)}/{action}").json()
+    return requests.post(f"{mobile_url(device_id)}/{action}", json=payload).json()
 
-def get_battery_status():
-    return requests.get(f"{MOBILE_IP}/battery").json()
+def speak_on_phone(msg, device_id=None):
+    return send_to_phone("say", {"message": msg}, device_id)
 
-def call_number(number):
-    return requests.post(f"{MOBILE_IP}/call", json={"number": number}).json()
+def vibrate_phone(duration=300, device_id=None):
+    return send_to_phone("vibrate", {"duration": duration}, device_id)
 
-def send_sms(number, msg):
-    return requests.post(f"{MOBILE_IP}/sms", json={"number": number, "message": msg}).json()
+def get_battery_status(device_id=None):
+    return send_to_phone("battery", None, device_id, method="get")
 
-def toggle_flashlight(state="on"):
-    return requests.post(f"{MOBILE_IP}/torch", json={"state": state}).json()
+def call_number(number, device_id=None):
+    return send_to_phone("call", {"number": number}, device_id)
+
+def send_sms(number, msg, device_id=None):
+    return send_to_phone("sms", {"number": number, "message": msg}, device_id)
+
+def toggle_flashlight(state="on", device_id=None):
+    return send_to_phone("torch", {"state": state}, device_id)
@@ -1,5 +1,3 @@
-import cohere
-from rich import print
 from dotenv import dotenv_values
 import random
 import re
@@ -7,13 +5,16 @@ import spacy
 from fuzzywuzzy import process
 from datetime import datetime
 import json
+from Backend.Metrics import timed
+from Backend.Logger import GetLogger
+from Backend.LLMGateway import CompleteSync
+
+log = GetLogger("model")
 
 # Load environment variables
 env_vars = dotenv_values(".env")
 CohereAPIKey = env_vars.get("CohereAPIKey")
 
-co = cohere.Client()  # Will automatically use CO_API_KEY
-
 # Load NLP model for better understanding
 try:
     nlp = spacy.load("en_core_web_sm")
@@ -408,7 +409,7 @@ def extract_structured_command(prompt: str):
     for processor in command_processors:
         result = processor(prompt)
         if result:
-            print(f"[DEBUG] Extracted command: {result}")
+            log.debug("Extracted command: %s", result)
             return result
     
     return None
@@ -432,7 +433,7 @@ def extract_all_structured_commands(prompt: str):
     for processor in command_processors:
         result = processor(prompt)
         if result:
-            print(f"[DEBUG] Extracted command: {result}")
+            log.debug("Extracted command: %s", result)
             all_results.append(result)
     
     return all_results
@@ -469,7 +470,7 @@ def FirstLayerDMM(prompt: str = "test"):
     Advanced Decision Making Model with NLP/NLU capabilities
     Handles multiple commands in a single query
     """
-    print(f"[DEBUG] Processing query: {prompt}")
+    log.debug("Processing query: %s", prompt)
     
     # Check for ownership queries first
     if is_ownership_query(prompt):
@@ -479,7 +480,7 @@ def FirstLayerDMM(prompt: str = "test"):
     multiple_results = process_multiple_commands(prompt)
     
     if multiple_results:
-        print(f"[DEBUG] Multiple commands detected: {multiple_results}")
+        log.debug("Multiple commands detected: %s", multiple_results)
         return multiple_results
     
     # Fallback to single command processing
@@ -490,6 +491,7 @@ def FirstLayerDMM(prompt: str = "test"):
     # Fallback to Cohere for complex queries
     return fallback_to_cohere(prompt)
 
+@timed("cohere_fallback")
 def handle_ownership_query(prompt: str):
     """Handle ownership-related queries"""
     ownership_preamble = """
@@ -509,23 +511,14 @@ def handle_ownership_query(prompt: str):
     but still honor Bicky Muduli.
     """
     
-    stream = co.chat_stream(
-        model='command-r-plus',
-        message=prompt,
-        temperature=0.7,
-        chat_history=[],
-        prompt_truncation='OFF',
-        connectors=[],
-        preamble=ownership_preamble
+    response = CompleteSync(
+        [{"role": "system", "content": ownership_preamble}, {"role": "user", "content": prompt}],
+        provider="cohere"
     )
     
-    response = ""
-    for event in stream:
-        if event.event_type == "text-generation":
-            response += event.text
-    
     return [f"general {response.strip()}"]
 
+@timed("cohere_fallback")
 def fallback_to_cohere(prompt: str):
     """Fallback to Cohere for complex queries"""
     
@@ -551,21 +544,8 @@ def fallback_to_cohere(prompt: str):
     Respond with the most appropriate command format. If multiple actions are requested, separate them with commas.
     """
     
-    messages = [{"role": "user", "content": f"{prompt}"}]
-    stream = co.chat_stream(
-        model='command-r-plus',
-        message=prompt,
-        temperature=0.7,
-        chat_history=[],
-        prompt_truncation='OFF',
-        connectors=[],
-        preamble=enhanced_preamble
-    )
-    
-    response = ""
-    for event in stream:
-        if event.event_type == "text-generation":
-            response += event.text
+    messages = [{"role": "system", "content": enhanced_preamble}, {"role": "user", "content": f"{prompt}"}]
+    response = CompleteSync(messages, provider="cohere", priority="device")
     
     # Parse response into commands
     commands = response.replace("\n", "").split(",")
@@ -1,14 +1,14 @@
 # ========== IMPORTS ==========
 from dotenv import dotenv_values
-from rich import print
-from groq import Groq
 import os
 import re
+from Backend.Logger import GetLogger
+
+log = GetLogger("pc")
 
 # ========== ENVIRONMENT ==========
 env_vars = dotenv_values(".env")
 GroqAPIKey = env_vars.get("GroqAPIKey") or os.getenv("GROQ_API_KEY")
-client = Groq(api_key=GroqAPIKey)
 
 Username = env_vars.get("Username", "User")
 Assistantname = env_vars.get("Assistantname", "Jarvis")
@@ -57,7 +57,7 @@ def TranslateCommand(command: str) -> dict:
         processed_cmd = process_pc_command(cmd_lower)
         if processed_cmd:
             processed_commands.append(processed_cmd)
-            print(f"[PC] Processed command: {processed_cmd}")
+            log.debug("Processed command: %s", processed_cmd)
 
     return {
         "response": f"Executing {len(processed_commands)} PC command(s)",
@@ -161,7 +161,7 @@ def handle_legacy_pc_command(cmd):
         if app in PC_APP_MAPPINGS:
             return f"pc::open::{app}"
         else:
-            print(f"[PC OPEN] App '{app}' not supported.")
+            log.warning("App '%s' not supported on PC.", app)
             return None
 
     elif cmd.startswith("close "):
@@ -187,7 +187,7 @@ def handle_legacy_pc_command(cmd):
         return f"pc::content::{content_desc}"
 
     else:
-        print(f"[PC] Command not handled: {cmd}")
+        log.debug("Command not handled: %s", cmd)
         return None
 
 def extract_app_name_from_pc_command(cmd):
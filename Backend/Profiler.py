@@ -0,0 +1,270 @@
+# ======================== Profiler.py ========================
+# Opt-in statistical profiler for single requests.
+# A sampler thread reads the stack of the request thread every ProfileInterval seconds, plus the
+# stacks of helper threads while they work for this request: pools built with ProfiledExecutor
+# (asyncio.to_thread under RunProfiled, search/STT pools) attach their worker for the duration of
+# a work item, and shared event loops (the LLM gateway) attach only the request's own task via
+# ProfileHelper. Other requests' work on the same threads is never sampled. Each stack is rooted
+# at a "[thread name]" frame so the flamegraph shows where the time went per thread. Samples are stored as collapsed stacks (flamegraph.pl / speedscope
+# import) or speedscope JSON under ProfileDir, keeping only the newest ProfileKeep files.
+
+import asyncio
+import contextvars
+import functools
+import hmac
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dotenv import dotenv_values
+from Backend.Logger import GetLogger, RequestId
+
+env_vars = dotenv_values(".env")
+ProfileDir = env_vars.get("ProfileDir", "Data/Profiles")
+ProfileSampleRate = float(env_vars.get("ProfileSampleRate") or os.getenv("PROFILE_SAMPLE_RATE") or 0)
+ProfileInterval = float(env_vars.get("ProfileInterval", 0.005))
+ProfileKeep = int(env_vars.get("ProfileKeep", 50))
+ProfileFormat = env_vars.get("ProfileFormat", "collapsed")  # collapsed or speedscope
+ProfileToken = env_vars.get("ProfileToken") or os.getenv("PROFILE_TOKEN")  # required header value if set
+# Leaf frames of helper threads that are parked waiting for work; such samples are dropped
+IDLE_LEAVES = {("wait", "threading.py"), ("_worker", "thread.py"), ("select", "selectors.py")}
+
+PROFILE_HEADER = "X-Nexon-Profile"
+PROFILE_NAME = re.compile(r"^[\w.-]+\.(collapsed|speedscope\.json)$")
+
+log = GetLogger("profiler")
+
+# Sampler of the request being profiled, inherited by its to_thread work and gateway tasks
+_active = contextvars.ContextVar("profile_sampler", default=None)
+
+# ==================== SAMPLER ====================
+
+class StackSampler:
+    """Samples a thread's Python stack, plus helper threads while they are attached, until stopped"""
+
+    def __init__(self, thread_id, interval=ProfileInterval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = {}
+        self._helpers = {}  # thread ident -> attached owners (None = the whole thread, or an asyncio task)
+        self._helpers_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def attach(self, thread_id, task=None):
+        """Sample thread_id until detach(); with a task, only while that task is the one running"""
+        with self._helpers_lock:
+            self._helpers.setdefault(thread_id, []).append(task)
+
+    def detach(self, thread_id, task=None):
+        with self._helpers_lock:
+            owners = self._helpers.get(thread_id, [])
+            owners.remove(task)
+            if not owners:
+                del self._helpers[thread_id]
+
+    def _sampled(self, thread):
+        if thread.ident == self.thread_id:
+            return True
+        with self._helpers_lock:
+            owners = list(self._helpers.get(thread.ident, ()))
+        if None in owners:
+            return True
+        return any(asyncio.current_task(task.get_loop()) is task for task in owners)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for thread in threading.enumerate():
+                frame = frames.get(thread.ident)
+                if frame is None or not self._sampled(thread):
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+                    frame = frame.f_back
+                if thread.ident != self.thread_id and (stack[0][0], os.path.basename(stack[0][1])) in IDLE_LEAVES:
+                    continue
+                stack = (_thread_frame(thread),) + tuple(reversed(stack))
+                self.samples[stack] = self.samples.get(stack, 0) + 1
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - self.started
+        return self
+
+def _thread_frame(thread):
+    """Pseudo root frame labelling which thread a stack was sampled from"""
+    return (f"[{thread.name}]", "<thread>", 0)
+
+# ==================== HELPER THREADS ====================
+
+def _attached(sampler, fn, *args, **kwargs):
+    thread_id = threading.get_ident()
+    sampler.attach(thread_id)
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        sampler.detach(thread_id)
+
+class ProfiledExecutor(ThreadPoolExecutor):
+    """Thread pool whose work items are sampled as part of the profile of the request that submitted them"""
+
+    def submit(self, fn, /, *args, **kwargs):
+        sampler = _active.get()
+        if sampler is not None:
+            fn = functools.partial(_attached, sampler, fn)
+        return super().submit(fn, *args, **kwargs)
+
+@contextmanager
+def ProfileHelper():
+    """Attach the current thread (or, on an event loop, only the current task) to the active profile"""
+    sampler = _active.get()
+    if sampler is None:
+        yield
+        return
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        task = None
+    thread_id = threading.get_ident()
+    sampler.attach(thread_id, task)
+    try:
+        yield
+    finally:
+        sampler.detach(thread_id, task)
+
+async def RunProfiled(coro):
+    """Await coro with its asyncio.to_thread work sampled when the request is being profiled"""
+    if _active.get() is not None:
+        asyncio.get_running_loop().set_default_executor(ProfiledExecutor(thread_name_prefix="asyncio"))
+    return await coro
+
+# ==================== OUTPUT FORMATS ====================
+
+def _frame_label(frame):
+    name, filename, line = frame
+    if filename == "<thread>":
+        return name
+    return f"{name} ({os.path.relpath(filename) if not filename.startswith('<') else filename}:{line})"
+
+def ToCollapsed(samples):
+    """Brendan Gregg's collapsed stack format: 'root;child;leaf count' per line"""
+    lines = [";".join(_frame_label(frame).replace(";", ":") for frame in stack) + f" {count}"
+             for stack, count in samples.items()]
+    return "\n".join(sorted(lines)) + "\n"
+
+def ToSpeedscope(samples, name, interval, duration):
+    frames, index = [], {}
+    sampled, weights = [], []
+    for stack, count in samples.items():
+        ids = []
+        for frame in stack:
+            if frame not in index:
+                index[frame] = len(frames)
+                frames.append({"name": frame[0], "file": frame[1], "line": frame[2]})
+            ids.append(index[frame])
+        sampled.append(ids)
+        weights.append(count * interval)
+    return json.dumps({
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "shared": {"frames": frames},
+        "profiles": [{
+            "type": "sampled", "name": name, "unit": "seconds",
+            "startValue": 0, "endValue": duration, "samples": sampled, "weights": weights
+        }],
+        "name": name,
+        "exporter": "nexon-profiler"
+    })
+
+# ==================== STORAGE ====================
+
+def _rotate():
+    entries = sorted(
+        (entry for entry in os.scandir(ProfileDir) if PROFILE_NAME.match(entry.name)),
+        key=lambda entry: entry.stat().st_mtime
+    )
+    for entry in entries[:max(0, len(entries) - ProfileKeep)]:
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError:
+            pass
+
+def SaveProfile(sampler, label):
+    os.makedirs(ProfileDir, exist_ok=True)
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    base = re.sub(r"[^\w.-]", "_", f"{stamp}_{label}")
+    if ProfileFormat == "speedscope":
+        name = f"{base}.speedscope.json"
+        body = ToSpeedscope(sampler.samples, label, sampler.interval, sampler.duration)
+    else:
+        name = f"{base}.collapsed"
+        body = ToCollapsed(sampler.samples)
+    with open(os.path.join(ProfileDir, name), "w") as f:
+        f.write(body)
+    _rotate()
+    return name
+
+def ListProfiles():
+    """Stored profiles, newest first"""
+    if not os.path.isdir(ProfileDir):
+        return []
+    entries = [entry for entry in os.scandir(ProfileDir) if PROFILE_NAME.match(entry.name)]
+    entries.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+    return [{"name": entry.name, "bytes": entry.stat().st_size, "created": entry.stat().st_mtime} for entry in entries]
+
+def ProfilePath(name):
+    """Absolute path of a stored profile, or None for unknown/unsafe names"""
+    if not PROFILE_NAME.match(name):
+        return None
+    path = os.path.join(ProfileDir, name)
+    return os.path.abspath(path) if os.path.exists(path) else None
+
+# ==================== REQUEST HOOK ====================
+
+def HasProfileToken(headers):
+    """True when no ProfileToken is configured or the profile header carries it"""
+    if ProfileToken is None:
+        return True
+    return hmac.compare_digest(headers.get(PROFILE_HEADER, "").encode(), ProfileToken.encode())
+
+def ShouldProfile(headers):
+    """Profile when the header asks for it (and carries the token if one is configured) or by sampling"""
+    if headers.get(PROFILE_HEADER):
+        return HasProfileToken(headers)
+    return ProfileSampleRate > 0 and random.random() < ProfileSampleRate
+
+@contextmanager
+def ProfileRequest(enabled, label=None):
+    """
+    Sample the current thread and the helper threads it attaches for the duration of the block when enabled.
+    Yields a dict whose 'name' is filled in with the stored profile afterwards.
+    """
+    result = {"name": None}
+    if not enabled:
+        yield result
+        return
+    sampler = StackSampler(threading.get_ident()).start()
+    token = _active.set(sampler)
+    try:
+        yield result
+    finally:
+        _active.reset(token)
+        sampler.stop()
+        try:
+            result["name"] = SaveProfile(sampler, label or RequestId.get())
+            log.info("Stored profile %s (%d samples)", result["name"], sum(sampler.samples.values()))
+        except OSError as e:
+            log.error("Could not store profile: %s", e)
@@ -0,0 +1,296 @@
+# ======================== PushHub.py ========================
+# Server -> device command channel with acknowledgements.
+# Every pushed message is written to a SQLite outbox first, so it survives restarts and can be
+# delivered by whichever gunicorn worker holds the device's connection. Devices connect over a
+# WebSocket (/ws/<device_id>, when flask-sock is installed) or long-poll /push/<device_id>/poll,
+# receive {"type": "command", "id", "command", "payload"} messages and answer with
+# {"type": "ack", "id", "status", "result"}. Unacknowledged messages are re-sent on reconnect
+# until they expire; acked and expired rows are purged.
+# Connections never poll: a WebSocket thread blocks in receive() and pushes are written to it
+# by one watcher thread per worker, which is woken by local pushes and checks the outbox for
+# other workers' pushes every PushPollInterval with a single query for all devices.
+# Presence is written on connect/disconnect and refreshed every PushPresenceRefresh, in one
+# batch for all of a worker's sockets, so idle connections cost no database writes.
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from dotenv import dotenv_values
+from Backend.Metrics import Counter
+from Backend.Logger import GetLogger
+
+env_vars = dotenv_values(".env")
+PushHubPath = env_vars.get("PushHubPath") or os.getenv("PUSH_HUB_PATH") or "Data/push.sqlite3"
+PushPollInterval = float(env_vars.get("PushPollInterval", 1.0))  # how often a connection checks for pushes from other workers
+PushMessageTTL = float(env_vars.get("PushMessageTTL", 24 * 3600))
+PushPresenceRefresh = float(env_vars.get("PushPresenceRefresh", 60))
+PushAckedRetention = float(env_vars.get("PushAckedRetention", 3600))  # acked rows stay readable this long
+PushPurgeInterval = float(env_vars.get("PushPurgeInterval", 300))
+
+PushEvents = Counter("nexon_push_events_total", "Push hub messages by event", ["event"])
+
+log = GetLogger("push")
+
+_lock = threading.Lock()
+_conn = None
+_wakeup = threading.Condition()
+_generation = {}  # device_id -> counter bumped whenever new messages for it are seen
+_connections = {}  # device_id -> _Connection for WebSockets served by this worker
+_connections_lock = threading.Lock()
+_touched = {}  # device_id -> (transport, time of the last presence write)
+_watch_event = threading.Event()
+_watcher = None
+
+def _db():
+    global _conn
+    if _conn is None:
+        os.makedirs(os.path.dirname(PushHubPath) or ".", exist_ok=True)
+        _conn = sqlite3.connect(PushHubPath, timeout=10, check_same_thread=False, isolation_level=None)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute("""CREATE TABLE IF NOT EXISTS outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, device_id TEXT NOT NULL, command TEXT NOT NULL,
+            payload TEXT, created_at REAL NOT NULL, delivered_at REAL, acked_at REAL,
+            status TEXT, result TEXT)""")
+        _conn.execute("CREATE INDEX IF NOT EXISTS outbox_pending ON outbox (device_id, acked_at, id)")
+        _conn.execute("CREATE INDEX IF NOT EXISTS outbox_acked ON outbox (acked_at)")
+        _conn.execute("CREATE INDEX IF NOT EXISTS outbox_created ON outbox (created_at)")
+        _conn.execute("CREATE TABLE IF NOT EXISTS presence (device_id TEXT PRIMARY KEY, transport TEXT, last_seen REAL NOT NULL)")
+    return _conn
+
+def _message(row):
+    message_id, device_id, command, payload, created_at, delivered_at, acked_at, status, result = row
+    return {"id": message_id, "device_id": device_id, "command": command,
+            "payload": json.loads(payload) if payload else None, "created_at": created_at,
+            "delivered_at": delivered_at, "acked_at": acked_at, "status": status,
+            "result": json.loads(result) if result else None}
+
+def _notify(device_ids):
+    with _wakeup:
+        for device_id in device_ids:
+            _generation[device_id] = _generation.get(device_id, 0) + 1
+        _wakeup.notify_all()
+
+# ==================== SENDING ====================
+
+def Push(device_id, command, payload=None):
+    """Queue a command for one device; returns the message id"""
+    return Broadcast([device_id], command, payload)[0]
+
+def Broadcast(device_ids, command, payload=None):
+    """Queue the same command for many devices in one transaction; returns the message ids"""
+    now = time.time()
+    encoded = json.dumps(payload) if payload is not None else None
+    with _lock:
+        db = _db()
+        db.execute("BEGIN")
+        ids = [db.execute("INSERT INTO outbox (device_id, command, payload, created_at) VALUES (?, ?, ?, ?)",
+                          (device_id, command, encoded, now)).lastrowid for device_id in device_ids]
+        db.execute("COMMIT")
+    PushEvents.inc(len(ids), event="queued")
+    _notify(device_ids)
+    if _watcher is not None:
+        _watch_event.set()  # deliver to local sockets off the caller's thread
+    return ids
+
+def GetMessage(message_id):
+    with _lock:
+        row = _db().execute("SELECT * FROM outbox WHERE id = ?", (message_id,)).fetchone()
+    return _message(row) if row else None
+
+def WaitForAck(message_id, timeout=10.0):
+    """Block until the device acknowledges a message; returns the message (acked or not)"""
+    deadline = time.monotonic() + timeout
+    while True:
+        message = GetMessage(message_id)
+        remaining = deadline - time.monotonic()
+        if message is None or message["acked_at"] or remaining <= 0:
+            return message
+        with _wakeup:
+            _wakeup.wait(min(remaining, PushPollInterval / 4))
+
+# ==================== RECEIVING ====================
+
+def Pending(device_id, after=0, limit=100):
+    """Unacknowledged, unexpired messages for a device with id > after, marked as delivered"""
+    now = time.time()
+    with _lock:
+        db = _db()
+        rows = db.execute(
+            "SELECT * FROM outbox WHERE device_id = ? AND acked_at IS NULL AND id > ? AND created_at > ? ORDER BY id LIMIT ?",
+            (device_id, after, now - PushMessageTTL, limit)
+        ).fetchall()
+        if rows:
+            db.execute(f"UPDATE outbox SET delivered_at = ? WHERE id IN ({','.join('?' * len(rows))})",
+                       (now, *[row[0] for row in rows]))
+    if rows:
+        PushEvents.inc(len(rows), event="delivered")
+    return [_message(row) for row in rows]
+
+def Ack(device_id, message_id, status="ok", result=None):
+    """Record a device's acknowledgement (and optional result) for a message; False if unknown"""
+    with _lock:
+        updated = _db().execute(
+            "UPDATE outbox SET acked_at = ?, status = ?, result = ? WHERE id = ? AND device_id = ?",
+            (time.time(), status, json.dumps(result) if result is not None else None, message_id, device_id)
+        ).rowcount
+    if updated:
+        PushEvents.inc(event="acked" if status == "ok" else "failed")
+        _notify([device_id])
+    return bool(updated)
+
+def WaitForMessages(device_id, after=0, timeout=25.0):
+    """Long-poll: return pending messages as soon as there are any, or [] after timeout"""
+    _ensure_watcher()
+    deadline = time.monotonic() + timeout
+    while True:
+        Touch(device_id, "poll")
+        with _wakeup:
+            seen = _generation.get(device_id, 0)
+        messages = Pending(device_id, after)
+        remaining = deadline - time.monotonic()
+        if messages or remaining <= 0:
+            return messages
+        # The watcher bumps the generation for pushes from any worker
+        with _wakeup:
+            _wakeup.wait_for(lambda: _generation.get(device_id, 0) != seen, remaining)
+
+# ==================== WATCHER ====================
+
+def _ensure_watcher():
+    global _watcher
+    with _connections_lock:
+        if _watcher is None:
+            _watcher = threading.Thread(target=_watch, name="push-watcher", daemon=True)
+            _watcher.start()
+
+def _watch():
+    with _lock:
+        last_id = _db().execute("SELECT COALESCE(MAX(id), 0) FROM outbox").fetchone()[0]
+    purged = refreshed = time.monotonic()
+    while True:
+        _watch_event.wait(PushPollInterval)
+        _watch_event.clear()
+        try:
+            with _lock:
+                rows = _db().execute("SELECT id, device_id FROM outbox WHERE id > ? AND acked_at IS NULL", (last_id,)).fetchall()
+            if rows:
+                last_id = max(row[0] for row in rows)
+                devices = {row[1] for row in rows}
+                _notify(devices)
+                for device_id in devices:
+                    _deliver(device_id)
+            now = time.monotonic()
+            if now - refreshed >= PushPresenceRefresh:
+                refreshed = now
+                _refresh_presence()
+            if now - purged >= PushPurgeInterval:
+                purged = now
+                Purge()
+        except Exception as e:
+            log.error("Push watcher pass failed: %s", e)
+
+def Purge():
+    """Delete acked messages older than PushAckedRetention, expired ones and stale presence; returns rows removed"""
+    now = time.time()
+    with _lock:
+        db = _db()
+        removed = db.execute("DELETE FROM outbox WHERE (acked_at IS NOT NULL AND acked_at < ?) OR created_at < ?",
+                             (now - PushAckedRetention, now - PushMessageTTL)).rowcount
+        db.execute("DELETE FROM presence WHERE last_seen < ?", (now - PushPresenceRefresh * 2,))
+    if removed:
+        PushEvents.inc(removed, event="purged")
+    return removed
+
+# ==================== PRESENCE ====================
+
+def Touch(device_id, transport, force=False):
+    """Record presence, skipping the write when nothing changed within PushPresenceRefresh"""
+    now = time.time()
+    last = _touched.get(device_id)
+    if not force and last and last[0] == transport and now - last[1] < PushPresenceRefresh:
+        return
+    _touched[device_id] = (transport, now)
+    with _lock:
+        _db().execute("INSERT OR REPLACE INTO presence VALUES (?, ?, ?)", (device_id, transport, now))
+
+def _refresh_presence():
+    now = time.time()
+    with _connections_lock:
+        device_ids = list(_connections)
+    if not device_ids:
+        return
+    with _lock:
+        _db().executemany("INSERT OR REPLACE INTO presence VALUES (?, 'websocket', ?)", [(d, now) for d in device_ids])
+    for device_id in device_ids:
+        _touched[device_id] = ("websocket", now)
+
+def _disconnect(device_id):
+    _touched.pop(device_id, None)
+    with _lock:
+        _db().execute("DELETE FROM presence WHERE device_id = ?", (device_id,))
+
+def IsConnected(device_id):
+    """True if the device has an open WebSocket or an active long-poll on any worker"""
+    with _lock:
+        row = _db().execute("SELECT last_seen FROM presence WHERE device_id = ?", (device_id,)).fetchone()
+    return bool(row) and time.time() - row[0] < PushPresenceRefresh * 2
+
+# ==================== WEBSOCKETS ====================
+
+class _Connection:
+    def __init__(self, ws):
+        self.ws = ws
+        self.lock = threading.Lock()  # sends come from the watcher and the serving thread
+        self.sent = 0
+
+    def send(self, data):
+        with self.lock:
+            self.ws.send(json.dumps(data))
+
+def _deliver(device_id):
+    """Send a locally connected device everything pending that it has not been sent yet"""
+    with _connections_lock:
+        conn = _connections.get(device_id)
+    if conn is None:
+        return
+    try:
+        with conn.lock:
+            for message in Pending(device_id, conn.sent):
+                conn.ws.send(json.dumps({"type": "command", "id": message["id"],
+                                         "command": message["command"], "payload": message["payload"]}))
+                conn.sent = message["id"]
+    except Exception as e:
+        log.debug("Send to %s failed: %s", device_id, e)  # the serving thread sees the close
+
+def ServeWebSocket(ws, device_id):
+    """Drive one device's WebSocket: push pending commands, record acks, until the socket closes"""
+    log.info("Device %s connected over WebSocket", device_id)
+    conn = _Connection(ws)
+    with _connections_lock:
+        _connections[device_id] = conn
+    _ensure_watcher()
+    Touch(device_id, "websocket", force=True)
+    _deliver(device_id)
+    try:
+        while True:
+            raw = ws.receive()  # blocks; pushes are sent by the watcher
+            if raw is None:
+                break
+            try:
+                data = json.loads(raw)
+            except ValueError:
+                data = {}
+            if data.get("type") == "ack" and "id" in data:
+                Ack(device_id, data["id"], data.get("status", "ok"), data.get("result"))
+            elif data.get("type") == "ping":
+                conn.send({"type": "pong"})
+    finally:
+        with _connections_lock:
+            current = _connections.get(device_id) is conn
+            if current:
+                del _connections[device_id]
+        if current:
+            _disconnect(device_id)
+        log.info("Device %s disconnected", device_id)
@@ -1,20 +1,34 @@
 from googlesearch import search
-from groq import Groq
 from json import load, dump
 import datetime
 from dotenv import dotenv_values
 import os
+import re
+import time
+import threading
+import requests
+from bs4 import BeautifulSoup
+from concurrent.futures import wait
+from Backend.Metrics import span, RecordCache
+from Backend.Logger import GetLogger
+from Backend.Profiler import ProfiledExecutor
+from Backend.LLMGateway import CompleteSync
+
+log = GetLogger("search")
 
 # Load environment variables
 env_vars = dotenv_values(".env")
 Username = env_vars.get("Username")
 Assistantname = env_vars.get("Assistantname")
 GroqAPIKey = env_vars.get("GroqAPIKey")
-
-# Initialize Groq client
-
-
-client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+SearchBackendURL = env_vars.get("SearchBackendURL") or os.getenv("SEARCH_BACKEND_URL")  # e.g. a local fixture server for tests
+SearchCacheTTL = int(env_vars.get("SearchCacheTTL", 900))
+SearchHotCacheTTL = int(env_vars.get("SearchHotCacheTTL", 120))  # news, weather, scores, prices
+SearchDeadline = float(env_vars.get("SearchDeadline", 3.0))  # Total budget for fetching result pages
+SearchResults = 5
+SnippetChars = 600
+MaxSearchContextTokens = int(env_vars.get("MaxSearchContextTokens", 1200))
+MaxPromptTokens = int(env_vars.get("MaxPromptTokens", 3500))
 
 
 System = f"""Hello, I am {Username}, You are a very accurate and advanced AI chatbot named {Assistantname} which has real-time up-to-date information from the internet.
@@ -30,13 +44,133 @@ except:
         dump([], f)
     messages = []
 
+# ==================== SEARCH BACKENDS ====================
+
+def GoogleSearchBackend(query, num_results):
+    """Search Google and return a list of {title, description, url} results"""
+    return [
+        {"title": r.title, "description": r.description, "url": r.url}
+        for r in search(query, advanced=True, num_results=num_results)
+    ]
+
+def HTTPSearchBackend(base_url):
+    """Backend that asks a JSON endpoint (GET base_url?q=...&n=...) for results, e.g. a fixture server"""
+    def backend(query, num_results):
+        response = requests.get(base_url, params={"q": query, "n": num_results}, timeout=SearchDeadline)
+        response.raise_for_status()
+        return response.json()[:num_results]
+    return backend
+
+SearchBackend = HTTPSearchBackend(SearchBackendURL) if SearchBackendURL else GoogleSearchBackend
+
+def SetSearchBackend(backend):
+    """Swap the search backend (any callable(query, num_results) -> list of result dicts)"""
+    global SearchBackend
+    SearchBackend = backend
+    ClearSearchCache()
+
+# ==================== SEARCH CACHE ====================
+
+HOT_QUERY_WORDS = ["news", "weather", "score", "price", "stock", "live", "today", "latest"]
+
+_search_cache = {}
+_search_cache_lock = threading.Lock()
+_search_cache_size = 256
+
+def _cache_key(query):
+    return " ".join(re.sub(r"[^\w\s]", " ", query.lower()).split())
+
+def _cache_ttl(key):
+    return SearchHotCacheTTL if any(word in key.split() for word in HOT_QUERY_WORDS) else SearchCacheTTL
+
+def ClearSearchCache():
+    with _search_cache_lock:
+        _search_cache.clear()
+
+def _cache_get(key):
+    with _search_cache_lock:
+        entry = _search_cache.get(key)
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+        _search_cache.pop(key, None)
+    return None
+
+def _cache_put(key, value):
+    with _search_cache_lock:
+        if len(_search_cache) >= _search_cache_size:
+            now = time.monotonic()
+            for stale in [k for k, (expires, _) in _search_cache.items() if expires <= now]:
+                del _search_cache[stale]
+            if len(_search_cache) >= _search_cache_size:
+                del _search_cache[min(_search_cache, key=lambda k: _search_cache[k][0])]
+        _search_cache[key] = (time.monotonic() + _cache_ttl(key), value)
+
+# ==================== SNIPPET FETCHING ====================
+
+_fetch_pool = ProfiledExecutor(max_workers=SearchResults * 2, thread_name_prefix="search-fetch")
+
+def ExtractSnippet(html, limit=SnippetChars):
+    """Pull the readable text of a result page, preferring the meta description and body paragraphs"""
+    soup = BeautifulSoup(html, "html.parser")
+    for tag in soup(["script", "style", "noscript", "nav", "header", "footer", "form", "aside"]):
+        tag.decompose()
+
+    parts = []
+    meta = soup.find("meta", attrs={"name": "description"}) or soup.find("meta", attrs={"property": "og:description"})
+    if meta and meta.get("content"):
+        parts.append(meta["content"].strip())
+    for paragraph in soup.find_all("p"):
+        text = " ".join(paragraph.get_text(" ", strip=True).split())
+        if len(text) > 40:
+            parts.append(text)
+        if sum(len(part) for part in parts) >= limit:
+            break
+    return " ".join(parts)[:limit]
+
+def FetchSnippet(url, timeout):
+    response = requests.get(url, timeout=timeout, headers={"User-Agent": "Mozilla/5.0 (Nexon Server)"})
+    response.raise_for_status()
+    return ExtractSnippet(response.text)
+
+def FetchSnippets(results, deadline=SearchDeadline):
+    """Fetch all result pages at once; whatever has not arrived by the deadline is skipped"""
+    started = time.monotonic()
+    futures = {
+        _fetch_pool.submit(FetchSnippet, result["url"], deadline): index
+        for index, result in enumerate(results) if result.get("url")
+    }
+    done, _ = wait(futures, timeout=max(0.0, deadline - (time.monotonic() - started)))
+
+    snippets = {}
+    for future in done:
+        try:
+            snippets[futures[future]] = future.result()
+        except Exception as e:
+            log.debug("Skipped %s: %s", results[futures[future]].get("url"), e)
+    return snippets
+
 # Function to perform a Google search and format the results
 def GoogleSearch(query):
-    results = list(search(query, advanced=True, num_results=5))
+    key = _cache_key(query)
+    cached = _cache_get(key)
+    RecordCache("search", cached is not None)
+    if cached is not None:
+        return cached
+
+    with span("search_backend", upstream="search"):
+        results = SearchBackend(query, SearchResults)
+    with span("search_snippets"):
+        snippets = FetchSnippets(results)
+
     Answer = f"The search results for '{query}' are:\n[start]\n"
-    for i in results:
-        Answer += f"Title: {i.title}\nDescription: {i.description}\n\n"
+    for index, result in enumerate(results):
+        Answer += f"Title: {result.get('title')}\nDescription: {result.get('description')}\n"
+        if snippets.get(index):
+            Answer += f"Content: {snippets[index]}\n"
+        Answer += "\n"
     Answer += "[end]"
+
+    _cache_put(key, Answer)
     return Answer
 
 # Clean up and format the answer text
@@ -65,55 +199,68 @@ def Information():
     data += f"Time: {hour} hours, {minute} minutes, {second} seconds.\n"
     return data
 
-# Predefined system message
-SystemChatBot = [
+# ==================== PROMPT ASSEMBLY ====================
+
+def EstimateTokens(text):
+    """Cheap token estimate (~4 characters per token) used for prompt budgeting"""
+    return len(text) // 4 + 1
+
+# Predefined system messages, built once and never mutated
+SystemChatBot = (
     {"role": "system", "content": f"You are a helpful assistant named {Assistantname}."},
     {"role": "user", "content": "Hi"},
     {"role": "assistant", "content": "Hello, how can I help you?"}
-]
+)
+SystemChatBotTokens = sum(EstimateTokens(message["content"]) for message in SystemChatBot)
+
+def BoundSearchContext(context, budget=MaxSearchContextTokens):
+    """Trim search results to the token budget, cutting at a line boundary"""
+    if EstimateTokens(context) <= budget:
+        return context
+    trimmed = context[:budget * 4].rsplit("\n", 1)[0]
+    return trimmed + "\n[end]"
+
+def BoundHistory(history, budget):
+    """Keep the most recent chat turns that fit in the token budget"""
+    kept = []
+    used = 0
+    for message in reversed(history):
+        used += EstimateTokens(message["content"])
+        if used > budget:
+            break
+        kept.append(message)
+    kept.reverse()
+    return kept
+
+def BuildPrompt(prompt, history, search_context):
+    """
+    Assemble a fresh message list for one request from the static prefix and bounded context.
+    Search results get at most MaxSearchContextTokens and chat history gets whatever is left
+    of MaxPromptTokens, so the prompt size stays flat no matter how long the chat log grows.
+    """
+    search_message = {"role": "system", "content": BoundSearchContext(search_context)}
+    info_message = {"role": "system", "content": Information()}
+    user_message = {"role": "user", "content": prompt}
+    used = SystemChatBotTokens + sum(EstimateTokens(m["content"]) for m in (search_message, info_message, user_message))
+    return [*SystemChatBot, search_message, info_message, *BoundHistory(history, MaxPromptTokens - used), user_message]
 
 # Main function to process the query
 def RealtimeSearchEngine(prompt):
-    global SystemChatBot, messages
-
     # Load chat log
     with open(r"Data\ChatLog.json", "r") as f:
         messages = load(f)
 
-    messages.append({"role": "user", "content": prompt})
-
-    # Append Google search results to system messages
-    SystemChatBot.append({"role": "system", "content": GoogleSearch(prompt)})
-
-    # Get real-time information
-    real_time_info = {"role": "system", "content": Information()}
-
-    # Get response from Groq
-    completion = client.chat.completions.create(
-        model="llama3-70b-8192",
-        messages=SystemChatBot + [real_time_info] + messages,
-        temperature=0.7,
-        max_tokens=2048,
-        top_p=1,
-        stream=True,
-        stop=None
-    )
-
-    Answer = ""
-    for chunk in completion:
-        if chunk.choices[0].delta.content:
-            Answer += chunk.choices[0].delta.content
+    # Get response from Groq (through the gateway)
+    Answer = CompleteSync(BuildPrompt(prompt, messages, GoogleSearch(prompt)), max_tokens=2048)
 
     # Clean and save the answer
     Answer = Answer.strip().replace("</s>", "")
+    messages.append({"role": "user", "content": prompt})
     messages.append({"role": "assistant", "content": Answer})
 
     with open(r"Data\ChatLog.json", "w") as f:
         dump(messages, f, indent=4)
 
-    # Remove last system message to keep context clean
-    SystemChatBot.pop()
-
     return AnswerModifier(Answer)
 
 # Run as script
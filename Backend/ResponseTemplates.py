@@ -0,0 +1,162 @@
+# ======================== ResponseTemplates.py ========================
+# Spoken replies built from templates instead of ad hoc f-strings.
+# Every (locale, opcode) template is split into literal/field parts once at import, so rendering
+# is a single join with no per-request branching on language. Device commands are described
+# straight from their structured form (WireFormat.ParseCommand), whichever way they were written.
+# Locales other than English must use the same fields as the English template; that is
+# checked at import so a typo fails at startup, not in the middle of a reply.
+
+import re
+from string import Formatter
+from dotenv import dotenv_values
+from Backend.WireFormat import ParseCommand, COMMAND_FIELDS
+
+env_vars = dotenv_values(".env")
+DefaultLocale = env_vars.get("ResponseLocale", "en")
+
+TEMPLATES = {
+    "en": {
+        # replies from MainExecution
+        "open": "Opening {app} on your phone.",
+        "play_youtube": "Playing {title} on YouTube.",
+        "search_youtube": "Searching {query} on YouTube.",
+        "play_spotify": "Playing {query} on Spotify.",
+        "play_pc": "Playing {query} on your computer.",
+        "code": "Generated code for {description} and sent to your device.",
+        "general": "[General] {answer}",
+        "realtime": "[Realtime] {answer}",
+        "remember": "Okay, I'll remember that.",
+        "routine_saved": "Saved routine {name} with {steps} steps.",
+        "reminder_set": "Reminder set for {at}.",
+        "reminder_set_text": "Reminder set for {at}: {text}.",
+        "alarm_set": "Alarm set for {at}.",
+        "alarm_set_text": "Alarm set for {at}: {text}.",
+        "reminder_no_time": "At what time should I set the reminder?",
+        "alarm_no_time": "At what time should I set the alarm?",
+        "timer_no_device": "I can only set reminders and alarms on a registered device.",
+        "done": "Done.",
+        # device command descriptions for human_friendly_responses
+        "do_open": "open {app}",
+        "do_close": "close {app}",
+        "do_play": "play {query}",
+        "do_play_video": "play the video",
+        "do_code": "send code for {description}",
+        "do_google_search": "search Google for {query}",
+        "do_youtube_search": "search YouTube for {query}",
+        "do_content": "write about {topic}",
+        "do_brightness": "set brightness to {level}",
+        "do_volume": "turn volume {direction} to {level}",
+        "do_other": "{text}",
+        "phone_summary": "On your phone, I'll: {items}.",
+        "pc_summary": "On your computer: {items}.",
+        "no_tasks": "No valid tasks were found for your devices.",
+    },
+    "hi": {
+        "open": "आपके फ़ोन पर {app} खोल रहा हूँ।",
+        "play_youtube": "YouTube पर {title} चला रहा हूँ।",
+        "search_youtube": "YouTube पर {query} खोज रहा हूँ।",
+        "play_spotify": "Spotify पर {query} चला रहा हूँ।",
+        "play_pc": "आपके कंप्यूटर पर {query} चला रहा हूँ।",
+        "code": "{description} का कोड बनाकर आपके डिवाइस पर भेज दिया है।",
+        "general": "[General] {answer}",
+        "realtime": "[Realtime] {answer}",
+        "remember": "ठीक है, मैं यह याद रखूँगा।",
+        "routine_saved": "रूटीन {name} {steps} स्टेप्स के साथ सेव हो गया।",
+        "reminder_set": "{at} के लिए रिमाइंडर सेट हो गया।",
+        "reminder_set_text": "{at} के लिए रिमाइंडर सेट हो गया: {text}।",
+        "alarm_set": "{at} का अलार्म सेट हो गया।",
+        "alarm_set_text": "{at} का अलार्म सेट हो गया: {text}।",
+        "reminder_no_time": "रिमाइंडर किस समय के लिए सेट करूँ?",
+        "alarm_no_time": "अलार्म किस समय के लिए सेट करूँ?",
+        "timer_no_device": "रिमाइंडर और अलार्म सिर्फ़ रजिस्टर्ड डिवाइस पर सेट हो सकते हैं।",
+        "done": "हो गया।",
+        "do_open": "{app} खोलूँगा",
+        "do_close": "{app} बंद करूँगा",
+        "do_play": "{query} चलाऊँगा",
+        "do_play_video": "वीडियो चलाऊँगा",
+        "do_code": "{description} का कोड भेजूँगा",
+        "do_google_search": "Google पर {query} खोजूँगा",
+        "do_youtube_search": "YouTube पर {query} खोजूँगा",
+        "do_content": "{topic} के बारे में लिखूँगा",
+        "do_brightness": "ब्राइटनेस {level} करूँगा",
+        "do_volume": "वॉल्यूम {direction} करके {level} करूँगा",
+        "do_other": "{text}",
+        "phone_summary": "आपके फ़ोन पर मैं: {items}।",
+        "pc_summary": "आपके कंप्यूटर पर: {items}।",
+        "no_tasks": "आपके डिवाइस के लिए कोई सही काम नहीं मिला।",
+    },
+}
+
+# Commands as TranslateAndroidCommand writes them -> the opcode used for describing them
+COMMAND_ALIASES = {"app::open": "open", "media::play_song": "play", "device::brightness": "brightness", "device::volume": "volume"}
+ALIAS_FIELDS = {"brightness": ["level"], "volume": ["direction", "level"]}
+
+DEVANAGARI = re.compile(r"[ऀ-ॿ]")
+
+# ==================== COMPILATION ====================
+
+def _compile(template):
+    """Template -> tuple of (literal, field or None) parts"""
+    return tuple((literal, field) for literal, field, _, _ in Formatter().parse(template))
+
+def _fields(parts):
+    return {field for _, field in parts if field}
+
+_compiled = {}
+for _locale, _templates in TEMPLATES.items():
+    for _opcode, _template in _templates.items():
+        _compiled[(_locale, _opcode)] = _compile(_template)
+for (_locale, _opcode), _parts in _compiled.items():
+    _english = _compiled.get(("en", _opcode))
+    if _english is None or _fields(_parts) != _fields(_english):
+        raise ValueError(f"Template {_locale}/{_opcode} does not match the English fields")
+
+# ==================== RENDERING ====================
+
+def DetectLocale(text):
+    """Hindi when the query is written in Devanagari, otherwise ResponseLocale"""
+    return "hi" if text and DEVANAGARI.search(text) else DefaultLocale
+
+def Render(opcode, locale=DefaultLocale, **fields):
+    """Fill a precompiled template; unknown locales fall back to English"""
+    parts = _compiled.get((locale, opcode)) or _compiled[("en", opcode)]
+    return "".join(literal + (str(fields[field]) if field else "") for literal, field in parts)
+
+def _structured(command):
+    """Legacy decision or command string (or an already parsed dict) -> typed command dict"""
+    if isinstance(command, dict):
+        return command
+    command = command.strip()
+    for alias, op in COMMAND_ALIASES.items():
+        if command.startswith(alias + "::"):
+            values = command[len(alias) + 2:].split("::")
+            return {"op": op, **dict(zip(ALIAS_FIELDS.get(op) or COMMAND_FIELDS[op], values))}
+    if "::" not in command:
+        for op in COMMAND_FIELDS:
+            spoken = op.replace("_", " ") + " "
+            if command.lower().startswith(spoken):
+                return ParseCommand(f"{op}::{command[len(spoken):].strip()}")
+    return ParseCommand(command)
+
+def DescribeCommand(command, locale=DefaultLocale):
+    """Short phrase for one device command, e.g. 'open whatsapp'"""
+    parsed = _structured(command)
+    op = parsed["op"]
+    if op == "play" and "video_id" in parsed:
+        return Render("do_play_video", locale)
+    parts = _compiled.get(("en", f"do_{op}"))
+    if parts and _fields(parts) <= parsed.keys():
+        return Render(f"do_{op}", locale, **parsed)
+    # Unknown commands keep the rest of the string in one field; never speak the "::" separators
+    text = " ".join([op.replace("_", " ")] + [str(v).replace("::", " ") for k, v in parsed.items() if k != "op"])
+    return Render("do_other", locale, text=text)
+
+def DescribeTasks(device_tasks, locale=DefaultLocale):
+    """One sentence per device for {"android": [...], "pc": [...]}"""
+    responses = []
+    if device_tasks.get("android"):
+        items = ", ".join(DescribeCommand(command, locale) for command in device_tasks["android"])
+        responses.append(Render("phone_summary", locale, items=items))
+    if device_tasks.get("pc"):
+        responses.append(Render("pc_summary", locale, items=", ".join(device_tasks["pc"])))
+    return " ".join(responses) or Render("no_tasks", locale)
@@ -0,0 +1,126 @@
+# ======================== Routines.py ========================
+# Multi-command utterances as a plan of steps with dependencies instead of a flat list.
+# Steps that drive the phone's screen (open, play, type, scroll, close, ...) share the foreground,
+# so each waits for the previous one; everything else (chat, search, toggles, reminders, code)
+# runs alongside them. Named routines ("good morning") store the plan once and replay it
+# without going through FirstLayerDMM again. Routines are per owner, in Data/routines.sqlite3.
+
+import asyncio
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from dotenv import dotenv_values
+from Backend.Logger import GetLogger
+
+env_vars = dotenv_values(".env")
+RoutinesPath = env_vars.get("RoutinesPath") or os.getenv("ROUTINES_PATH") or "Data/routines.sqlite3"
+PlanConcurrency = int(env_vars.get("PlanConcurrency", 4))
+DEFAULT_OWNER = "default"
+
+# Decisions that act on whatever is in the foreground on the device
+FOREGROUND_PREFIXES = ("open", "close", "play", "content", "google search", "youtube search",
+                       "device_home", "device_scroll", "comms_")
+
+log = GetLogger("routines")
+
+_lock = threading.Lock()
+_conn = None
+
+# ==================== PLANS ====================
+
+def IsForeground(decision):
+    return decision.lower().strip().startswith(FOREGROUND_PREFIXES)
+
+def BuildPlan(decisions):
+    """
+    [{"id": i, "decision": str, "after": [ids]}] for the decisions in order.
+    Foreground steps form a chain; the rest have no dependencies.
+    """
+    plan, last_foreground = [], None
+    for i, decision in enumerate(decisions):
+        after = []
+        if IsForeground(decision):
+            if last_foreground is not None:
+                after.append(last_foreground)
+            last_foreground = i
+        plan.append({"id": i, "decision": decision, "after": after})
+    return plan
+
+def ValidatePlan(plan):
+    """Raise ValueError unless every dependency points at an earlier step (which also rules out cycles)"""
+    ids = set()
+    for i, step in enumerate(plan):
+        if step.get("id") != i or not isinstance(step.get("decision"), str):
+            raise ValueError(f"Step {i} needs 'id' == {i} and a 'decision' string")
+        if any(dep not in ids for dep in step.get("after", [])):
+            raise ValueError(f"Step {i} depends on a step that does not come before it")
+        ids.add(i)
+    return plan
+
+async def ExecutePlan(plan, run_step, concurrency=PlanConcurrency):
+    """
+    Run run_step(step) for every step once its dependencies are done; independent steps overlap
+    up to `concurrency`. Returns results in plan order. A failed step fails its dependents too.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    tasks = {}
+
+    async def run(step):
+        for dep in step.get("after", []):
+            await tasks[dep]  # re-raises the dependency's error
+        async with semaphore:
+            return await run_step(step)
+
+    for step in plan:
+        tasks[step["id"]] = asyncio.ensure_future(run(step))
+    return await asyncio.gather(*(tasks[step["id"]] for step in plan), return_exceptions=True)
+
+# ==================== NAMED ROUTINES ====================
+
+def NormalizeName(name):
+    return re.sub(r"\s+", " ", re.sub(r"[^\w\s]", "", name.lower())).strip()
+
+def _db():
+    global _conn
+    if _conn is None:
+        os.makedirs(os.path.dirname(RoutinesPath) or ".", exist_ok=True)
+        _conn = sqlite3.connect(RoutinesPath, timeout=10, check_same_thread=False, isolation_level=None)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute("""CREATE TABLE IF NOT EXISTS routines (
+            owner TEXT NOT NULL, name TEXT NOT NULL, title TEXT NOT NULL, source TEXT,
+            plan TEXT NOT NULL, updated_at REAL NOT NULL, PRIMARY KEY (owner, name))""")
+    return _conn
+
+def SaveRoutine(owner, name, plan, source=None):
+    """Store (or replace) a named plan; returns the normalized name"""
+    key = NormalizeName(name)
+    if not key:
+        raise ValueError("Routine name is empty")
+    ValidatePlan(plan)
+    with _lock:
+        _db().execute("INSERT OR REPLACE INTO routines VALUES (?, ?, ?, ?, ?, ?)",
+                      (owner or DEFAULT_OWNER, key, name.strip(), source, json.dumps(plan), time.time()))
+    log.info("Saved routine '%s' for %s with %d steps", key, owner, len(plan))
+    return key
+
+def GetRoutine(owner, name):
+    with _lock:
+        row = _db().execute("SELECT title, source, plan, updated_at FROM routines WHERE owner = ? AND name = ?",
+                            (owner or DEFAULT_OWNER, NormalizeName(name))).fetchone()
+    if row is None:
+        return None
+    return {"name": row[0], "source": row[1], "plan": json.loads(row[2]), "updated_at": row[3]}
+
+def ListRoutines(owner):
+    with _lock:
+        rows = _db().execute("SELECT title, source, updated_at FROM routines WHERE owner = ? ORDER BY name",
+                             (owner or DEFAULT_OWNER,)).fetchall()
+    return [{"name": title, "source": source, "updated_at": updated_at} for title, source, updated_at in rows]
+
+def DeleteRoutine(owner, name):
+    with _lock:
+        return bool(_db().execute("DELETE FROM routines WHERE owner = ? AND name = ?",
+                                  (owner or DEFAULT_OWNER, NormalizeName(name))).rowcount)
@@ -0,0 +1,301 @@
+# ======================== Scheduler.py ========================
+# Durable reminder / alarm timers that fire on the server and reach devices through the push hub.
+# Jobs live in SQLite (indexed by status and due time), so they survive restarts of the server
+# and of the phone. Each process keeps a min-heap of the jobs due within SchedulerHorizon and
+# refills it from the index, so scheduling is O(log n) and memory stays bounded however many
+# jobs exist. Firing is an atomic claim (UPDATE ... WHERE status = 'scheduled'), so several
+# gunicorn workers can run schedulers against the same file without double delivery.
+# Other workers' jobs are picked up incrementally (new ids, or the horizon moving forward),
+# never by re-reading everything that is already loaded.
+# Times in requests are read in the device's timezone (set_timezone), not the server's.
+# Time comes from a clock object; tests use ManualClock and advance() instead of sleeping.
+
+import heapq
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from dotenv import dotenv_values
+from Backend.Metrics import Counter
+from Backend.Logger import GetLogger
+
+env_vars = dotenv_values(".env")
+SchedulerPath = env_vars.get("SchedulerPath") or os.getenv("SCHEDULER_PATH") or "Data/scheduler.sqlite3"
+SchedulerHorizon = float(env_vars.get("SchedulerHorizon", 3600))  # seconds of upcoming jobs kept in memory
+SchedulerPollInterval = float(env_vars.get("SchedulerPollInterval", 5))  # picks up jobs added by other workers
+SchedulerTimezone = env_vars.get("SchedulerTimezone")  # for devices that never reported one; server local if unset
+SchedulerEnabled = (env_vars.get("SchedulerEnabled") or os.getenv("SCHEDULER_ENABLED") or "true").lower() == "true"
+
+JobEvents = Counter("nexon_scheduler_jobs_total", "Scheduler jobs by event", ["kind", "event"])
+
+log = GetLogger("scheduler")
+
+# ==================== CLOCKS ====================
+
+class SystemClock:
+    """Wall-clock time; waits are interruptible through the scheduler's event"""
+
+    def now(self):
+        return time.time()
+
+    def wait(self, event, timeout):
+        event.wait(max(0.0, timeout))
+
+class ManualClock:
+    """Clock for tests: time only moves on advance(), which wakes anything waiting on it"""
+
+    def __init__(self, start=0.0):
+        self._now = start
+        self._condition = threading.Condition()
+
+    def now(self):
+        with self._condition:
+            return self._now
+
+    def advance(self, seconds):
+        with self._condition:
+            self._now += seconds
+            self._condition.notify_all()
+
+    def wait(self, event, timeout):
+        with self._condition:
+            deadline = self._now + max(0.0, timeout)
+            self._condition.wait_for(lambda: event.is_set() or self._now >= deadline, 0.05)
+
+# ==================== SCHEDULER ====================
+
+class Scheduler:
+    """Heap of near-term jobs backed by a durable SQLite job table"""
+
+    def __init__(self, path=SchedulerPath, clock=None, dispatch=None):
+        self.path = path
+        self.clock = clock or SystemClock()
+        self.dispatch = dispatch or _push_dispatch
+        self._heap = []  # (due_at, job_id)
+        self._queued = set()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._loaded_until = float("-inf")
+        self._last_id = 0  # highest job id already considered by _refill
+        self._last_refill = float("-inf")
+        self._thread = None
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, device_id TEXT NOT NULL, kind TEXT NOT NULL,
+            text TEXT, due_at REAL NOT NULL, status TEXT NOT NULL DEFAULT 'scheduled',
+            created_at REAL NOT NULL, fired_at REAL)""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_due ON jobs (status, due_at)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_device ON jobs (device_id, status, due_at)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS timezones (device_id TEXT PRIMARY KEY, tz TEXT NOT NULL)")
+
+    # ---------- public API ----------
+
+    def schedule(self, device_id, kind, text, due_at):
+        """Persist a job and, if it is due soon, put it on the heap; returns the job id"""
+        with self._lock:
+            job_id = self._db.execute("INSERT INTO jobs (device_id, kind, text, due_at, created_at) VALUES (?, ?, ?, ?, ?)",
+                                      (device_id, kind, text, due_at, self.clock.now())).lastrowid
+            if due_at <= self._loaded_until:
+                self._push(due_at, job_id)
+        JobEvents.inc(kind=kind, event="scheduled")
+        self._wakeup.set()
+        return job_id
+
+    def cancel(self, job_id, device_id=None):
+        sql = "UPDATE jobs SET status = 'cancelled' WHERE id = ? AND status = 'scheduled'"
+        params = [job_id]
+        if device_id is not None:
+            sql += " AND device_id = ?"
+            params.append(device_id)
+        with self._lock:
+            return bool(self._db.execute(sql, params).rowcount)
+
+    def snooze(self, job_id, seconds, device_id=None):
+        """Fire a fired (or pending) job again `seconds` from now; returns the new job id or None"""
+        sql = "SELECT device_id, kind, text FROM jobs WHERE id = ? AND status IN ('scheduled', 'fired')"
+        params = [job_id]
+        if device_id is not None:
+            sql += " AND device_id = ?"
+            params.append(device_id)
+        with self._lock:
+            row = self._db.execute(sql, params).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE jobs SET status = 'snoozed' WHERE id = ?", (job_id,))
+        # A new row (and id) lets other workers' incremental refill see the new due time
+        return self.schedule(row[0], row[1], row[2], self.clock.now() + seconds)
+
+    def set_timezone(self, device_id, name):
+        """Remember the device's IANA timezone; raises ValueError for unknown names"""
+        try:
+            ZoneInfo(name)
+        except (ZoneInfoNotFoundError, ValueError) as e:
+            raise ValueError(f"Unknown timezone: {name}") from e
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO timezones VALUES (?, ?)", (device_id, name))
+
+    def timezone(self, device_id):
+        """The device's ZoneInfo, falling back to SchedulerTimezone (None means server local time)"""
+        with self._lock:
+            row = self._db.execute("SELECT tz FROM timezones WHERE device_id = ?", (device_id,)).fetchone()
+        name = row[0] if row else SchedulerTimezone
+        return ZoneInfo(name) if name else None
+
+    def jobs(self, device_id, status="scheduled"):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, device_id, kind, text, due_at, status, created_at, fired_at FROM jobs "
+                "WHERE device_id = ? AND status = ? ORDER BY due_at", (device_id, status)).fetchall()
+        keys = ("id", "device_id", "kind", "text", "due_at", "status", "created_at", "fired_at")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def run_due(self):
+        """Fire every job that is due now; returns how many this process claimed"""
+        fired = 0
+        now = self.clock.now()
+        if now + SchedulerHorizon / 2 > self._loaded_until or now - self._last_refill >= SchedulerPollInterval:
+            self._refill(now)
+        while True:
+            with self._lock:
+                if not self._heap or self._heap[0][0] > now:
+                    break
+                _, job_id = heapq.heappop(self._heap)
+                self._queued.discard(job_id)
+                claimed = self._db.execute("UPDATE jobs SET status = 'fired', fired_at = ? WHERE id = ? AND status = 'scheduled'",
+                                           (now, job_id)).rowcount
+                job = self._db.execute("SELECT device_id, kind, text, due_at FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if not claimed or job is None:
+                continue  # cancelled, or another worker got there first
+            device_id, kind, text, due_at = job
+            try:
+                self.dispatch(job_id, device_id, kind, text, due_at)
+                JobEvents.inc(kind=kind, event="fired")
+            except Exception as e:
+                JobEvents.inc(kind=kind, event="failed")
+                log.error("Dispatching job %s to %s failed: %s", job_id, device_id, e)
+            fired += 1
+        return fired
+
+    def next_due(self):
+        with self._lock:
+            return self._heap[0][0] if self._heap else None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="scheduler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+
+    # ---------- internals ----------
+
+    def _push(self, due_at, job_id):
+        if job_id not in self._queued:
+            self._queued.add(job_id)
+            heapq.heappush(self._heap, (due_at, job_id))
+
+    def _refill(self, now):
+        """
+        Load scheduled jobs that are not on the heap yet: those the horizon now reaches (the first
+        call also covers overdue ones after a restart) and those added since the last refill,
+        by any worker, that fall inside the loaded horizon.
+        """
+        until = now + SchedulerHorizon
+        with self._lock:
+            last_id = self._db.execute("SELECT COALESCE(MAX(id), 0) FROM jobs").fetchone()[0]
+            rows = []
+            if until > self._loaded_until:
+                rows += self._db.execute("SELECT id, due_at FROM jobs WHERE status = 'scheduled' AND due_at > ? AND due_at <= ?",
+                                         (self._loaded_until, until)).fetchall()
+            if last_id > self._last_id:
+                rows += self._db.execute("SELECT id, due_at FROM jobs WHERE id > ? AND id <= ? AND status = 'scheduled' AND due_at <= ?",
+                                         (self._last_id, last_id, min(until, self._loaded_until))).fetchall()
+            for job_id, due_at in rows:
+                self._push(due_at, job_id)
+            self._loaded_until = max(self._loaded_until, until)
+            self._last_id = last_id
+            self._last_refill = now
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_due()
+            except sqlite3.Error as e:
+                log.error("Scheduler pass failed: %s", e)
+            self._wakeup.clear()
+            next_due = self.next_due()
+            timeout = SchedulerPollInterval if next_due is None else min(SchedulerPollInterval, next_due - self.clock.now())
+            self.clock.wait(self._wakeup, timeout)
+
+def _push_dispatch(job_id, device_id, kind, text, due_at):
+    from Backend import PushHub
+    PushHub.Push(device_id, kind, {"job_id": job_id, "text": text, "due_at": due_at})
+
+# ==================== TIME PARSING ====================
+
+UNITS = {"second": 1, "sec": 1, "minute": 60, "min": 60, "hour": 3600, "hr": 3600, "day": 86400}
+
+def ParseWhen(text, now=None, tz=None):
+    """
+    Due time in a reminder/alarm request, as (unix_time, text_without_the_time) or None.
+    Understands "in/after 10 minutes", "at 5pm", "at 17:30", "tomorrow at 7 am";
+    clock times are read in `tz` (a tzinfo; server local time when None).
+    """
+    now = datetime.fromtimestamp(now if now is not None else time.time(), tz).astimezone(tz)
+    lowered = text.lower()
+
+    relative = re.search(r"\b(?:in|after)\s+(\d+)\s*(second|sec|minute|min|hour|hr|day)s?\b", lowered)
+    if relative:
+        due = now + timedelta(seconds=int(relative.group(1)) * UNITS[relative.group(2)])
+        return due.timestamp(), _strip(text, relative.span())
+
+    absolute = re.search(r"\b(tomorrow\s+)?at\s+(\d{1,2})(?::(\d{2}))?\s*(am|pm|a\.m\.|p\.m\.)?(\s+tomorrow)?\b", lowered)
+    if absolute:
+        hour, minute = int(absolute.group(2)), int(absolute.group(3) or 0)
+        meridiem = (absolute.group(4) or "").replace(".", "")
+        if meridiem == "pm" and hour < 12:
+            hour += 12
+        elif meridiem == "am" and hour == 12:
+            hour = 0
+        if hour > 23 or minute > 59:
+            return None
+        due = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if absolute.group(1) or absolute.group(5):
+            due += timedelta(days=1)
+        elif due <= now:
+            due += timedelta(days=1)
+        return due.timestamp(), _strip(text, absolute.span())
+    return None
+
+def _strip(text, span):
+    rest = (text[:span[0]] + text[span[1]:]).strip()
+    rest = re.sub(r"^(?:set\s+(?:a\s+)?(?:reminder|alarm)\s*(?:to|for)?|remind\s+me\s+(?:to)?)\s*", "", rest, flags=re.IGNORECASE)
+    return re.sub(r"\s+", " ", rest).strip(" .,")
+
+# ==================== DEFAULT INSTANCE ====================
+
+_default = None
+_default_lock = threading.Lock()
+
+def GetScheduler():
+    """Process-wide scheduler store; jobs only fire in processes that called StartScheduler()"""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = Scheduler()
+    return _default
+
+def StartScheduler():
+    """Start the firing thread when SchedulerEnabled; returns the scheduler, or None when disabled"""
+    if not SchedulerEnabled:
+        return None
+    return GetScheduler().start()
@@ -0,0 +1,105 @@
+# ======================== SingleFlight.py ========================
+# Coalesces concurrent identical upstream calls: the first caller for a key runs the call,
+# everyone arriving while it is in flight waits on the same future and gets the same
+# result or exception. Works across threads and across the per-request event loops
+# gunicorn workers create, because the shared future is a concurrent.futures.Future.
+
+import asyncio
+import functools
+import os
+import re
+import threading
+from concurrent.futures import Future
+from dotenv import dotenv_values
+from Backend.Metrics import RecordCache
+from Backend.Logger import GetLogger
+
+env_vars = dotenv_values(".env")
+SingleFlightTimeout = float(env_vars.get("SingleFlightTimeout") or os.getenv("SINGLE_FLIGHT_TIMEOUT") or 30)
+
+log = GetLogger("singleflight")
+
+def NormalizeKey(text):
+    """Case, whitespace and trailing punctuation insensitive key"""
+    text = re.sub(r"\s+", " ", str(text).lower()).strip()
+    return text.strip(" ?!.,")
+
+class SingleFlight:
+    """One in-flight call per key; followers wait up to `timeout` seconds for the leader"""
+
+    def __init__(self, name, timeout=SingleFlightTimeout, key=NormalizeKey):
+        self.name = name
+        self.timeout = timeout
+        self.key = key
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def _join(self, key):
+        """Return (future, is_leader) for key"""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                RecordCache(f"singleflight_{self.name}", True)
+                return future, False
+            future = self._calls[key] = Future()
+        RecordCache(f"singleflight_{self.name}", False)
+        return future, True
+
+    def _finish(self, key, future, result=None, error=None):
+        with self._lock:
+            self._calls.pop(key, None)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs) once for all concurrent callers with the same key"""
+        return self._do(self.key(key), fn, *args, **kwargs)
+
+    def _do(self, key, fn, *args, **kwargs):
+        future, leader = self._join(key)
+        if not leader:
+            log.debug("Joined in-flight %s call for %r", self.name, key)
+            return future.result(timeout=self.timeout)
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result)
+        return result
+
+    async def do_async(self, key, fn, *args, **kwargs):
+        """Async twin of do(); fn returns an awaitable"""
+        return await self._do_async(self.key(key), fn, *args, **kwargs)
+
+    async def _do_async(self, key, fn, *args, **kwargs):
+        future, leader = self._join(key)
+        if not leader:
+            log.debug("Joined in-flight %s call for %r", self.name, key)
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), self.timeout)
+        try:
+            result = await fn(*args, **kwargs)
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result)
+        return result
+
+    def _call_key(self, query, args, kwargs):
+        # The first argument is normalized; any further arguments (e.g. an owner) must match exactly
+        return (self.key(query), args, tuple(sorted(kwargs.items()))) if args or kwargs else self.key(query)
+
+    def wrap(self, fn):
+        """Decorate a sync or async function so calls are coalesced on their arguments"""
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(query, *args, **kwargs):
+                return await self._do_async(self._call_key(query, args, kwargs), fn, query, *args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(query, *args, **kwargs):
+            return self._do(self._call_key(query, args, kwargs), fn, query, *args, **kwargs)
+        return wrapper
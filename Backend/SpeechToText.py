@@ -133,6 +133,19 @@ import os
 import speech_recognition as sr
 from dotenv import dotenv_values
 import mtranslate as mt
+import audioop
+import collections
+import queue
+import shutil
+import subprocess
+import threading
+import time
+import wave
+from Backend.Metrics import timed
+from Backend.Logger import GetLogger
+from Backend.Profiler import ProfiledExecutor
+
+log = GetLogger("stt")
 
 
 # Get current working directory
@@ -145,6 +158,13 @@ TempDirPath = rf"{current_dir}/Forntend/Files"
 # Load environment variable for input language
 env_vars = dotenv_values(".env")
 InputLanguage = env_vars.get("InputLanguage", "en-IN")
+RecognizerBackend = env_vars.get("RecognizerBackend", "google")
+PhraseTimeLimit = float(env_vars.get("PhraseTimeLimit", 10))
+EndSilence = float(env_vars.get("EndSilence", 0.6))  # Seconds of silence that close an utterance
+PreRoll = float(env_vars.get("PreRoll", 0.3))  # Seconds kept from before speech starts
+StreamEnergyThreshold = float(env_vars.get("StreamEnergyThreshold", 300))
+StreamSampleRate = 16000
+ListenTimeout = float(env_vars.get("ListenTimeout", 30))  # SpeechRecognition() gives up (returns None) after this
 
 def QueryModifier(Query):
     new_query = Query.lower().strip()
@@ -171,32 +191,351 @@ def SetAssistantStatus(Status):
     with open(rf'{TempDirPath}/Status.data', "w", encoding='utf-8') as file:
         file.write(Status)
 
+@timed("speech_translation", upstream="mtranslate")
 def UniversalTranslator(Text):
     return mt.translate(Text, "eng", "auto").capitalize()
 
-def SpeechRecognition():
-    recognizer = sr.Recognizer()
-    with sr.Microphone() as source:
-        print("[Listening] Speak now...")
-        audio = recognizer.listen(source, timeout=10, phrase_time_limit=10)
-        try:
-            print("[Recognizing] Processing speech...")
-            text = recognizer.recognize_google(audio, language=InputLanguage)
-            print("[Heard] ->", text)
-
-            if "en" in InputLanguage.lower():
-                return QueryModifier(text)
+# ==================== RECOGNIZER BACKENDS ====================
+
+def GoogleBackend(recognizer, audio):
+    return recognizer.recognize_google(audio, language=InputLanguage)
+
+def SphinxBackend(recognizer, audio):
+    return recognizer.recognize_sphinx(audio)
+
+def VoskBackend(recognizer, audio):
+    import json
+    return json.loads(recognizer.recognize_vosk(audio)).get("text", "")
+
+def WhisperBackend(recognizer, audio):
+    return recognizer.recognize_whisper(audio, language=InputLanguage.split("-")[0])
+
+RecognizerBackends = {
+    "google": GoogleBackend,
+    "sphinx": SphinxBackend,
+    "vosk": VoskBackend,
+    "whisper": WhisperBackend
+}
+
+# ==================== VOICE ACTIVITY DETECTION ====================
+
+def SegmentUtterances(frames, sample_rate, sample_width, frame_samples, energy_threshold,
+                      end_silence=EndSilence, phrase_time_limit=PhraseTimeLimit, pre_roll=PreRoll,
+                      min_speech=0.15):
+    """
+    Cut a stream of raw PCM frames into utterances using an energy gate.
+    A ring buffer keeps the audio just before speech starts so word onsets are not clipped,
+    and an utterance is closed as soon as the trailing silence reaches end_silence.
+    """
+    frame_seconds = frame_samples / sample_rate
+    ring = collections.deque(maxlen=max(1, int(pre_roll / frame_seconds)))
+    utterance = []
+    voiced = 0
+    silent = 0
+
+    for frame in frames:
+        if not frame:
+            break
+        is_speech = audioop.rms(frame, sample_width) > energy_threshold
+
+        if not utterance:
+            if is_speech:
+                utterance = list(ring) + [frame]
+                ring.clear()
+                voiced, silent = 1, 0
             else:
-                return QueryModifier(UniversalTranslator(text))
+                ring.append(frame)
+            continue
 
+        utterance.append(frame)
+        if is_speech:
+            voiced += 1
+            silent = 0
+        else:
+            silent += 1
+
+        if silent * frame_seconds >= end_silence or len(utterance) * frame_seconds >= phrase_time_limit:
+            if voiced * frame_seconds >= min_speech:
+                yield b"".join(utterance)
+            utterance, voiced, silent = [], 0, 0
+
+    if utterance and voiced * frame_seconds >= min_speech:
+        yield b"".join(utterance)
+
+def ProcessTranscript(text):
+    """Normalize a raw transcript into a query the way the assistant expects it"""
+    if "en" in InputLanguage.lower():
+        return QueryModifier(text)
+    return QueryModifier(UniversalTranslator(text))
+
+# ==================== CAPTURE SERVICE ====================
+
+class SpeechCaptureService:
+    """
+    Long-running capture loop with a persistent recognizer.
+    Energy calibration happens once on start, utterances are cut by voice activity and
+    handed to a recognition thread so capture never waits on the recognizer backend.
+    Any speech_recognition AudioSource works, so sr.AudioFile can replay WAV fixtures.
+    While paused the microphone is still drained but fed to the segmenter as silence, and every
+    resume() starts a new generation, so speech heard between queries (including our own TTS)
+    is never returned as the next query.
+    """
+
+    def __init__(self, source=None, backend=None, energy_threshold=None, calibration=1.0,
+                 end_silence=EndSilence, phrase_time_limit=PhraseTimeLimit):
+        self.source = source
+        self.backend = backend or RecognizerBackends[RecognizerBackend]
+        self.recognizer = sr.Recognizer()
+        self.recognizer.dynamic_energy_threshold = False
+        if energy_threshold is not None:
+            self.recognizer.energy_threshold = energy_threshold
+        self.calibration = calibration
+        self.end_silence = end_silence
+        self.phrase_time_limit = phrase_time_limit
+        self.results = queue.Queue()
+        self._utterances = queue.Queue(maxsize=8)
+        self._stop = threading.Event()
+        self._active = threading.Event()
+        self._active.set()
+        self._generation = 0
+        self._threads = []
+
+    def start(self):
+        if self._threads:
+            return self
+        self.source = self.source or sr.Microphone()
+        self.source.__enter__()
+        if self.calibration:
+            self.recognizer.adjust_for_ambient_noise(self.source, duration=self.calibration)
+            log.info("Energy threshold calibrated to %.0f", self.recognizer.energy_threshold)
+        self._threads = [
+            threading.Thread(target=self._capture_loop, name="stt-capture", daemon=True),
+            threading.Thread(target=self._recognize_loop, name="stt-recognize", daemon=True)
+        ]
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout=2)
+        self._threads = []
+        try:
+            self.source.__exit__(None, None, None)
+        except Exception:
+            pass
+
+    def pause(self):
+        """Stop turning audio into queries until the next resume()"""
+        self._active.clear()
+
+    def resume(self):
+        """Listen again, discarding anything captured or recognized while paused"""
+        self._generation += 1
+        for pending in (self._utterances, self.results):
+            try:
+                while True:
+                    if pending.get_nowait() is None:
+                        pending.put(None)  # keep the end-of-source marker
+                        break
+            except queue.Empty:
+                pass
+        self._active.set()
+
+    def _frames(self):
+        while not self._stop.is_set():
+            frame = self.source.stream.read(self.source.CHUNK)
+            if frame and not self._active.is_set():
+                frame = b"\x00" * len(frame)  # closes any open utterance without adding to it
+            yield frame
+
+    def _capture_loop(self):
+        try:
+            for frame_data in SegmentUtterances(self._frames(), self.source.SAMPLE_RATE, self.source.SAMPLE_WIDTH,
+                                                self.source.CHUNK, self.recognizer.energy_threshold,
+                                                end_silence=self.end_silence,
+                                                phrase_time_limit=self.phrase_time_limit):
+                audio = sr.AudioData(frame_data, self.source.SAMPLE_RATE, self.source.SAMPLE_WIDTH)
+                self._utterances.put((self._generation, audio))
+        except Exception as e:
+            log.error("Capture stopped: %s", e)
+        finally:
+            self._utterances.put(None)
+
+    def _recognize_loop(self):
+        while True:
+            item = self._utterances.get()
+            if item is None:
+                self.results.put(None)
+                return
+            generation, audio = item
+            text = self.recognize(audio)
+            if text is not None:
+                self.results.put((generation, text))
+
+    def recognize(self, audio):
+        try:
+            log.debug("Processing speech...")
+            text = self.backend(self.recognizer, audio)
+            log.info("Heard -> %s", text)
+            return ProcessTranscript(text) if text else "Sorry, could not understand."
         except sr.UnknownValueError:
             return "Sorry, could not understand."
         except sr.RequestError:
             return "Network error."
+        except Exception as e:
+            log.error("Recognition failed: %s", e)
+            return None
+
+    def listen(self, timeout=None):
+        """Next query recognized since the last resume(), or None on timeout or once the source is exhausted"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            try:
+                item = self.results.get(timeout=None if deadline is None else max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                return None
+            if item is None:
+                self.results.put(None)  # stays exhausted for later calls
+                return None
+            generation, text = item
+            if generation == self._generation:
+                return text
+
+# ==================== STREAMED AUDIO (SERVER SIDE) ====================
+
+def _ffmpeg_decode(chunks, sample_rate):
+    """
+    Decode a compressed stream (Opus/Ogg/WebM) to mono s16le PCM while it is still arriving.
+    `chunks` is consumed on a feeder thread, so it must not depend on request-local state.
+    """
+    ffmpeg = shutil.which("ffmpeg")
+    if not ffmpeg:
+        raise ValueError("Compressed audio requires ffmpeg on the server")
+    process = subprocess.Popen(
+        [ffmpeg, "-loglevel", "error", "-i", "pipe:0", "-f", "s16le", "-ac", "1", "-ar", str(sample_rate), "pipe:1"],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE
+    )
+
+    errors = []
+
+    def feed():
+        try:
+            for chunk in chunks:
+                process.stdin.write(chunk)
+        except BrokenPipeError:
+            pass  # ffmpeg stopped reading; whatever it decoded is still returned
+        except Exception as e:
+            errors.append(e)  # re-raised in the caller, e.g. a failing upload stream
+        finally:
+            try:
+                process.stdin.close()
+            except OSError:
+                pass
+
+    feeder = threading.Thread(target=feed, daemon=True)
+    feeder.start()
+    try:
+        while True:
+            pcm = process.stdout.read(4096)
+            if not pcm:
+                break
+            yield pcm
+        feeder.join()
+        if errors:
+            raise errors[0]
+    finally:
+        feeder.join(timeout=1)
+        process.kill()
+        process.wait()
+
+def _wav_decode(chunks):
+    import io
+    with wave.open(io.BytesIO(b"".join(chunks)), "rb") as reader:
+        if reader.getnchannels() != 1:
+            raise ValueError("Only mono WAV audio is supported")
+        yield reader.getframerate(), reader.getsampwidth(), reader.readframes(reader.getnframes())
+
+def DecodeAudioStream(chunks, content_type, sample_rate=StreamSampleRate):
+    """
+    Turn an uploaded audio body into (sample_rate, sample_width, pcm_chunks).
+    Raw PCM (audio/l16, audio/pcm, application/octet-stream) is used as it arrives,
+    WAV is unpacked and Opus/Ogg/WebM is decoded through ffmpeg.
+    """
+    content_type = (content_type or "application/octet-stream").lower()
+    mime = content_type.split(";")[0].strip()
+    if mime in ("audio/l16", "audio/pcm", "application/octet-stream"):
+        for param in content_type.split(";")[1:]:
+            key, _, value = param.strip().partition("=")
+            if key == "rate" and value.isdigit():
+                sample_rate = int(value)
+        return sample_rate, 2, chunks
+    if mime in ("audio/wav", "audio/x-wav", "audio/wave"):
+        try:
+            rate, width, frames = next(_wav_decode(chunks))
+        except (wave.Error, EOFError) as e:
+            raise ValueError("Malformed WAV upload") from e
+        return rate, width, iter([frames])
+    if mime in ("audio/ogg", "audio/opus", "audio/webm"):
+        return sample_rate, 2, _ffmpeg_decode(chunks, sample_rate)
+    raise ValueError(f"Unsupported audio type: {mime}")
+
+def _reframe(chunks, frame_bytes):
+    """Regroup arbitrarily sized network chunks into fixed-size frames for the VAD"""
+    pending = b""
+    for chunk in chunks:
+        pending += chunk
+        while len(pending) >= frame_bytes:
+            yield pending[:frame_bytes]
+            pending = pending[frame_bytes:]
+    if pending:
+        yield pending
+
+_recognition_pool = ProfiledExecutor(max_workers=4, thread_name_prefix="stt-batch")
+
+def TranscribeStream(pcm_chunks, sample_rate=StreamSampleRate, sample_width=2, backend=None):
+    """
+    Segment a streamed PCM body into utterances and recognize them together.
+    Recognition of each utterance starts as soon as it is cut, so later audio is still
+    being received while earlier speech is already being recognized.
+    Returns the combined query after QueryModifier/UniversalTranslator, or None.
+    """
+    backend = backend or RecognizerBackends[RecognizerBackend]
+    recognizer = sr.Recognizer()
+    frame_samples = int(sample_rate * 0.03)
+
+    def recognize(frame_data):
+        try:
+            return backend(recognizer, sr.AudioData(frame_data, sample_rate, sample_width))
+        except sr.UnknownValueError:
+            return ""
+
+    futures = [
+        _recognition_pool.submit(recognize, frame_data)
+        for frame_data in SegmentUtterances(_reframe(pcm_chunks, frame_samples * sample_width), sample_rate,
+                                            sample_width, frame_samples, StreamEnergyThreshold)
+    ]
+    text = " ".join(part.strip() for part in (future.result() for future in futures) if part and part.strip())
+    log.info("Heard -> %s", text)
+    return ProcessTranscript(text) if text else None
+
+_capture_service = None
+
+def SpeechRecognition(timeout=ListenTimeout):
+    """Next spoken query, or None if nothing was said within timeout seconds"""
+    global _capture_service
+    if _capture_service is None:
+        _capture_service = SpeechCaptureService().start()
+        print("[Listening] Speak now...")
+    _capture_service.resume()
+    try:
+        return _capture_service.listen(timeout)
+    finally:
+        _capture_service.pause()
 
 # Main execution block
 if __name__ == "__main__":
     while True:
         result = SpeechRecognition()
         print("Query:", result)
-
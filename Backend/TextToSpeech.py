@@ -90,62 +90,187 @@
 import asyncio
 import edge_tts
 import os
+import hashlib
+import threading
 from playsound import playsound
 import random
 from dotenv import dotenv_values
+from Backend.Metrics import RecordCache
+from Backend.Logger import GetLogger
+
+log = GetLogger("tts")
 
 # Load environment variable
 env_vars = dotenv_values(".env")
 AssistantVoice = env_vars.get("AssistantVoice", "en-IN-NeerjaNeural")  # Fallback voice
+VoicePitch = "+5Hz"
+VoiceRate = "+13%"
+
+# Phrase cache (rendered mp3 files keyed by voice, pitch, rate and text).
+# Fixed phrases live in a pinned subdirectory that eviction never touches; everything else
+# shares the LRU limits below.
+PhraseCacheDir = env_vars.get("TTSCacheDir", "Data/TTSCache")
+PinnedCacheDir = os.path.join(PhraseCacheDir, "pinned")
+PhraseCacheMaxFiles = int(env_vars.get("TTSCacheMaxFiles", 500))
+PhraseCacheMaxBytes = int(env_vars.get("TTSCacheMaxBytes", 50 * 1024 * 1024))
+PrewarmTTS = env_vars.get("PrewarmTTS", "true").lower() == "true"
+
+ChatScreenMessages = [
+    "The rest of the result has been printed to the chat screen, kindly check it out sir.",
+    "The rest of the text is now on the chat screen, sir, please check it.",
+    "You can see the rest of the text on the chat screen, sir.",
+    "The remaining part of the text is now on the chat screen, sir.",
+    "Sir, you'll find more text on the chat screen for you to see.",
+    "The rest of the answer is now on the chat screen, sir.",
+    "Sir, please look at the chat screen, the rest of the answer is there.",
+    "You'll find the complete answer on the chat screen, sir.",
+    "The next part of the text is on the chat screen, sir.",
+    "Sir, please check the chat screen for more information.",
+    "There's more text on the chat screen for you, sir.",
+    "Sir, take a look at the chat screen for additional text.",
+    "You'll find more to read on the chat screen, sir.",
+    "Sir, check the chat screen for the rest of the text.",
+    "The chat screen has the rest of the text, sir.",
+    "There's more to see on the chat screen, sir, please look.",
+    "Sir, the chat screen holds the continuation of the text.",
+    "You'll find the complete answer on the chat screen, kindly check it out sir.",
+    "Please review the chat screen for the rest of the text, sir.",
+    "Sir, look at the chat screen for the complete answer."
+]
+
+_cache_lock = threading.Lock()
+_fixed_phrases = None
+_prewarm_thread = None
 
 async def TextToAudioFile(text, file_path="Data/speech.mp3"):
     if os.path.exists(file_path):
         os.remove(file_path)
-    communicate = edge_tts.Communicate(text, voice=AssistantVoice, pitch='+5Hz', rate='+13%')
+    communicate = edge_tts.Communicate(text, voice=AssistantVoice, pitch=VoicePitch, rate=VoiceRate)
     await communicate.save(file_path)
 
-def TTS(text, func=lambda r=None: True):
-    file_path = "Data/speech.mp3"
+# ==================== PHRASE CACHE ====================
+
+def IsFixedPhrase(text):
+    global _fixed_phrases
+    if _fixed_phrases is None:
+        _fixed_phrases = {phrase.strip() for phrase in FixedPhrases()}
+    return text.strip() in _fixed_phrases
+
+def PhraseCachePath(text, voice=None, pitch=VoicePitch, rate=VoiceRate):
+    """Return the cache file path for a (voice, pitch, rate, text) combination"""
+    key = "\x1f".join([voice or AssistantVoice, pitch, rate, text.strip()])
+    digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+    return os.path.join(PinnedCacheDir if IsFixedPhrase(text) else PhraseCacheDir, f"{digest}.mp3")
+
+def EvictPhraseCache():
+    """Drop least recently used entries until the cache fits its limits (pinned phrases are exempt)"""
+    with _cache_lock:
+        try:
+            entries = [entry for entry in os.scandir(PhraseCacheDir) if entry.name.endswith(".mp3")]
+        except FileNotFoundError:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        total_bytes = sum(entry.stat().st_size for entry in entries)
+        while entries and (len(entries) > PhraseCacheMaxFiles or total_bytes > PhraseCacheMaxBytes):
+            oldest = entries.pop(0)
+            total_bytes -= oldest.stat().st_size
+            try:
+                os.remove(oldest.path)
+            except FileNotFoundError:
+                pass
+
+async def CachedAudioFile(text):
+    """Return a path to the rendered audio for text, synthesizing it only on a cache miss"""
+    file_path = PhraseCachePath(text)
+    if os.path.exists(file_path):
+        try:
+            os.utime(file_path)  # Mark as recently used
+        except FileNotFoundError:
+            pass
+        else:
+            RecordCache("tts_phrase", True)
+            return file_path
+
+    RecordCache("tts_phrase", False)
+
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    temp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
     try:
-        asyncio.run(TextToAudioFile(text, file_path))
-        playsound(file_path)
+        communicate = edge_tts.Communicate(text, voice=AssistantVoice, pitch=VoicePitch, rate=VoiceRate)
+        await communicate.save(temp_path)
+        os.replace(temp_path, file_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+    if not IsFixedPhrase(text):
+        EvictPhraseCache()
+    return file_path
+
+def FixedPhrases():
+    """Phrases that are spoken often enough to be rendered ahead of time"""
+    from Backend.Andriod_Automation import SUPPORTED_APPS
+    from Backend.ResponseTemplates import Render
+
+    phrases = list(ChatScreenMessages)
+    for app in SUPPORTED_APPS:
+        phrases.append(f"Opening {app.capitalize()}")
+        phrases.append(Render("open", app=app.capitalize()))
+    phrases += [Render("no_tasks"), Render("done")]
+    return phrases
+
+async def _prewarm(phrases, concurrency=4):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def render(phrase):
+        async with semaphore:
+            try:
+                await CachedAudioFile(phrase)
+            except Exception as e:
+                log.warning("Failed to prewarm '%s': %s", phrase, e)
+
+    await asyncio.gather(*(render(phrase) for phrase in phrases))
+
+def PrewarmPhraseCache(phrases=None):
+    """Render the fixed phrases into the cache so they play without an edge-tts round trip"""
+    phrases = [p for p in (phrases or FixedPhrases()) if not os.path.exists(PhraseCachePath(p))]
+    if phrases:
+        asyncio.run(_prewarm(phrases))
+    return len(phrases)
+
+def StartPrewarm():
+    """Prewarm the fixed phrases in the background; call once at startup (no-op if PrewarmTTS is off)"""
+    global _prewarm_thread
+    if PrewarmTTS and _prewarm_thread is None:
+        _prewarm_thread = threading.Thread(target=PrewarmPhraseCache, name="tts-prewarm", daemon=True)
+        _prewarm_thread.start()
+    return _prewarm_thread
+
+async def _render_all(texts):
+    return await asyncio.gather(*(CachedAudioFile(text) for text in texts))
+
+def SpeakClips(texts, func=lambda r=None: True):
+    """Speak clips back to back; all of them are rendered (or found cached) before the first plays"""
+    try:
+        for file_path in asyncio.run(_render_all(texts)):
+            playsound(file_path)
         func()
     except Exception as e:
-        print(f"[TTS Error] {e}")
+        log.error("TTS failed: %s", e)
 
-def TextToSpeech(Text, func=lambda r=None: True):
-    messages = [
-            "The rest of the result has been printed to the chat screen, kindly check it out sir.",
-            "The rest of the text is now on the chat screen, sir, please check it.",
-            "You can see the rest of the text on the chat screen, sir.",
-            "The remaining part of the text is now on the chat screen, sir.",
-            "Sir, you'll find more text on the chat screen for you to see.",
-            "The rest of the answer is now on the chat screen, sir.",
-            "Sir, please look at the chat screen, the rest of the answer is there.",
-            "You'll find the complete answer on the chat screen, sir.",
-            "The next part of the text is on the chat screen, sir.",
-            "Sir, please check the chat screen for more information.",
-            "There's more text on the chat screen for you, sir.",
-            "Sir, take a look at the chat screen for additional text.",
-            "You'll find more to read on the chat screen, sir.",
-            "Sir, check the chat screen for the rest of the text.",
-            "The chat screen has the rest of the text, sir.",
-            "There's more to see on the chat screen, sir, please look.",
-            "Sir, the chat screen holds the continuation of the text.",
-            "You'll find the complete answer on the chat screen, kindly check it out sir.",
-            "Please review the chat screen for the rest of the text, sir.",
-            "Sir, look at the chat screen for the complete answer."
-    ]
+def TTS(text, func=lambda r=None: True):
+    SpeakClips([text], func)
 
+def TextToSpeech(Text, func=lambda r=None: True):
     if len(Text.split(".")) > 4 and len(Text) >= 250:
-        part = " ".join(Text.split(".")[0:2]) + ". " + random.choice(messages)
-        TTS(part, func)
+        # The chat-screen suffix is a separate clip so it comes from the pinned cache
+        SpeakClips([" ".join(Text.split(".")[0:2]) + ".", random.choice(ChatScreenMessages)], func)
     else:
         TTS(Text, func)
 
 # CLI Test Execution
 if __name__ == "__main__":
+    StartPrewarm()
     while True:
         user_input = input("Enter the text: ")
         TextToSpeech(user_input)
-
@@ -0,0 +1,101 @@
+# ======================== WireFormat.py ========================
+# Structured encodings for the device command list.
+# Legacy clients get device_command as "op::arg;op::arg". Clients that ask for it (Accept or
+# X-Command-Format) get a typed list instead, as JSON or MessagePack:
+#   [{"op": "open", "app": "whatsapp"}, {"op": "play", "video_id": "..."},
+#    {"op": "code", "description": "...", "artifact_id": "..."}, {"op": "google_search", "query": "..."}]
+# Large string fields (generated code) are zlib-compressed into "<field>_z" when that pays off;
+# JSON carries the compressed bytes as base64.
+
+import base64
+import json
+import zlib
+from dotenv import dotenv_values
+
+try:
+    import msgpack
+except ImportError:  # MessagePack is optional; such clients get structured JSON instead
+    msgpack = None
+
+env_vars = dotenv_values(".env")
+WireCompressThreshold = int(env_vars.get("WireCompressThreshold", 1024))
+
+LEGACY = "legacy"
+JSON = "json"
+MSGPACK = "msgpack"
+
+JSON_MIMETYPE = "application/vnd.nexon.commands+json"
+MSGPACK_MIMETYPE = "application/msgpack"
+
+# op -> names of the "::"-separated fields after it; the last field takes the rest of the string
+COMMAND_FIELDS = {
+    "open": ["app"],
+    "close": ["app"],
+    "play": ["query"],
+    "code": ["description", "code"],
+    "google_search": ["query"],
+    "youtube_search": ["query"],
+    "content": ["topic"]
+}
+COMPRESSIBLE = {"code"}
+
+def ParseCommand(command):
+    """One legacy 'op::field::rest' command as a typed dict"""
+    op, _, rest = command.partition("::")
+    fields = COMMAND_FIELDS.get(op, ["arg"])
+    values = rest.split("::", len(fields) - 1) if rest else []
+    parsed = {"op": op}
+    if op == "play" and rest.startswith("video_id::"):
+        parsed["video_id"] = rest[len("video_id::"):]
+        return parsed
+    if op == "code" and len(values) == 2 and values[1].startswith("artifact::"):
+        parsed["description"] = values[0]
+        parsed["artifact_id"] = values[1][len("artifact::"):]
+        return parsed
+    for name, value in zip(fields, values):
+        parsed[name] = value
+    return parsed
+
+def _compress(parsed, binary):
+    for field in COMPRESSIBLE & parsed.keys():
+        raw = parsed[field].encode("utf-8")
+        if len(raw) < WireCompressThreshold:
+            continue
+        packed = zlib.compress(raw, 6)
+        if len(packed) < len(raw):
+            del parsed[field]
+            parsed[f"{field}_z"] = packed if binary else base64.b64encode(packed).decode("ascii")
+    return parsed
+
+def EncodeCommands(commands, fmt=JSON):
+    """Legacy command strings -> typed command dicts for the given format"""
+    return [_compress(ParseCommand(command), fmt == MSGPACK) for command in commands]
+
+def Negotiate(headers):
+    """Pick legacy, json or msgpack from X-Command-Format or Accept"""
+    requested = (headers.get("X-Command-Format") or "").lower()
+    accept = (headers.get("Accept") or "").lower()
+    if requested == MSGPACK or MSGPACK_MIMETYPE in accept:
+        return MSGPACK if msgpack else JSON
+    if requested == JSON or JSON_MIMETYPE in accept:
+        return JSON
+    return LEGACY
+
+def Shape(response_data, fmt):
+    """
+    Turn an internal answer (tts_text, device_command, commands=[legacy strings]) into what the
+    client asked for: legacy keeps device_command, structured formats carry typed commands.
+    """
+    data = dict(response_data)
+    commands = data.pop("commands", None)
+    if fmt == LEGACY or commands is None:
+        return data
+    data.pop("device_command", None)
+    data["commands"] = EncodeCommands(commands, fmt)
+    return data
+
+def Serialize(data, fmt):
+    """(body, mimetype) for a shaped response"""
+    if fmt == MSGPACK:
+        return msgpack.packb(data, use_bin_type=True), MSGPACK_MIMETYPE
+    return json.dumps(data, separators=(",", ":")), JSON_MIMETYPE if fmt == JSON else "application/json"
@@ -0,0 +1,124 @@
+# ======================== YouTubeCache.py ========================
+# Persistent song -> video cache for get_youtube_video_id plus a daily quota budget.
+# Every search().list call costs 100 of the project's daily YouTube Data API units, so
+# repeat plays are answered from here and searches stop before the budget runs out.
+# SQLite keeps both the cache and the quota counter consistent across gunicorn workers.
+
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from dotenv import dotenv_values
+from fuzzywuzzy import fuzz, process
+from Backend.Logger import GetLogger
+
+env_vars = dotenv_values(".env")
+YouTubeCachePath = env_vars.get("YouTubeCachePath", "Data/YouTubeCache.sqlite3")
+YouTubeCacheTTL = float(env_vars.get("YouTubeCacheTTL", 30 * 24 * 3600))
+YouTubeDailyQuota = int(env_vars.get("YouTubeDailyQuota", 10000))
+YouTubeQuotaReserve = int(env_vars.get("YouTubeQuotaReserve", 500))  # left for anything else using the key
+YouTubeFuzzyCutoff = int(env_vars.get("YouTubeFuzzyCutoff", 95))
+SEARCH_COST = 100
+
+# Words that don't change which video a play request means
+SONG_FILLERS = ["play", "please", "the", "a", "by", "on", "youtube", "song", "songs", "video", "official",
+                "lyrics", "lyric", "audio", "full", "hd", "music", "gaana", "gana"]
+
+log = GetLogger("youtube")
+
+try:
+    from zoneinfo import ZoneInfo
+    QUOTA_TZ = ZoneInfo("America/Los_Angeles")  # YouTube quotas reset at midnight Pacific
+except Exception:
+    QUOTA_TZ = timezone.utc
+
+_lock = threading.Lock()
+_conn = None
+_index = None
+
+def NormalizeSong(name):
+    """Cache key for a song request: lowercase, fillers and punctuation removed"""
+    name = re.sub(r"[^a-z0-9 ]", " ", str(name).lower())
+    words = [word for word in name.split() if word not in SONG_FILLERS]
+    return " ".join(words)
+
+def _db():
+    global _conn
+    if _conn is None:
+        os.makedirs(os.path.dirname(YouTubeCachePath) or ".", exist_ok=True)
+        _conn = sqlite3.connect(YouTubeCachePath, timeout=10, check_same_thread=False, isolation_level=None)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute("CREATE TABLE IF NOT EXISTS videos (song TEXT PRIMARY KEY, video_id TEXT NOT NULL, title TEXT, resolved_at REAL NOT NULL)")
+        _conn.execute("CREATE TABLE IF NOT EXISTS quota (day TEXT PRIMARY KEY, used INTEGER NOT NULL)")
+    return _conn
+
+def _shape(key):
+    """Fuzzy matches stay within the same word count and the same numbers ("perfect 2" != "perfect")"""
+    words = key.split()
+    return len(words), tuple(word for word in words if word.isdigit())
+
+def _songs(shape):
+    """Resolved songs with the given shape (index loaded lazily, extended on Store)"""
+    global _index
+    if _index is None:
+        _index = {}
+        for (song,) in _db().execute("SELECT song FROM videos"):
+            _index.setdefault(_shape(song), set()).add(song)
+    return _index.setdefault(shape, set())
+
+# ==================== CACHE ====================
+
+def Lookup(song, allow_stale=False):
+    """
+    (video_id, title) for a song from the cache, or None. Keys match exactly after normalization;
+    a fuzzy match (YouTubeFuzzyCutoff) only catches typos between keys of the same shape.
+    """
+    key = NormalizeSong(song)
+    if not key:
+        return None
+    with _lock:
+        row = _db().execute("SELECT video_id, title, resolved_at FROM videos WHERE song = ?", (key,)).fetchone()
+        if row is None:
+            match = process.extractOne(key, _songs(_shape(key)), scorer=fuzz.ratio, score_cutoff=YouTubeFuzzyCutoff)
+            if match:
+                log.debug("Fuzzy cache match %r → %r (%d)", key, match[0], match[1])
+                row = _db().execute("SELECT video_id, title, resolved_at FROM videos WHERE song = ?", (match[0],)).fetchone()
+    if row is None:
+        return None
+    if not allow_stale and time.time() - row[2] > YouTubeCacheTTL:
+        return None
+    return row[0], row[1]
+
+def Store(song, video_id, title):
+    key = NormalizeSong(song)
+    if not key or not video_id:
+        return
+    with _lock:
+        _db().execute("INSERT OR REPLACE INTO videos (song, video_id, title, resolved_at) VALUES (?, ?, ?, ?)",
+                      (key, video_id, title, time.time()))
+        _songs(_shape(key)).add(key)
+
+# ==================== QUOTA ====================
+
+def _today():
+    return datetime.now(QUOTA_TZ).strftime("%Y-%m-%d")
+
+def QuotaUsed():
+    with _lock:
+        row = _db().execute("SELECT used FROM quota WHERE day = ?", (_today(),)).fetchone()
+    return row[0] if row else 0
+
+def ChargeQuota(cost=SEARCH_COST):
+    """Reserve `cost` units of today's budget; False when that would exceed it"""
+    limit = YouTubeDailyQuota - YouTubeQuotaReserve
+    day = _today()
+    with _lock:
+        db = _db()
+        db.execute("INSERT OR IGNORE INTO quota (day, used) VALUES (?, 0)", (day,))
+        charged = db.execute("UPDATE quota SET used = used + ? WHERE day = ? AND used + ? <= ?",
+                             (cost, day, cost, limit)).rowcount
+    if not charged:
+        log.warning("YouTube daily quota budget (%d units) exhausted", limit)
+    return bool(charged)
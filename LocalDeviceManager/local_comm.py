@@ -1,11 +1,24 @@
 import json
 import requests
 import os
+from Backend import DeviceRegistry
 
 class LocalDeviceManager:
-    def __init__(self, device_file='device_list.json'):
-        with open(device_file, 'r') as f:
-            self.devices = json.load(f)
+    def __init__(self, device_file=None):
+        if device_file:
+            with open(device_file, 'r') as f:
+                self.devices = json.load(f)
+        else:
+            # Same shape as device_list.json, read from the device registry
+            self.devices = {
+                device["name"] or device["device_id"]: {
+                    "ip": device["address"],
+                    "type": device["type"],
+                    "interface": device["interface"],
+                    "commands": device["capabilities"]
+                }
+                for device in DeviceRegistry.ListDevices()
+            }
 
     def send_command(self, device_name, command):
         device = self.devices.get(device_name)
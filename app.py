@@ -1,11 +1,55 @@
-from flask import Flask, request, jsonify
-from test_model import MainExecution
-import os
-import json
-from difflib import get_close_matches
+from flask import Flask, request, jsonify, g, Response, send_file
+from test_model import MainExecution, BatchExecution, MaxBatchSize
+from Backend.SpeechToText import DecodeAudioStream, TranscribeStream
+from Backend.Metrics import span, RequestLatency, RenderMetrics
+from Backend.Logger import GetLogger, NewRequestId, RequestId
+from Backend.Profiler import ShouldProfile, HasProfileToken, ProfileRequest, RunProfiled, ListProfiles, ProfilePath
+from Backend import DeviceRegistry
+from Backend import PushHub
+from Backend import WireFormat
+from Backend import Compression
+from Backend import CodeArtifacts
+from Backend import Scheduler
+from Backend import Routines
+from Backend.Model import FirstLayerDMM
+import time
 import asyncio
 
+try:
+    from flask_sock import Sock
+except ImportError:  # WebSocket push is optional; devices can long-poll /push/<device_id>/poll
+    Sock = None
+
 app = Flask(__name__)
+sock = Sock(app) if Sock else None
+log = GetLogger("app")
+
+Scheduler.StartScheduler()  # every enabled worker runs one; claims keep a job from firing twice
+
+@app.before_request
+def start_timer():
+    g.request_started = time.perf_counter()
+    NewRequestId(request.headers.get("X-Request-Id"))
+
+@app.after_request
+def record_request_latency(response):
+    started = g.pop("request_started", None)
+    if started is not None and request.endpoint != "metrics":
+        RequestLatency.observe(time.perf_counter() - started, endpoint=request.endpoint or "unknown", status=response.status_code)
+    response.headers["X-Request-Id"] = RequestId.get()
+    return response
+
+# Read endpoints that get a content-hash ETag (get_device_apps sets its catalog version itself)
+ETAG_ENDPOINTS = {"home", "get_device", "list_profiles", "push_status", "list_routines", "get_routine"}
+
+@app.after_request
+def compress_response(response):
+    return Compression.Finalize(request, response, ETAG_ENDPOINTS)
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    return Response(RenderMetrics(), mimetype="text/plain; version=0.0.4")
+
 @app.route("/", methods=["GET"])
 def home():
     return jsonify({"message": "Nexon Server is running. Use /ask to interact."})
@@ -21,76 +65,363 @@ def receive_device_apps():
     if not device_id:
         return jsonify({"error": "Missing device_id"}), 400
 
-    apps = request.json
-    os.makedirs("device_apps", exist_ok=True)
+    # Versioned protocol: If-None-Match / {"hash"} checks, {"base_version", "add", "remove"} deltas,
+    # anything else is a full {app name: package} list as before
+    current = DeviceRegistry.AppsVersion(device_id)
+    if current and current in Compression.ClientETags(request.headers.get("If-None-Match")):
+        return Response(status=304, headers={"ETag": f'"{current}"'})
+
+    apps = request.get_json(silent=True)
+    if not isinstance(apps, dict):
+        return jsonify({"error": "Expected an {app name: package} object"}), 400
     try:
-        with open(f"device_apps/{device_id}.json", "w") as f:
-            json.dump(apps, f, indent=4)
-        return jsonify({"status": "App list received"}), 200
+        if set(apps) == {"hash"}:
+            if apps["hash"] == current:
+                return Response(status=304, headers={"ETag": f'"{current}"'})
+            return jsonify({"status": "stale", "version": current}), 409
+        if "base_version" in apps and set(apps) <= {"base_version", "add", "remove"}:
+            add, remove = apps.get("add") or {}, apps.get("remove") or []
+            if not isinstance(add, dict) or not isinstance(remove, list):
+                return jsonify({"error": "'add' must be an object and 'remove' a list"}), 400
+            try:
+                version = DeviceRegistry.ApplyAppsDelta(device_id, apps["base_version"], add, remove)
+            except DeviceRegistry.VersionConflict as conflict:
+                return jsonify({"status": "stale", "version": conflict.current}), 409
+            return jsonify({"status": "App list updated", "version": version}), 200
+        version = DeviceRegistry.SaveApps(device_id, apps)
+        return jsonify({"status": "App list received", "version": version}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @app.route('/get_device_apps/<device_id>', methods=['GET'])
 def get_device_apps(device_id):
-    try:
-        with open(f"device_apps/{device_id}.json", "r") as f:
-            return jsonify(json.load(f))
-    except:
+    # Revalidation needs only the stored version, not the catalog itself
+    version = DeviceRegistry.AppsVersion(device_id)
+    if version and version in Compression.ClientETags(request.headers.get("If-None-Match")):
+        return Response(status=304, headers={"ETag": f'"{version}"'})
+    apps = DeviceRegistry.GetApps(device_id)
+    if apps is None:
+        return jsonify({"error": "Device not found"}), 404
+    response = jsonify(apps)
+    response.headers["ETag"] = f'"{DeviceRegistry.CatalogVersion(apps)}"'
+    return response
+
+@app.route("/devices/<device_id>", methods=["POST"])
+def register_device(device_id):
+    """Devices report their address, interface and capabilities here"""
+    data = request.get_json(silent=True) or {}
+    DeviceRegistry.RegisterDevice(
+        device_id,
+        name=data.get("name"),
+        address=data.get("address") or request.remote_addr,
+        type=data.get("type"),
+        interface=data.get("interface"),
+        capabilities=data.get("capabilities")
+    )
+    if data.get("timezone"):
+        try:
+            Scheduler.GetScheduler().set_timezone(device_id, data["timezone"])
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+    return jsonify(DeviceRegistry.GetDevice(device_id)), 200
+
+@app.route("/devices/<device_id>", methods=["GET"])
+def get_device(device_id):
+    device = DeviceRegistry.GetDevice(device_id)
+    if device is None:
         return jsonify({"error": "Device not found"}), 404
+    return jsonify(device)
+
+# ==================== PUSH CHANNEL ====================
+
+if sock:
+    @sock.route("/ws/<device_id>")
+    def device_socket(ws, device_id):
+        PushHub.ServeWebSocket(ws, device_id)
+
+@app.route("/push/<device_id>/poll", methods=["GET"])
+def poll_push(device_id):
+    """Long-poll fallback for devices without WebSocket support"""
+    after = request.args.get("after", default=0, type=int)
+    timeout = min(request.args.get("timeout", default=25.0, type=float), 30.0)
+    return jsonify({"messages": PushHub.WaitForMessages(device_id, after, timeout)})
+
+@app.route("/push/<device_id>/ack", methods=["POST"])
+def ack_push(device_id):
+    data = request.get_json(silent=True) or {}
+    if "id" not in data:
+        return jsonify({"error": "Missing 'id'"}), 400
+    if not PushHub.Ack(device_id, data["id"], data.get("status", "ok"), data.get("result")):
+        return jsonify({"error": "Message not found"}), 404
+    return jsonify({"status": "acked"}), 200
+
+@app.route("/push/<device_id>", methods=["POST"])
+def push_to_device(device_id):
+    """Queue a server-initiated command; with "wait" seconds, return once the device acks"""
+    data = request.get_json(silent=True) or {}
+    if not data.get("command"):
+        return jsonify({"error": "Missing 'command'"}), 400
+    message_id = PushHub.Push(device_id, data["command"], data.get("payload"))
+    if data.get("wait"):
+        return jsonify(PushHub.WaitForAck(message_id, min(float(data["wait"]), 30.0))), 200
+    return jsonify({"id": message_id}), 202
+
+@app.route("/push", methods=["POST"])
+def push_broadcast():
+    data = request.get_json(silent=True) or {}
+    device_ids = data.get("device_ids")
+    if not data.get("command") or not isinstance(device_ids, list) or not device_ids:
+        return jsonify({"error": "Need 'command' and a non-empty 'device_ids' list"}), 400
+    return jsonify({"ids": PushHub.Broadcast(device_ids, data["command"], data.get("payload"))}), 202
+
+@app.route("/push/messages/<int:message_id>", methods=["GET"])
+def push_status(message_id):
+    message = PushHub.GetMessage(message_id)
+    if message is None:
+        return jsonify({"error": "Message not found"}), 404
+    return jsonify(message)
+
+@app.route("/reminders/<device_id>", methods=["GET"])
+def list_reminders(device_id):
+    status = request.args.get("status", "scheduled")
+    return jsonify({"jobs": Scheduler.GetScheduler().jobs(device_id, status)})
+
+@app.route("/reminders/<device_id>", methods=["POST"])
+def create_reminder(device_id):
+    """
+    Schedule a reminder/alarm from {"kind", "text", "due_at"} or a spoken {"when": "tomorrow at 7 am ..."},
+    read in the device's timezone (an optional "timezone" is stored for the device first)
+    """
+    data = request.get_json(silent=True) or {}
+    kind = data.get("kind", "reminder")
+    if kind not in ("reminder", "alarm"):
+        return jsonify({"error": "'kind' must be 'reminder' or 'alarm'"}), 400
+    scheduler = Scheduler.GetScheduler()
+    if data.get("timezone"):
+        try:
+            scheduler.set_timezone(device_id, data["timezone"])
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+    text, due_at = data.get("text", ""), data.get("due_at")
+    if due_at is None and data.get("when"):
+        when = Scheduler.ParseWhen(data["when"], tz=scheduler.timezone(device_id))
+        if when:
+            due_at, text = when[0], text or when[1]
+    try:
+        due_at = float(due_at)
+    except (TypeError, ValueError):
+        return jsonify({"error": "Need a numeric 'due_at' or a parseable 'when'"}), 400
+    job_id = scheduler.schedule(device_id, kind, text or kind.capitalize(), due_at)
+    return jsonify({"id": job_id, "due_at": due_at}), 201
+
+@app.route("/reminders/<device_id>/<int:job_id>/snooze", methods=["POST"])
+def snooze_reminder(device_id, job_id):
+    """Fire a reminder/alarm again after {"minutes": 10} (the default)"""
+    data = request.get_json(silent=True) or {}
+    try:
+        minutes = float(data.get("minutes", 10))
+    except (TypeError, ValueError):
+        return jsonify({"error": "'minutes' must be a number"}), 400
+    new_id = Scheduler.GetScheduler().snooze(job_id, minutes * 60, device_id)
+    if new_id is None:
+        return jsonify({"error": "Reminder not found"}), 404
+    return jsonify({"id": new_id}), 201
+
+@app.route("/reminders/<device_id>/<int:job_id>", methods=["DELETE"])
+def cancel_reminder(device_id, job_id):
+    if not Scheduler.GetScheduler().cancel(job_id, device_id):
+        return jsonify({"error": "Reminder not found or already fired"}), 404
+    return jsonify({"status": "cancelled"}), 200
+
+@app.route("/routines/<device_id>", methods=["GET"])
+def list_routines(device_id):
+    return jsonify({"routines": Routines.ListRoutines(device_id)})
+
+@app.route("/routines/<device_id>", methods=["POST"])
+def save_routine(device_id):
+    """Store a named routine from {"name", "query"} (parsed once), {"name", "steps"} or an explicit {"name", "plan"}"""
+    data = request.get_json(silent=True) or {}
+    if not data.get("name"):
+        return jsonify({"error": "Missing 'name'"}), 400
+    if isinstance(data.get("plan"), list):
+        plan = data["plan"]
+    elif isinstance(data.get("steps"), list):
+        plan = Routines.BuildPlan(data["steps"])
+    elif data.get("query"):
+        plan = Routines.BuildPlan(FirstLayerDMM(data["query"]))
+    else:
+        return jsonify({"error": "Need 'query', 'steps' or 'plan'"}), 400
+    try:
+        name = Routines.SaveRoutine(device_id, data["name"], plan, data.get("query"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"name": name, "plan": plan}), 201
+
+@app.route("/routines/<device_id>/<name>", methods=["GET"])
+def get_routine(device_id, name):
+    routine = Routines.GetRoutine(device_id, name)
+    if routine is None:
+        return jsonify({"error": "Routine not found"}), 404
+    return jsonify(routine)
+
+@app.route("/routines/<device_id>/<name>", methods=["DELETE"])
+def delete_routine(device_id, name):
+    if not Routines.DeleteRoutine(device_id, name):
+        return jsonify({"error": "Routine not found"}), 404
+    return jsonify({"status": "deleted"}), 200
 
 def find_best_app_match(spoken_cmd, device_id):
-    json_path = f"device_apps/{device_id}.json"
-    if not os.path.exists(json_path):
-        return None
-    with open(json_path, 'r') as file:
-        data = json.load(file)
-    app_list = list(data.keys())
     spoken_cmd = spoken_cmd.lower().strip()
     if spoken_cmd.startswith("open "):
         target_app = spoken_cmd.replace("open ", "").strip()
     else:
         return None
-    matches = get_close_matches(target_app, [app.lower() for app in app_list], n=1, cutoff=0.6)
-    if matches:
-        best_match = matches[0]
-        for app in app_list:
-            if app.lower() == best_match:
-                return app
-    return None
-
-@app.route("/ask", methods=["POST"])
-def ask_jarvis():
-    data = request.get_json()
-    if not data or 'query' not in data:
-        return jsonify({"error": "Missing 'query'"}), 400
+    return DeviceRegistry.MatchApp(device_id, target_app)
 
-    query = data['query']
-    device_id = data.get('device_id', None)
-
-    print(f"[DEBUG] Received query from device: {device_id} → {query}")
+async def resolve_query(query, device_id):
+    """Run a query through app matching and MainExecution, returning (response_data, status)"""
+    log.debug("Received query from device: %s → %s", device_id, query)
 
     # Smart app open logic
-    best_app = find_best_app_match(query, device_id) if device_id else None
+    with span("app_match"):
+        best_app = find_best_app_match(query, device_id) if device_id else None
     if best_app:
         response_data = {
             "tts_text": f"Opening {best_app.capitalize()}",
-            "device_command": f"open::{best_app}"
+            "device_command": f"open::{best_app}",
+            "commands": [f"open::{best_app}"]
         }
-        print("[DEBUG] App match found, returning:", response_data)
-        return jsonify(response_data), 200
+        log.debug("App match found, returning: %s", response_data)
+        return response_data, 200
 
     # Fallback to MainExecution
     try:
-        final_output, device_action = asyncio.run(MainExecution(query, device_id))
+        final_output, device_action = await MainExecution(query, device_id)
     except Exception as e:
-        return jsonify({"error": f"Internal error during execution: {e}"}), 500
+        return {"error": f"Internal error during execution: {e}"}, 500
 
-    print("[DEBUG] device_action returned from MainExecution:", device_action)
+    log.debug("device_action returned from MainExecution: %s", device_action)
     response_data = {
         "tts_text": device_action.get("tts_text", final_output or "Done."),
-        "device_command": device_action.get("device_command", "")
+        "device_command": device_action.get("device_command", ""),
+        "commands": device_action.get("commands", [])
     }
-    print("[DEBUG] Returning:", response_data)
-    return jsonify(response_data), 200
+    log.debug("Returning: %s", response_data)
+    return response_data, 200
+
+def answer_query(query, device_id):
+    return asyncio.run(RunProfiled(resolve_query(query, device_id)))
+
+def render_answer(response_data, status, fmt):
+    """Response in the negotiated command format (legacy JSON unless the client asked otherwise)"""
+    body, mimetype = WireFormat.Serialize(WireFormat.Shape(response_data, fmt), fmt)
+    response = Response(body, status=status, mimetype=mimetype)
+    response.headers["Vary"] = "Accept, X-Command-Format"
+    return response
+
+@app.route("/ask", methods=["POST"])
+def ask_jarvis():
+    data = request.get_json()
+    if not data or 'query' not in data:
+        return jsonify({"error": "Missing 'query'"}), 400
+
+    with ProfileRequest(ShouldProfile(request.headers)) as profile:
+        response_data, status = answer_query(data['query'], data.get('device_id', None))
+    response = render_answer(response_data, status, WireFormat.Negotiate(request.headers))
+    if profile["name"]:
+        response.headers["X-Profile-Id"] = profile["name"]
+    return response
+
+@app.route("/ask_batch", methods=["POST"])
+def ask_batch():
+    """Answer several {"query", "device_id"} items in one call; results keep the request order"""
+    data = request.get_json(silent=True)
+    items = data.get("items") if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "Missing 'items'"}), 400
+    if len(items) > MaxBatchSize:
+        return jsonify({"error": f"Too many items (max {MaxBatchSize})"}), 413
+
+    fmt = WireFormat.Negotiate(request.headers)
+    results = [None] * len(items)
+    runnable = []
+    for index, item in enumerate(items):
+        if isinstance(item, dict) and isinstance(item.get("query"), str) and item["query"].strip():
+            runnable.append(index)
+        else:
+            results[index] = {"status": 400, "error": "Missing 'query'"}
+
+    outcomes = asyncio.run(BatchExecution(
+        [(items[index]["query"], items[index].get("device_id")) for index in runnable],
+        handler=resolve_query
+    ))
+    for index, outcome in zip(runnable, outcomes):
+        if isinstance(outcome, Exception):
+            log.error("Batch item %d failed: %s", index, outcome)
+            results[index] = {"status": 500, "error": f"Internal error during execution: {outcome}"}
+        else:
+            response_data, status = outcome
+            results[index] = {"status": status, **WireFormat.Shape(response_data, fmt)}
+    body, mimetype = WireFormat.Serialize({"results": results}, fmt)
+    return Response(body, status=200, mimetype=mimetype)
+
+@app.route("/artifacts/<artifact_id>", methods=["GET"])
+def get_artifact(artifact_id):
+    """Generated program by artifact id; ?raw=1 returns just the source"""
+    artifact = CodeArtifacts.GetArtifact(artifact_id)
+    if artifact is None:
+        return jsonify({"error": "Artifact not found"}), 404
+    # Ids are content hashes, so an artifact never changes; each representation gets its own tag
+    if request.args.get("raw"):
+        response = Response(artifact["code"], mimetype="text/x-python")
+        response.set_etag(f"{artifact_id}-raw")
+    else:
+        response = jsonify(artifact)
+        response.set_etag(artifact_id)
+    response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    return response
+
+# Stored profiles expose source paths and function names: same token as starting one
+@app.route("/profiles", methods=["GET"])
+def list_profiles():
+    if not HasProfileToken(request.headers):
+        return jsonify({"error": "Forbidden"}), 403
+    return jsonify(ListProfiles())
+
+@app.route("/profiles/<name>", methods=["GET"])
+def download_profile(name):
+    if not HasProfileToken(request.headers):
+        return jsonify({"error": "Forbidden"}), 403
+    path = ProfilePath(name)
+    if not path:
+        return jsonify({"error": "Profile not found"}), 404
+    return send_file(path, mimetype="text/plain" if name.endswith(".collapsed") else "application/json", as_attachment=True)
+
+def _request_chunks(stream, chunk_size=4096):
+    """Body chunks from an already resolved stream; the ffmpeg feeder reads it off the request thread"""
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+@app.route("/ask_audio", methods=["POST"])
+def ask_audio():
+    """Accept raw PCM, WAV or Opus audio, transcribe it and answer it like /ask"""
+    device_id = request.args.get("device_id") or request.headers.get("X-Device-Id")
+    sample_rate = request.args.get("rate", type=int) or 16000
+
+    try:
+        rate, width, pcm_chunks = DecodeAudioStream(_request_chunks(request.stream), request.content_type, sample_rate)
+        query = TranscribeStream(pcm_chunks, rate, width)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 415
+    except Exception as e:
+        return jsonify({"error": f"Speech recognition failed: {e}"}), 502
 
+    if not query:
+        return jsonify({"error": "Could not understand audio"}), 422
 
+    response_data, status = answer_query(query, device_id)
+    response_data["transcript"] = query
+    return render_answer(response_data, status, WireFormat.Negotiate(request.headers))
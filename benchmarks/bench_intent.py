@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Intent Pipeline Benchmark
+Replays a corpus of utterances through FirstLayerDMM, TranslateAndroidCommand and
+PC_Automation.TranslateCommand and reports per-stage latency percentiles, throughput
+and allocations. Cohere, Groq and the translator are stubbed so it runs offline.
+
+Usage:
+    python benchmarks/bench_intent.py                  # run and compare with baseline.json
+    python benchmarks/bench_intent.py --save-baseline  # record a new baseline on this machine
+    python benchmarks/bench_intent.py --rebuild-corpus # regenerate corpus.json from the test scripts
+"""
+
+import argparse
+import ast
+import contextlib
+import gc
+import io
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+CORPUS_FILE = os.path.join(BENCH_DIR, "corpus.json")
+BASELINE_FILE = os.path.join(BENCH_DIR, "baseline.json")
+
+# Scripts whose query lists seed the corpus
+SEED_SCRIPTS = [
+    "test_enhanced_model.py",
+    "test_multiple_commands.py",
+    "test_logic.py",
+    "test_basic_structure.py",
+    "demo_concept.py",
+    "simple_test.py"
+]
+
+HINDI_TEMPLATES = ["{} karo", "{} kar do", "zara {} karo", "{} chalao", "please {} kar do na"]
+CONJUNCTIONS = [" and ", " then ", " also ", " & "]
+
+# ==================== OFFLINE STUBS ====================
+
+def install_stubs():
+    """Replace the network-bound SDKs with instant in-process stand-ins"""
+
+    class CohereClient:
+        def __init__(self, *args, **kwargs):
+            pass
+
+        async def chat_stream(self, message="", **kwargs):
+            yield types.SimpleNamespace(event_type="text-generation", text=f"general {message}")
+
+    class _Completions:
+        async def create(self, **kwargs):
+            delta = types.SimpleNamespace(content="```python\nprint('stub')\n```")
+
+            async def stream():
+                yield types.SimpleNamespace(choices=[types.SimpleNamespace(delta=delta)])
+            return stream()
+
+    class GroqClient:
+        def __init__(self, *args, **kwargs):
+            self.chat = types.SimpleNamespace(completions=_Completions())
+
+    class GoogleTranslator:
+        def __init__(self, *args, **kwargs):
+            pass
+
+        def translate(self, text, **kwargs):
+            return text
+
+    cohere = types.ModuleType("cohere")
+    cohere.AsyncClient = CohereClient
+    groq = types.ModuleType("groq")
+    groq.AsyncGroq = GroqClient
+    deep_translator = types.ModuleType("deep_translator")
+    deep_translator.GoogleTranslator = GoogleTranslator
+    sys.modules.update({"cohere": cohere, "groq": groq, "deep_translator": deep_translator})
+
+# ==================== CORPUS ====================
+
+def _string_lists(path):
+    """Yield (name, strings) for every list-of-strings literal assigned in a script"""
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=path)
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Assign) and isinstance(node.value, ast.List) and node.value.elts:
+            if all(isinstance(e, ast.Constant) and isinstance(e.value, str) for e in node.value.elts):
+                for target in node.targets:
+                    if isinstance(target, ast.Name):
+                        yield target.id, [e.value for e in node.value.elts]
+        elif isinstance(node, ast.Assign) and isinstance(node.value, ast.Constant) and isinstance(node.value.value, str):
+            for target in node.targets:
+                if isinstance(target, ast.Name) and target.id.startswith("test_query"):
+                    yield target.id, [node.value.value]
+
+def BuildCorpus(seed=42):
+    """Collect the utterances used by the ad-hoc test scripts and add synthetic variants"""
+    rng = random.Random(seed)
+    corpus = []
+    seen = set()
+
+    def add(utterance, source, kind):
+        if utterance.lower() not in seen:
+            seen.add(utterance.lower())
+            corpus.append({"utterance": utterance, "source": source, "kind": kind})
+
+    for script in SEED_SCRIPTS:
+        path = os.path.join(ROOT, script)
+        if not os.path.exists(path):
+            continue
+        for name, strings in _string_lists(path):
+            if "quer" not in name:
+                continue
+            for utterance in strings:
+                add(utterance, f"{script}:{name}", "seed")
+
+    singles = [item["utterance"] for item in corpus if not any(c in item["utterance"] for c in CONJUNCTIONS)]
+
+    # Synthetic multi-command utterances (2-4 commands)
+    for _ in range(60):
+        parts = rng.sample(singles, rng.randint(2, 4))
+        add(rng.choice(CONJUNCTIONS).join(parts), "synthetic", "multi")
+
+    # Synthetic Hindi/Hinglish variants
+    for utterance in rng.sample(singles, min(40, len(singles))):
+        add(rng.choice(HINDI_TEMPLATES).format(utterance), "synthetic", "hindi")
+
+    return corpus
+
+def LoadCorpus(rebuild=False):
+    if rebuild or not os.path.exists(CORPUS_FILE):
+        corpus = BuildCorpus()
+        with open(CORPUS_FILE, "w", encoding="utf-8") as f:
+            json.dump(corpus, f, indent=2, ensure_ascii=False)
+        print(f"[BENCH] Wrote {len(corpus)} utterances to {CORPUS_FILE}")
+        return corpus
+    with open(CORPUS_FILE, encoding="utf-8") as f:
+        return json.load(f)
+
+# ==================== MEASUREMENT ====================
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+def measure_stage(fn, inputs, repeat, warmup):
+    """Time fn over every input and sample its allocations in a separate traced pass"""
+    sink = io.StringIO()
+    with contextlib.redirect_stdout(sink):
+        for value in inputs[:warmup]:
+            fn(value)
+
+        gc.collect()
+        latencies = []
+        started = time.perf_counter()
+        for _ in range(repeat):
+            for value in inputs:
+                t0 = time.perf_counter_ns()
+                fn(value)
+                latencies.append(time.perf_counter_ns() - t0)
+                sink.seek(0)
+                sink.truncate()
+        elapsed = time.perf_counter() - started
+
+        peaks = []
+        blocks = []
+        tracemalloc.start()
+        for value in inputs:
+            before_blocks = len(tracemalloc.take_snapshot().traces) if len(peaks) < 20 else None
+            tracemalloc.reset_peak()
+            current, _ = tracemalloc.get_traced_memory()
+            fn(value)
+            _, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - current)
+            if before_blocks is not None:
+                blocks.append(len(tracemalloc.take_snapshot().traces) - before_blocks)
+            sink.seek(0)
+            sink.truncate()
+        tracemalloc.stop()
+
+    latencies.sort()
+    us = [value / 1000 for value in latencies]
+    return {
+        "calls": len(latencies),
+        "p50_us": round(percentile(us, 50), 2),
+        "p90_us": round(percentile(us, 90), 2),
+        "p99_us": round(percentile(us, 99), 2),
+        "max_us": round(us[-1], 2) if us else 0.0,
+        "throughput_per_s": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "alloc_peak_bytes_mean": round(sum(peaks) / len(peaks)) if peaks else 0,
+        "alloc_peak_bytes_max": max(peaks) if peaks else 0,
+        "retained_blocks_mean": round(sum(blocks) / len(blocks), 1) if blocks else 0.0
+    }
+
+def RunBenchmark(corpus, repeat=20, warmup=20):
+    sys.path.insert(0, ROOT)
+    install_stubs()
+    with contextlib.redirect_stdout(io.StringIO()):
+        from Backend.Model import FirstLayerDMM
+        from Backend.Andriod_Automation import TranslateAndroidCommand
+        from Backend.PC_Automation import TranslateCommand
+
+    utterances = [item["utterance"] for item in corpus]
+    with contextlib.redirect_stdout(io.StringIO()):
+        decisions = [FirstLayerDMM(utterance) for utterance in utterances]
+
+    stages = {
+        "FirstLayerDMM": (FirstLayerDMM, utterances),
+        "TranslateAndroidCommand": (TranslateAndroidCommand, decisions),
+        "PC.TranslateCommand": (TranslateCommand, decisions)
+    }
+    return {name: measure_stage(fn, inputs, repeat, warmup) for name, (fn, inputs) in stages.items()}
+
+# ==================== REPORTING ====================
+
+def PrintReport(results, baseline=None):
+    header = f"{'stage':<26}{'p50 us':>10}{'p90 us':>10}{'p99 us':>10}{'ops/s':>11}{'peak B':>10}"
+    print(header)
+    print("-" * len(header))
+    for stage, r in results.items():
+        print(f"{stage:<26}{r['p50_us']:>10}{r['p90_us']:>10}{r['p99_us']:>10}"
+              f"{r['throughput_per_s']:>11}{r['alloc_peak_bytes_mean']:>10}")
+        if baseline and stage in baseline:
+            b = baseline[stage]
+            print(f"{'  vs baseline':<26}{_ratio(r['p50_us'], b['p50_us']):>10}{_ratio(r['p90_us'], b['p90_us']):>10}"
+                  f"{_ratio(r['p99_us'], b['p99_us']):>10}{_ratio(r['throughput_per_s'], b['throughput_per_s']):>11}"
+                  f"{_ratio(r['alloc_peak_bytes_mean'], b['alloc_peak_bytes_mean']):>10}")
+
+def _ratio(current, previous):
+    return f"x{current / previous:.2f}" if previous else "n/a"
+
+def FindRegressions(results, baseline, tolerance):
+    """Return human-readable regressions beyond the tolerance ratio"""
+    regressions = []
+    for stage, r in results.items():
+        b = baseline.get(stage)
+        if not b:
+            continue
+        for key in ("p50_us", "p99_us", "alloc_peak_bytes_mean"):
+            if b[key] and r[key] > b[key] * tolerance:
+                regressions.append(f"{stage} {key}: {b[key]} -> {r[key]}")
+        if b["throughput_per_s"] and r["throughput_per_s"] * tolerance < b["throughput_per_s"]:
+            regressions.append(f"{stage} throughput_per_s: {b['throughput_per_s']} -> {r['throughput_per_s']}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the intent pipeline offline")
+    parser.add_argument("--repeat", type=int, default=20, help="passes over the corpus per stage")
+    parser.add_argument("--tolerance", type=float, default=1.35, help="allowed slowdown ratio before failing")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--rebuild-corpus", action="store_true", help="regenerate corpus.json from the test scripts")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    corpus = LoadCorpus(rebuild=args.rebuild_corpus)
+    print(f"[BENCH] {len(corpus)} utterances, {args.repeat} passes per stage")
+    results = RunBenchmark(corpus, repeat=args.repeat)
+
+    baseline = None
+    if os.path.exists(BASELINE_FILE) and not args.save_baseline:
+        with open(BASELINE_FILE) as f:
+            baseline = json.load(f).get("stages")
+    PrintReport(results, baseline)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        with open(BASELINE_FILE, "w") as f:
+            json.dump({"python": sys.version.split()[0], "corpus_size": len(corpus), "stages": results}, f, indent=2)
+        print(f"[BENCH] Baseline saved to {BASELINE_FILE}")
+        return 0
+
+    if baseline is None:
+        print("[BENCH] No baseline found, run with --save-baseline to record one")
+        return 0
+
+    regressions = FindRegressions(results, baseline, args.tolerance)
+    if regressions:
+        print("\n❌ Regressions beyond x%.2f:" % args.tolerance)
+        for regression in regressions:
+            print(f"   {regression}")
+        return 1
+    print("\n✅ No regressions against baseline")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,20 @@
+# ======================== conftest.py ========================
+# Shared pytest setup: dummy API keys so Backend modules import without a .env, no background
+# scheduler thread, and a scratch working directory so runtime state (Data/*.sqlite3,
+# Data/llm_limits.json, ...) is written there instead of into the checkout.
+
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT)
+
+os.environ.setdefault("CO_API_KEY", "test")
+os.environ.setdefault("GROQ_API_KEY", "test")
+os.environ.setdefault("SCHEDULER_ENABLED", "false")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+_scratch = tempfile.TemporaryDirectory(prefix="nexon-tests-")
+os.makedirs(os.path.join(_scratch.name, "Data"), exist_ok=True)
+os.chdir(_scratch.name)
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Local stand-ins for the upstream services used by /ask
+Groq (OpenAI-compatible chat completions), Cohere (v1/chat stream), Google Translate (mobile page),
+YouTube Data API (search.list) and a JSON search backend for RealtimeSearchEngine.
+Each service gets its own port and latency distribution so slow upstreams can be simulated.
+
+Usage:
+    python loadtest/fake_upstreams.py --config loadtest/profile.json
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# ==================== LATENCY MODELS ====================
+
+class Latency:
+    """
+    Latency distribution for a fake upstream, in milliseconds.
+    kind: fixed (value), uniform (low, high), normal (mean, stddev) or lognormal (median, sigma)
+    error_rate is the share of calls answered with error_status.
+    """
+
+    def __init__(self, kind="fixed", error_rate=0.0, error_status=500, seed=None, **params):
+        self.kind = kind
+        self.params = params
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(**(config or {}))
+
+    def sample(self):
+        with self._lock:
+            p = self.params
+            if self.kind == "uniform":
+                ms = self._rng.uniform(p.get("low", 0), p.get("high", 0))
+            elif self.kind == "normal":
+                ms = self._rng.gauss(p.get("mean", 0), p.get("stddev", 0))
+            elif self.kind == "lognormal":
+                import math
+                ms = self._rng.lognormvariate(math.log(max(p.get("median", 1), 1e-3)), p.get("sigma", 0.5))
+            else:
+                ms = p.get("value", 0)
+            failed = self._rng.random() < self.error_rate
+        return max(0.0, ms) / 1000, failed
+
+# ==================== REQUEST HANDLERS ====================
+
+class FakeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency = Latency()
+    service = "fake"
+    stats = None
+
+    def log_message(self, *args):
+        pass
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}") if length else {}
+
+    def _send(self, status, body, content_type="application/json"):
+        data = body if isinstance(body, bytes) else body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _simulate(self):
+        """Sleep for a sampled latency; return True if this call should fail"""
+        delay, failed = self.latency.sample()
+        time.sleep(delay)
+        if self.stats is not None:
+            self.stats.record(self.service, failed)
+        if failed:
+            status = self.latency.error_status
+            self._send(status, json.dumps({"error": {"message": f"fake {self.service} error", "code": status}}))
+        return failed
+
+class GroqHandler(FakeHandler):
+    service = "groq"
+
+    def do_POST(self):
+        body = self._body()
+        if self._simulate():
+            return
+        prompt = next((m.get("content", "") for m in reversed(body.get("messages", [])) if m.get("role") == "user"), "")
+        text = "```python\nprint('hello from fake groq')\n```" if "Python program" in prompt else f"Fake answer to: {prompt[:80]}"
+        created = int(time.time())
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        model = body.get("model", "fake")
+
+        if not body.get("stream"):
+            self._send(200, json.dumps({
+                "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": text}}],
+                "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2}
+            }))
+            return
+
+        chunks = [text[i:i + 16] for i in range(0, len(text), 16)]
+        events = []
+        for index, piece in enumerate(chunks):
+            events.append({
+                "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                "choices": [{"index": 0, "delta": {"content": piece} if index else {"role": "assistant", "content": piece},
+                             "finish_reason": None}]
+            })
+        events.append({
+            "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]
+        })
+        payload = "".join(f"data: {json.dumps(event)}\n\n" for event in events) + "data: [DONE]\n\n"
+        self._send(200, payload, "text/event-stream")
+
+class CohereHandler(FakeHandler):
+    service = "cohere"
+
+    def do_POST(self):
+        body = self._body()
+        if self._simulate():
+            return
+        message = body.get("message", "")
+        text = f"general {message}"
+        generation_id = uuid.uuid4().hex
+        events = [
+            {"event_type": "stream-start", "is_finished": False, "generation_id": generation_id},
+            {"event_type": "text-generation", "is_finished": False, "text": text},
+            {"event_type": "stream-end", "is_finished": True, "finish_reason": "COMPLETE",
+             "response": {"text": text, "generation_id": generation_id, "chat_history": []}}
+        ]
+        self._send(200, "\n".join(json.dumps(event) for event in events) + "\n", "application/stream+json")
+
+class TranslateHandler(FakeHandler):
+    service = "translate"
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        if self._simulate():
+            return
+        text = query.get("q", [""])[0]
+        self._send(200, f'<html><body><div class="result-container t0">{text}</div></body></html>', "text/html")
+
+class YouTubeHandler(FakeHandler):
+    service = "youtube"
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        if self._simulate():
+            return
+        q = query.get("q", ["song"])[0]
+        video_id = uuid.uuid5(uuid.NAMESPACE_URL, q).hex[:11]
+        self._send(200, json.dumps({
+            "kind": "youtube#searchListResponse",
+            "items": [{"id": {"kind": "youtube#video", "videoId": video_id}, "snippet": {"title": q.title()}}]
+        }))
+
+class SearchHandler(FakeHandler):
+    service = "search"
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        if self._simulate():
+            return
+        if parsed.path.startswith("/page/"):
+            self._send(200, f"<html><body><p>{'Fake result content for load testing. ' * 5}</p></body></html>", "text/html")
+            return
+        query = parse_qs(parsed.query)
+        n = int(query.get("n", ["5"])[0])
+        host = self.headers.get("Host")
+        self._send(200, json.dumps([
+            {"title": f"Result {i}", "description": "Fake description", "url": f"http://{host}/page/{i}"}
+            for i in range(n)
+        ]))
+
+HANDLERS = {
+    "groq": GroqHandler,
+    "cohere": CohereHandler,
+    "translate": TranslateHandler,
+    "youtube": YouTubeHandler,
+    "search": SearchHandler
+}
+
+# ==================== SERVER MANAGEMENT ====================
+
+class UpstreamStats:
+    """Thread-safe call and error counters per fake upstream"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = {}
+        self.errors = {}
+
+    def record(self, service, failed):
+        with self._lock:
+            self.calls[service] = self.calls.get(service, 0) + 1
+            if failed:
+                self.errors[service] = self.errors.get(service, 0) + 1
+
+    def snapshot(self):
+        with self._lock:
+            return {service: {"calls": calls, "errors": self.errors.get(service, 0)} for service, calls in self.calls.items()}
+
+def StartFakeUpstreams(latency_config=None, host="127.0.0.1", stats=None):
+    """
+    Start every fake upstream on its own free port in background threads.
+    Returns (servers, env) where env holds the variables that point the app at the fakes.
+    """
+    latency_config = latency_config or {}
+    servers = {}
+    for name, handler in HANDLERS.items():
+        handler_class = type(handler.__name__, (handler,), {
+            "latency": Latency.from_config(latency_config.get(name)),
+            "stats": stats
+        })
+        server = ThreadingHTTPServer((host, 0), handler_class)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name=f"fake-{name}", daemon=True).start()
+        servers[name] = server
+
+    def url(name):
+        return f"http://{host}:{servers[name].server_address[1]}"
+
+    env = {
+        "GROQ_BASE_URL": url("groq"),
+        "GROQ_API_KEY": "fake-groq-key",
+        "CO_API_URL": url("cohere"),
+        "CO_API_KEY": "fake-cohere-key",
+        "TRANSLATE_BASE_URL": f"{url('translate')}/m",
+        "YOUTUBE_API_ENDPOINT": url("youtube"),
+        "YOUTUBE_API_KEY": "fake-youtube-key",
+        "SEARCH_BACKEND_URL": f"{url('search')}/search"
+    }
+    return servers, env
+
+def StopFakeUpstreams(servers):
+    for server in servers.values():
+        server.shutdown()
+        server.server_close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run fake Groq/Cohere/Translate/YouTube/search servers")
+    parser.add_argument("--config", help="load test profile with an 'upstreams' latency section")
+    args = parser.parse_args()
+
+    config = {}
+    if args.config:
+        with open(args.config) as f:
+            config = json.load(f).get("upstreams", {})
+
+    servers, env = StartFakeUpstreams(config)
+    print("Fake upstreams running. Export these before starting the server:")
+    for key, value in env.items():
+        print(f"export {key}={value}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        StopFakeUpstreams(servers)
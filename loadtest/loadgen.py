@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Open-loop load generator for /ask
+Requests are issued on a fixed (or Poisson) schedule regardless of how fast the server answers,
+so queueing shows up as latency instead of silently lowering the offered load.
+"""
+
+import asyncio
+import json
+import random
+import time
+
+import aiohttp
+
+DEFAULT_QUERIES = {
+    "open_app": ["open youtube", "open jiocinema", "open instamart", "open google one", "open taptap"],
+    "multi_command": [
+        "open whatsapp and set brightness to 80% and play despacito",
+        "nexon open whatsapp and play a song name ham mere safer and set volum into 90%",
+        "set brightness to 80% and take screenshot",
+        "call mom and send whatsapp message hello"
+    ],
+    "general_chat": [
+        "what is the capital of france",
+        "explain how rainbows form",
+        "give me a short motivational quote",
+        "what is machine learning"
+    ]
+}
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+class LoadGenerator:
+    """
+    Drives a target QPS against base_url for a duration with a weighted traffic mix.
+    capacity (workers * threads) is used to report how saturated the server was.
+    """
+
+    def __init__(self, base_url, qps, duration, mix=None, queries=None, device_ids=None,
+                 capacity=None, max_in_flight=1000, poisson=True, timeout=60, seed=7):
+        self.base_url = base_url.rstrip("/")
+        self.qps = qps
+        self.duration = duration
+        self.mix = mix or {"open_app": 0.5, "multi_command": 0.3, "general_chat": 0.2}
+        self.queries = queries or DEFAULT_QUERIES
+        self.device_ids = device_ids or ["179f706ae79ee302"]
+        self.capacity = capacity
+        self.max_in_flight = max_in_flight
+        self.poisson = poisson
+        self.timeout = timeout
+        self.rng = random.Random(seed)
+        self.results = []
+        self.in_flight = 0
+        self.in_flight_samples = []
+        self.dropped = 0
+
+    def _pick(self):
+        categories = list(self.mix)
+        category = self.rng.choices(categories, weights=[self.mix[c] for c in categories])[0]
+        return category, {"query": self.rng.choice(self.queries[category]), "device_id": self.rng.choice(self.device_ids)}
+
+    async def _send(self, session, category, payload):
+        self.in_flight += 1
+        started = time.perf_counter()
+        status, error = None, None
+        try:
+            async with session.post(f"{self.base_url}/ask", json=payload) as response:
+                status = response.status
+                await response.read()
+        except Exception as e:
+            error = type(e).__name__
+        finally:
+            self.in_flight -= 1
+        self.results.append({
+            "category": category,
+            "latency_ms": (time.perf_counter() - started) * 1000,
+            "status": status,
+            "error": error
+        })
+
+    async def _sample_in_flight(self, stop):
+        while not stop.is_set():
+            self.in_flight_samples.append(self.in_flight)
+            await asyncio.sleep(0.1)
+
+    async def run(self):
+        connector = aiohttp.TCPConnector(limit=self.max_in_flight)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        stop = asyncio.Event()
+        tasks = []
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            sampler = asyncio.create_task(self._sample_in_flight(stop))
+            started = time.perf_counter()
+            next_at = 0.0
+            while next_at < self.duration:
+                delay = started + next_at - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                if self.in_flight >= self.max_in_flight:
+                    self.dropped += 1
+                else:
+                    category, payload = self._pick()
+                    tasks.append(asyncio.create_task(self._send(session, category, payload)))
+                next_at += self.rng.expovariate(self.qps) if self.poisson else 1 / self.qps
+            if tasks:
+                await asyncio.gather(*tasks)
+            stop.set()
+            await sampler
+            self.elapsed = time.perf_counter() - started
+        return self.report()
+
+    def report(self):
+        def summarize(rows):
+            latencies = sorted(row["latency_ms"] for row in rows)
+            errors = sum(1 for row in rows if row["error"] or row["status"] != 200)
+            return {
+                "requests": len(rows),
+                "p50_ms": round(percentile(latencies, 50), 1),
+                "p95_ms": round(percentile(latencies, 95), 1),
+                "p99_ms": round(percentile(latencies, 99), 1),
+                "max_ms": round(latencies[-1], 1) if latencies else 0.0,
+                "error_rate": round(errors / len(rows), 4) if rows else 0.0
+            }
+
+        report = {
+            "target_qps": self.qps,
+            "achieved_qps": round(len(self.results) / self.elapsed, 2) if self.elapsed else 0.0,
+            "dropped_by_client": self.dropped,
+            "overall": summarize(self.results),
+            "by_category": {
+                category: summarize([row for row in self.results if row["category"] == category])
+                for category in self.mix
+            },
+            "errors": {}
+        }
+        for row in self.results:
+            if row["error"] or row["status"] != 200:
+                key = row["error"] or f"HTTP {row['status']}"
+                report["errors"][key] = report["errors"].get(key, 0) + 1
+
+        if self.in_flight_samples:
+            mean_in_flight = sum(self.in_flight_samples) / len(self.in_flight_samples)
+            report["in_flight"] = {"mean": round(mean_in_flight, 2), "max": max(self.in_flight_samples)}
+            if self.capacity:
+                saturated = sum(1 for sample in self.in_flight_samples if sample >= self.capacity)
+                report["saturation"] = {
+                    "capacity": self.capacity,
+                    "mean_utilization": round(mean_in_flight / self.capacity, 3),
+                    "time_saturated": round(saturated / len(self.in_flight_samples), 3)
+                }
+        return report
+
+def PrintReport(report):
+    print(f"\nTarget {report['target_qps']} QPS → achieved {report['achieved_qps']} QPS "
+          f"(client dropped {report['dropped_by_client']})")
+    header = f"{'category':<16}{'reqs':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>9}"
+    print(header)
+    print("-" * len(header))
+    rows = dict(report["by_category"], overall=report["overall"])
+    for category, r in rows.items():
+        print(f"{category:<16}{r['requests']:>7}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}{r['error_rate']:>9.2%}")
+    if report.get("saturation"):
+        s = report["saturation"]
+        print(f"Worker saturation: {s['mean_utilization']:.0%} mean of {s['capacity']} slots, "
+              f"saturated {s['time_saturated']:.0%} of the time (max in flight {report['in_flight']['max']})")
+    if report["errors"]:
+        print("Errors:", json.dumps(report["errors"]))
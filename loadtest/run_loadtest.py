@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+End-to-end load test for /ask
+Starts the fake upstreams, launches app.py under gunicorn pointed at them (in a scratch working
+directory so Data/ and device_apps/ in the repo are untouched), drives it at the target QPS and
+reports p50/p95/p99, error rates and worker saturation.
+
+Usage:
+    python loadtest/run_loadtest.py                                # loadtest/profile.json
+    python loadtest/run_loadtest.py --qps 50 --duration 60
+    python loadtest/run_loadtest.py --ramp 10,20,40,80             # find where it falls over
+    python loadtest/run_loadtest.py --url http://host:8000 --qps 5 # existing server, no fakes
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from fake_upstreams import StartFakeUpstreams, StopFakeUpstreams, UpstreamStats
+from loadgen import LoadGenerator, PrintReport
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_PROFILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "profile.json")
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def prepare_workdir():
+    """Scratch directory with the files the server reads relative to its cwd"""
+    workdir = tempfile.mkdtemp(prefix="nexon-loadtest-")
+    os.makedirs(os.path.join(workdir, "Data"))
+    if os.path.isdir(os.path.join(ROOT, "device_apps")):
+        shutil.copytree(os.path.join(ROOT, "device_apps"), os.path.join(workdir, "device_apps"))
+    return workdir
+
+def start_server(server_config, upstream_env, workdir):
+    port = free_port()
+    command = [
+        sys.executable, "-m", "gunicorn", "app:app",
+        "--bind", f"127.0.0.1:{port}",
+        "--workers", str(server_config.get("workers", 4)),
+        "--threads", str(server_config.get("threads", 8)),
+        "--worker-class", "gthread",
+        "--timeout", str(server_config.get("timeout", 120)),
+        "--chdir", workdir,
+        "--pythonpath", ROOT,
+        "--log-level", "warning"
+    ]
+    env = dict(os.environ, **upstream_env)
+    log = open(os.path.join(workdir, "gunicorn.log"), "w")
+    process = subprocess.Popen(command, env=env, stdout=log, stderr=subprocess.STDOUT)
+    base_url = f"http://127.0.0.1:{port}"
+
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn exited early, see {log.name}")
+        try:
+            urllib.request.urlopen(f"{base_url}/connect", timeout=1)
+            return process, base_url
+        except OSError:
+            time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError(f"gunicorn did not come up, see {log.name}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test /ask against fake upstreams")
+    parser.add_argument("--profile", default=DEFAULT_PROFILE)
+    parser.add_argument("--qps", type=float)
+    parser.add_argument("--duration", type=float)
+    parser.add_argument("--ramp", help="comma separated QPS steps, run one after another")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--threads", type=int)
+    parser.add_argument("--url", help="target an already running server instead of launching gunicorn")
+    parser.add_argument("--json", help="write the reports to this file")
+    args = parser.parse_args()
+
+    with open(args.profile) as f:
+        profile = json.load(f)
+    server_config = dict(profile.get("server", {}))
+    if args.workers:
+        server_config["workers"] = args.workers
+    if args.threads:
+        server_config["threads"] = args.threads
+    capacity = server_config.get("workers", 4) * server_config.get("threads", 8)
+
+    steps = [float(q) for q in args.ramp.split(",")] if args.ramp else (profile.get("ramp") or [args.qps or profile.get("target_qps", 10)])
+    duration = args.duration or profile.get("duration", 30)
+
+    servers, process, workdir = {}, None, None
+    stats = UpstreamStats()
+    try:
+        if args.url:
+            base_url = args.url
+        else:
+            servers, upstream_env = StartFakeUpstreams(profile.get("upstreams"), stats=stats)
+            workdir = prepare_workdir()
+            process, base_url = start_server(server_config, upstream_env, workdir)
+            print(f"[LOADTEST] gunicorn {server_config.get('workers', 4)}x{server_config.get('threads', 8)} at {base_url} (workdir {workdir})")
+
+        reports = []
+        for qps in steps:
+            generator = LoadGenerator(
+                base_url, qps, duration,
+                mix=profile.get("mix"),
+                queries=profile.get("queries"),
+                device_ids=profile.get("device_ids"),
+                capacity=None if args.url else capacity
+            )
+            report = asyncio.run(generator.run())
+            report["upstreams"] = stats.snapshot()
+            PrintReport(report)
+            if report["upstreams"]:
+                print("Upstream calls:", ", ".join(
+                    f"{name} {s['calls']} ({s['errors']} errors)" for name, s in sorted(report["upstreams"].items())
+                ))
+            reports.append(report)
+
+        if len(reports) > 1:
+            print("\nRamp summary:")
+            for report in reports:
+                o = report["overall"]
+                print(f"  {report['target_qps']:>6} QPS → {report['achieved_qps']:>6} achieved, p99 {o['p99_ms']} ms, errors {o['error_rate']:.2%}")
+
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump(reports, f, indent=2)
+    finally:
+        if process:
+            process.terminate()
+            try:
+                process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        if servers:
+            StopFakeUpstreams(servers)
+        if workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
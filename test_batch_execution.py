@@ -0,0 +1,82 @@
+# ======================== test_batch_execution.py ========================
+# Batched queries: ordering, bounded concurrency, shared work inside a batch and /ask_batch.
+
+import asyncio
+
+import pytest
+
+from test_model import BatchExecution, shared
+
+def test_results_keep_input_order_and_failures_stay_per_item():
+    async def handler(query, device_id):
+        await asyncio.sleep(0.01 if query == "slow" else 0)
+        if query == "bad":
+            raise RuntimeError("broken")
+        return query, device_id
+
+    results = asyncio.run(BatchExecution([("slow", "d1"), ("bad", None), ("fast", "d2")], handler=handler))
+    assert results[0] == ("slow", "d1")
+    assert isinstance(results[1], RuntimeError)
+    assert results[2] == ("fast", "d2")
+
+def test_concurrency_is_bounded():
+    running = peak = 0
+
+    async def handler(query, device_id):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.005)
+        running -= 1
+        return query
+
+    asyncio.run(BatchExecution([(str(i), None) for i in range(10)], handler=handler, concurrency=3))
+    assert peak == 3
+
+def test_identical_work_runs_once_per_batch():
+    calls = []
+
+    async def translate(query):
+        calls.append(query)
+        await asyncio.sleep(0)
+        return query.upper()
+
+    async def handler(query, device_id):
+        return await shared("translate", query, lambda: translate(query))
+
+    results = asyncio.run(BatchExecution([("namaste", None), ("namaste", None), ("hello", None)], handler=handler))
+    assert results == ["NAMASTE", "NAMASTE", "HELLO"]
+    assert sorted(calls) == ["hello", "namaste"]
+
+    # Outside a batch nothing is memoized
+    asyncio.run(handler("namaste", None))
+    assert calls.count("namaste") == 2
+
+@pytest.fixture
+def client(monkeypatch):
+    import app
+
+    async def resolve(query, device_id):
+        if query == "explode":
+            raise RuntimeError("kaput")
+        return {"tts_text": f"ok {query}", "device_command": "", "commands": []}, 200
+
+    monkeypatch.setattr(app, "resolve_query", resolve)
+    return app.app.test_client()
+
+def test_ask_batch_answers_each_item(client):
+    response = client.post("/ask_batch", json={"items": [
+        {"query": "one", "device_id": "d1"}, {"device_id": "d1"}, {"query": "explode"}, {"query": "two"}
+    ]})
+    assert response.status_code == 200
+    results = response.get_json()["results"]
+    assert [r["status"] for r in results] == [200, 400, 500, 200]
+    assert results[0]["tts_text"] == "ok one" and results[3]["tts_text"] == "ok two"
+    assert "kaput" in results[2]["error"]
+
+def test_ask_batch_rejects_empty_and_oversized_batches(client):
+    import app
+    assert client.post("/ask_batch", json={}).status_code == 400
+    assert client.post("/ask_batch", json={"items": []}).status_code == 400
+    items = [{"query": "q"}] * (app.MaxBatchSize + 1)
+    assert client.post("/ask_batch", json={"items": items}).status_code == 413
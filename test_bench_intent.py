@@ -0,0 +1,41 @@
+# ======================== test_bench_intent.py ========================
+# Intent benchmark harness: corpus building, percentiles, regression detection and a tiny offline run.
+
+import sys
+
+from benchmarks import bench_intent as bench
+
+def test_percentile_picks_nearest_rank():
+    values = [1, 2, 3, 4, 5, 6, 7, 8, 9, 10]
+    assert bench.percentile(values, 50) in (5, 6)
+    assert bench.percentile(values, 99) == 10
+    assert bench.percentile([], 90) == 0.0
+
+def test_corpus_is_deterministic_and_unique():
+    first = bench.BuildCorpus(seed=7)
+    second = bench.BuildCorpus(seed=7)
+    assert first == second
+    utterances = [item["utterance"].lower() for item in first]
+    assert len(utterances) == len(set(utterances))
+    assert {item["kind"] for item in first} == {"seed", "multi", "hindi"}
+
+def test_regressions_respect_tolerance():
+    baseline = {"stage": {"p50_us": 10, "p99_us": 100, "alloc_peak_bytes_mean": 1000, "throughput_per_s": 500}}
+    steady = {"stage": {"p50_us": 12, "p99_us": 120, "alloc_peak_bytes_mean": 1100, "throughput_per_s": 450}}
+    slower = {"stage": {"p50_us": 20, "p99_us": 100, "alloc_peak_bytes_mean": 1000, "throughput_per_s": 200}}
+    assert bench.FindRegressions(steady, baseline, 1.35) == []
+    regressions = bench.FindRegressions(slower, baseline, 1.35)
+    assert any("p50_us" in r for r in regressions) and any("throughput_per_s" in r for r in regressions)
+
+def test_offline_run_reports_every_stage(monkeypatch):
+    # install_stubs replaces the SDK modules; keep that from leaking into other tests
+    for name in ("cohere", "groq", "deep_translator"):
+        monkeypatch.setitem(sys.modules, name, sys.modules.get(name))
+        if sys.modules[name] is None:
+            monkeypatch.delitem(sys.modules, name)
+    corpus = [{"utterance": u, "source": "test", "kind": "seed"} for u in ("open youtube", "what is the time", "play music")]
+    results = bench.RunBenchmark(corpus, repeat=2, warmup=1)
+    assert set(results) == {"FirstLayerDMM", "TranslateAndroidCommand", "PC.TranslateCommand"}
+    for stage in results.values():
+        assert stage["calls"] == 6
+        assert stage["p50_us"] <= stage["p99_us"] <= stage["max_us"]
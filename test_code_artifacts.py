@@ -0,0 +1,45 @@
+# ======================== test_code_artifacts.py ========================
+# Generated-code artifact store and the /artifacts/<id> endpoint.
+
+import gzip
+
+from Backend import CodeArtifacts
+
+CODE = "\n".join(f"print('line {i}')" for i in range(200))
+
+def test_store_and_find_by_normalized_description():
+    artifact = CodeArtifacts.StoreArtifact("write a python program to reverse a string", CODE)
+    assert "code" not in artifact
+    assert CodeArtifacts.FindArtifact("Reverse a string")["id"] == artifact["id"]
+    assert CodeArtifacts.GetArtifact(artifact["id"])["code"] == CODE
+    assert CodeArtifacts.GetArtifact("missing") is None
+
+def test_filler_only_descriptions_do_not_share_an_artifact():
+    assert CodeArtifacts.NormalizeDescription("Write a Python program") == "write a python program"
+    assert CodeArtifacts.NormalizeDescription("code") == "code"
+    first = CodeArtifacts.StoreArtifact("write a python program", "print('program')")
+    CodeArtifacts.StoreArtifact("code", "print('code')")
+    assert CodeArtifacts.FindArtifact("Write a Python program")["id"] == first["id"]
+    assert CodeArtifacts.FindArtifact("python script") is None
+
+def test_json_and_raw_forms_do_not_share_compressed_bodies():
+    import app
+    artifact_id = CodeArtifacts.StoreArtifact("print two hundred lines", CODE)["id"]
+    client = app.app.test_client()
+    headers = {"Accept-Encoding": "gzip"}
+
+    for _ in range(2):  # second round is served from the compression cache
+        as_json = client.get(f"/artifacts/{artifact_id}", headers=headers)
+        as_raw = client.get(f"/artifacts/{artifact_id}?raw=1", headers=headers)
+        assert as_json.headers["Content-Encoding"] == as_raw.headers["Content-Encoding"] == "gzip"
+        assert as_json.mimetype == "application/json"
+        assert as_raw.mimetype == "text/x-python"
+        assert gzip.decompress(as_raw.get_data()).decode() == CODE
+        assert '"code"' in gzip.decompress(as_json.get_data()).decode()
+
+    assert as_json.headers["ETag"] != as_raw.headers["ETag"]
+    # A tag from one representation must not validate the other
+    cross = client.get(f"/artifacts/{artifact_id}?raw=1", headers={**headers, "If-None-Match": as_json.headers["ETag"]})
+    assert cross.status_code == 200
+    same = client.get(f"/artifacts/{artifact_id}?raw=1", headers={**headers, "If-None-Match": as_raw.headers["ETag"]})
+    assert same.status_code == 304
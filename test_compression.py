@@ -0,0 +1,94 @@
+# ======================== test_compression.py ========================
+# Response compression: encoding negotiation, ETag revalidation and the compressed-body cache.
+
+import gzip
+import json
+
+import pytest
+from flask import Flask, Response, jsonify, request
+
+from Backend import Compression
+
+PAYLOAD = {"apps": {f"App {i}": f"com.example.app{i}" for i in range(100)}}
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(Compression, "_cache", Compression.OrderedDict())
+    monkeypatch.setattr(Compression, "brotli", None)
+    app = Flask(__name__)
+
+    @app.route("/big")
+    def big():
+        return jsonify(PAYLOAD)
+
+    @app.route("/small")
+    def small():
+        return jsonify({"ok": True})
+
+    @app.route("/versioned")
+    def versioned():
+        response = jsonify(PAYLOAD)
+        response.set_etag("v1")
+        return response
+
+    @app.route("/stream")
+    def stream():
+        return Response((chunk for chunk in [b"x" * 4096]), mimetype="text/plain")
+
+    app.after_request(lambda response: Compression.Finalize(request, response, {"big"}))
+    return app.test_client()
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("identity", None),
+    ("gzip, deflate", "gzip"),
+    ("gzip;q=0", None),
+    ("*", "gzip"),
+    ("br;q=1.0, gzip;q=0.5", "gzip"),
+])
+def test_choose_encoding_without_brotli(monkeypatch, header, expected):
+    monkeypatch.setattr(Compression, "brotli", None)
+    assert Compression.ChooseEncoding(header) == expected
+
+def test_brotli_is_preferred_when_available(monkeypatch):
+    monkeypatch.setattr(Compression, "brotli", object())
+    assert Compression.ChooseEncoding("gzip, br") == "br"
+    assert Compression.ChooseEncoding("gzip, br;q=0") == "gzip"
+
+def test_client_etags_ignore_weak_prefix_and_encoding_suffix():
+    assert Compression.ClientETags('W/"abc-gz", "def-br", "ghi"') == {"abc", "def", "ghi"}
+    assert Compression.ClientETags(None) == set()
+
+def test_large_bodies_are_compressed_small_ones_are_not(client):
+    big = client.get("/big", headers={"Accept-Encoding": "gzip"})
+    assert big.headers["Content-Encoding"] == "gzip"
+    assert json.loads(gzip.decompress(big.get_data())) == PAYLOAD
+    assert "Accept-Encoding" in big.headers["Vary"]
+
+    small = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in small.headers
+    assert client.get("/big").headers.get("Content-Encoding") is None
+
+def test_etag_endpoints_revalidate_across_encodings(client):
+    first = client.get("/big", headers={"Accept-Encoding": "gzip"})
+    etag = first.headers["ETag"]
+    assert etag.endswith('-gz"')
+    # The compressed tag validates the plain representation's version and vice versa
+    assert client.get("/big", headers={"If-None-Match": etag}).status_code == 304
+    plain = client.get("/big").headers["ETag"]
+    assert client.get("/big", headers={"Accept-Encoding": "gzip", "If-None-Match": plain}).status_code == 304
+    assert client.get("/small").headers.get("ETag") is None  # not an ETag endpoint
+
+def test_bodies_with_an_etag_are_compressed_once(client, monkeypatch):
+    calls = []
+    original = Compression.CompressBody
+    monkeypatch.setattr(Compression, "CompressBody", lambda body, encoding: calls.append(encoding) or original(body, encoding))
+    for _ in range(3):
+        response = client.get("/versioned", headers={"Accept-Encoding": "gzip"})
+        assert json.loads(gzip.decompress(response.get_data())) == PAYLOAD
+    assert calls == ["gzip"]
+
+def test_streamed_responses_pass_through(client):
+    response = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in response.headers
+    assert response.get_data() == b"x" * 4096
@@ -0,0 +1,113 @@
+# ======================== test_concurrency_limiter.py ========================
+# Adaptive LLM limiter: AIMD adjustment, device-before-chat admission, chat shedding, shared state file.
+
+import asyncio
+import json
+import os
+import time
+import types
+
+import pytest
+
+from Backend import ConcurrencyLimiter
+from Backend.ConcurrencyLimiter import CHAT, DEVICE, AdaptiveLimiter, IsThrottle, Overloaded
+
+@pytest.fixture
+def limit_file(monkeypatch, tmp_path):
+    path = tmp_path / "limits.json"
+    monkeypatch.setattr(ConcurrencyLimiter, "LLMLimitFile", str(path))
+    monkeypatch.setattr(ConcurrencyLimiter, "LLMInitialLimit", 4.0)
+    monkeypatch.setattr(ConcurrencyLimiter, "LLMChatShare", 0.5)
+    monkeypatch.setattr(ConcurrencyLimiter, "LLMMaxChatQueue", 2)
+    monkeypatch.setattr(ConcurrencyLimiter, "LLMLimitSyncInterval", 3600)
+    return path
+
+def _limiter(provider="test"):
+    limiter = AdaptiveLimiter(provider)
+    limiter.global_limit = ConcurrencyLimiter.LLMInitialLimit
+    return limiter
+
+def test_additive_increase_multiplicative_decrease(limit_file):
+    limiter = _limiter()
+    limiter._successes = 4
+    assert limiter._adjust(4.0) == 5.0
+    limiter._successes = 10
+    limiter._throttled = True
+    assert limiter._adjust(10.0) == pytest.approx(10.0 * ConcurrencyLimiter.LLMBackoff)
+    assert limiter._adjust(1.0) == 1.0  # nothing new to learn from
+    limiter._throttled = True
+    assert limiter._adjust(1.0) == ConcurrencyLimiter.LLMMinLimit
+
+def test_chat_only_gets_its_share(limit_file):
+    limiter = _limiter()
+    assert limiter.try_acquire(CHAT) and limiter.try_acquire(CHAT)
+    assert not limiter.try_acquire(CHAT)
+    assert limiter.try_acquire(DEVICE) and limiter.try_acquire(DEVICE)
+    assert not limiter.try_acquire(DEVICE)
+
+def test_device_waiters_go_first_and_chat_is_shed(limit_file):
+    async def scenario():
+        limiter = _limiter()
+        for _ in range(4):
+            assert limiter.try_acquire(DEVICE)
+        order = []
+
+        async def wait(priority, name):
+            await limiter.acquire(priority)
+            order.append(name)
+            await asyncio.sleep(0)
+            limiter.release(latency=0.1)
+
+        chat = [asyncio.create_task(wait(CHAT, f"chat{i}")) for i in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded):
+            await limiter.acquire(CHAT)  # the chat queue is already full
+        device = asyncio.create_task(wait(DEVICE, "device"))
+        await asyncio.sleep(0)
+
+        for _ in range(4):
+            limiter.release(latency=0.1)
+            await asyncio.sleep(0)
+        await asyncio.wait_for(asyncio.gather(device, *chat), 5)
+        return order, limiter
+
+    order, limiter = asyncio.run(scenario())
+    assert order[0] == "device"
+    assert sorted(order[1:]) == ["chat0", "chat1"]
+    assert limiter.inflight == 0
+
+def test_cancelled_waiter_does_not_leak_a_slot(limit_file):
+    async def scenario():
+        limiter = _limiter()
+        for _ in range(4):
+            limiter.try_acquire(DEVICE)
+        waiter = asyncio.create_task(limiter.acquire(DEVICE))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        limiter.release(latency=0.1)
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        return limiter
+
+    assert asyncio.run(scenario()).inflight == 3
+
+def test_workers_split_the_shared_limit(limit_file):
+    limit_file.write_text(json.dumps({
+        "limits": {"test": 8.0},
+        "workers": {"1": time.time(), "2": time.time() - 60}  # worker 2 is stale
+    }))
+    limiter = _limiter()
+    limiter._successes = 8
+    limiter._sync_file()
+    assert limiter.global_limit == 9.0
+    assert limiter.workers == 2
+    assert limiter.limit == 4.5
+    state = json.loads(limit_file.read_text())
+    assert set(state["workers"]) == {"1", str(os.getpid())}
+    assert state["limits"]["test"] == 9.0
+
+def test_throttle_detection():
+    assert IsThrottle(asyncio.TimeoutError())
+    assert IsThrottle(types.SimpleNamespace(status_code=429))
+    assert IsThrottle(types.SimpleNamespace(response=types.SimpleNamespace(status_code=503)))
+    assert not IsThrottle(ValueError("bad request"))
@@ -0,0 +1,69 @@
+# ======================== test_device_apps_delta.py ========================
+# Versioned app catalogs: add/remove deltas, stale-version conflicts and /device_apps revalidation.
+
+import pytest
+
+from Backend import DeviceRegistry
+
+APPS = {"WhatsApp": "com.whatsapp", "YouTube": "com.google.android.youtube"}
+
+@pytest.fixture
+def registry(monkeypatch, tmp_path):
+    monkeypatch.setattr(DeviceRegistry, "DeviceRegistryPath", str(tmp_path / "devices.sqlite3"))
+    monkeypatch.setattr(DeviceRegistry, "LegacyAppsDir", str(tmp_path / "device_apps"))
+    monkeypatch.setattr(DeviceRegistry, "_conn", None)
+    monkeypatch.setattr(DeviceRegistry, "_catalogs", {})
+    yield
+    if DeviceRegistry._conn is not None:
+        DeviceRegistry._conn.close()
+
+@pytest.fixture
+def client(registry):
+    import app
+    return app.app.test_client()
+
+def test_delta_updates_catalog_and_match_index(registry):
+    base = DeviceRegistry.SaveApps("d1", APPS)
+    version = DeviceRegistry.ApplyAppsDelta("d1", base, add={"Spotify": "com.spotify.music"}, remove=["YouTube"])
+    expected = {"WhatsApp": "com.whatsapp", "Spotify": "com.spotify.music"}
+    assert version == DeviceRegistry.CatalogVersion(expected)
+    assert DeviceRegistry.GetApps("d1") == expected
+    assert DeviceRegistry.MatchApp("d1", "spotify") == "Spotify"
+    assert DeviceRegistry.MatchApp("d1", "youtube") is None
+
+def test_stale_delta_is_rejected_and_changes_nothing(registry):
+    base = DeviceRegistry.SaveApps("d1", APPS)
+    current = DeviceRegistry.ApplyAppsDelta("d1", base, remove=["YouTube"])
+    with pytest.raises(DeviceRegistry.VersionConflict) as conflict:
+        DeviceRegistry.ApplyAppsDelta("d1", base, add={"Maps": "com.maps"})
+    assert conflict.value.current == current
+    assert "Maps" not in DeviceRegistry.GetApps("d1")
+    with pytest.raises(DeviceRegistry.VersionConflict) as missing:
+        DeviceRegistry.ApplyAppsDelta("nobody", base)
+    assert missing.value.current is None
+
+def test_upload_then_revalidate_with_hash_and_etag(client):
+    uploaded = client.post("/device_apps?device_id=d1", json=APPS)
+    version = uploaded.get_json()["version"]
+    assert uploaded.status_code == 200
+
+    assert client.post("/device_apps?device_id=d1", json={"hash": version}).status_code == 304
+    stale = client.post("/device_apps?device_id=d1", json={"hash": "0" * 16})
+    assert stale.status_code == 409 and stale.get_json()["version"] == version
+    for tag in (f'"{version}"', f'W/"{version}"', f'"{version}-gz"', f'"other", "{version}"'):
+        assert client.post("/device_apps?device_id=d1", json=APPS, headers={"If-None-Match": tag}).status_code == 304
+
+    fetched = client.get("/get_device_apps/d1")
+    assert fetched.get_json() == APPS and fetched.headers["ETag"] == f'"{version}"'
+    assert client.get("/get_device_apps/d1", headers={"If-None-Match": f'"{version}"'}).status_code == 304
+
+def test_delta_over_http(client):
+    version = client.post("/device_apps?device_id=d1", json=APPS).get_json()["version"]
+    updated = client.post("/device_apps?device_id=d1", json={"base_version": version, "add": {"Maps": "com.maps"}})
+    assert updated.status_code == 200
+    conflict = client.post("/device_apps?device_id=d1", json={"base_version": version, "remove": ["WhatsApp"]})
+    assert conflict.status_code == 409
+    assert conflict.get_json()["version"] == updated.get_json()["version"]
+    bad = client.post("/device_apps?device_id=d1", json={"base_version": version, "add": ["Maps"]})
+    assert bad.status_code == 400
+    assert client.post("/device_apps", json=APPS).status_code == 400
@@ -0,0 +1,76 @@
+# ======================== test_device_registry.py ========================
+# Device registry: device records, cached app catalogs, fuzzy app matching and the legacy import.
+
+import json
+import sqlite3
+
+import pytest
+
+from Backend import DeviceRegistry
+
+@pytest.fixture
+def registry(monkeypatch, tmp_path):
+    monkeypatch.setattr(DeviceRegistry, "DeviceRegistryPath", str(tmp_path / "devices.sqlite3"))
+    monkeypatch.setattr(DeviceRegistry, "LegacyAppsDir", str(tmp_path / "device_apps"))
+    monkeypatch.setattr(DeviceRegistry, "LegacyDeviceList", str(tmp_path / "device_list.json"))
+    monkeypatch.setattr(DeviceRegistry, "_conn", None)
+    monkeypatch.setattr(DeviceRegistry, "_catalogs", {})
+    yield tmp_path
+    if DeviceRegistry._conn is not None:
+        DeviceRegistry._conn.close()
+
+def test_register_keeps_fields_that_are_not_resent(registry):
+    DeviceRegistry.RegisterDevice("d1", name="pixel", address="10.0.0.2", capabilities=["open", "call"])
+    DeviceRegistry.RegisterDevice("d1", address="10.0.0.9")
+    device = DeviceRegistry.GetDevice("d1")
+    assert device["name"] == "pixel"
+    assert device["address"] == "10.0.0.9"
+    assert device["capabilities"] == ["open", "call"]
+    assert DeviceRegistry.FindDevice("pixel")["device_id"] == "d1"
+    assert DeviceRegistry.FindDevice("d1")["name"] == "pixel"
+    assert DeviceRegistry.GetDevice("missing") is None
+    assert [d["device_id"] for d in DeviceRegistry.ListDevices()] == ["d1"]
+
+def test_catalog_version_is_canonical():
+    assert DeviceRegistry.CatalogVersion({"b": "2", "a": "1"}) == DeviceRegistry.CatalogVersion({"a": "1", "b": "2"})
+    assert len(DeviceRegistry.CatalogVersion({})) == 16
+
+def test_match_app_exact_case_and_fuzzy(registry):
+    DeviceRegistry.SaveApps("d1", {"WhatsApp": "com.whatsapp", "YouTube": "com.google.android.youtube"})
+    assert DeviceRegistry.MatchApp("d1", "whatsapp") == "WhatsApp"
+    assert DeviceRegistry.MatchApp("d1", "youtub") == "YouTube"
+    assert DeviceRegistry.MatchApp("d1", "calculator") is None
+    assert DeviceRegistry.MatchApp("unknown", "whatsapp") is None
+
+def test_reader_picks_up_catalogs_written_elsewhere(registry):
+    version = DeviceRegistry.SaveApps("d1", {"Maps": "com.maps"})
+    assert DeviceRegistry.AppsVersion("d1") == version
+
+    # Another worker replaces the catalog behind this process's cache
+    apps = {"Maps": "com.maps", "Camera": "com.camera"}
+    other = sqlite3.connect(DeviceRegistry.DeviceRegistryPath)
+    other.execute("UPDATE app_catalogs SET version = ?, apps = ? WHERE device_id = 'd1'",
+                  (DeviceRegistry.CatalogVersion(apps), DeviceRegistry._pack(apps)))
+    other.commit()
+    other.close()
+
+    assert DeviceRegistry.GetApps("d1") == apps
+    assert DeviceRegistry.MatchApp("d1", "camera") == "Camera"
+
+def test_legacy_files_are_imported_once(registry):
+    (registry / "device_apps").mkdir()
+    (registry / "device_apps" / "phone1.json").write_text(json.dumps({"Spotify": "com.spotify.music"}))
+    (registry / "device_apps" / "broken.json").write_text("{")
+    (registry / "device_list.json").write_text(json.dumps({"laptop": {"ip": "10.0.0.5", "type": "pc", "commands": ["lock"]}}))
+
+    assert DeviceRegistry.GetApps("phone1") == {"Spotify": "com.spotify.music"}
+    assert DeviceRegistry.GetApps("broken") is None
+    laptop = DeviceRegistry.GetDevice("laptop")
+    assert laptop["address"] == "10.0.0.5" and laptop["capabilities"] == ["lock"]
+
+    # Re-opening the store does not overwrite newer data with the legacy files
+    DeviceRegistry.SaveApps("phone1", {"Spotify": "com.spotify.music", "Maps": "com.maps"})
+    DeviceRegistry._conn.close()
+    DeviceRegistry._conn = None
+    DeviceRegistry._catalogs.clear()
+    assert "Maps" in DeviceRegistry.GetApps("phone1")
@@ -0,0 +1,109 @@
+# ======================== test_llm_gateway.py ========================
+# LLM gateway: rolling p95, failover between providers, deadlines and hedged attempts.
+
+import asyncio
+import types
+from collections import deque
+
+import pytest
+
+from Backend import ConcurrencyLimiter, LLMGateway
+
+MESSAGES = [{"role": "system", "content": "be brief"}, {"role": "user", "content": "hi"}]
+
+@pytest.fixture
+def providers(monkeypatch, tmp_path):
+    monkeypatch.setattr(ConcurrencyLimiter, "LLMLimitFile", str(tmp_path / "limits.json"))
+    monkeypatch.setattr(LLMGateway, "_limiters", {p: ConcurrencyLimiter.AdaptiveLimiter(p) for p in LLMGateway.PROVIDERS})
+    monkeypatch.setattr(LLMGateway, "_latencies", {p: deque(maxlen=200) for p in LLMGateway.PROVIDERS})
+    monkeypatch.setattr(LLMGateway, "LLMFailover", True)
+    monkeypatch.setattr(LLMGateway, "LLMHedge", True)
+    calls = {"groq": [], "cohere": []}
+
+    def install(name, behaviour):
+        async def call(messages, model, max_tokens, temperature):
+            calls[name].append(model)
+            return await behaviour(len(calls[name]))
+        monkeypatch.setitem(LLMGateway.PROVIDERS, name, call)
+    return install, calls
+
+async def answer(text, delay=0.0):
+    await asyncio.sleep(delay)
+    return text
+
+async def fail(*args):
+    raise RuntimeError("provider down")
+
+def test_p95_needs_enough_samples(monkeypatch, providers):
+    monkeypatch.setattr(LLMGateway, "LLMHedgeMinSamples", 20)
+    LLMGateway._latencies["groq"].extend([0.1] * 19)
+    assert LLMGateway.P95("groq") is None
+    LLMGateway._latencies["groq"].extend([0.1] * 18 + [5.0, 6.0])
+    assert LLMGateway.P95("groq") == 0.1
+
+def test_successful_calls_record_latency(providers):
+    install, calls = providers
+    install("groq", lambda n: answer("from groq"))
+    assert LLMGateway.CompleteSync(MESSAGES) == "from groq"
+    assert len(LLMGateway._latencies["groq"]) == 1
+    assert calls["cohere"] == []
+
+def test_errors_fail_over_to_the_other_provider(providers):
+    install, calls = providers
+    install("groq", fail)
+    install("cohere", lambda n: answer("from cohere"))
+    assert LLMGateway.CompleteSync(MESSAGES, model="custom") == "from cohere"
+    assert calls["cohere"] == [None]  # the fallback uses its own default model
+
+def test_slow_primary_fails_over_within_the_deadline(providers):
+    install, _ = providers
+    install("groq", lambda n: answer("too late", delay=5))
+    install("cohere", lambda n: answer("from cohere"))
+    assert LLMGateway.CompleteSync(MESSAGES, deadline=0.5) == "from cohere"
+
+def test_without_failover_the_error_surfaces(monkeypatch, providers):
+    install, calls = providers
+    monkeypatch.setattr(LLMGateway, "LLMFailover", False)
+    install("groq", fail)
+    with pytest.raises(RuntimeError):
+        LLMGateway.CompleteSync(MESSAGES)
+    assert calls["cohere"] == []
+
+def test_slow_call_is_hedged_past_the_p95(monkeypatch, providers):
+    install, calls = providers
+    monkeypatch.setattr(LLMGateway, "LLMHedgeMinDelay", 0.05)
+    monkeypatch.setattr(LLMGateway, "LLMHedgeMinSamples", 5)
+    LLMGateway._latencies["groq"].extend([0.05] * 10)
+    install("groq", lambda n: answer("slow first", delay=5) if n == 1 else answer("hedge"))
+    assert LLMGateway.CompleteSync(MESSAGES, deadline=3) == "hedge"
+    assert len(calls["groq"]) == 2
+    assert LLMGateway._limiters["groq"].inflight == 0  # the losing attempt gave its slot back
+
+def test_cohere_gets_preamble_history_and_final_message(monkeypatch):
+    seen = {}
+
+    async def chat_stream(**kwargs):
+        seen.update(kwargs)
+        yield types.SimpleNamespace(event_type="stream-start")
+        yield types.SimpleNamespace(event_type="text-generation", text="hel")
+        yield types.SimpleNamespace(event_type="text-generation", text="lo")
+
+    monkeypatch.setattr(LLMGateway, "_client", lambda provider: types.SimpleNamespace(chat_stream=chat_stream))
+    messages = MESSAGES[:1] + [{"role": "user", "content": "a"}, {"role": "assistant", "content": "b"},
+                               {"role": "user", "content": "c"}]
+    assert asyncio.run(LLMGateway._call_cohere(messages, None, 10, 0.5)) == "hello"
+    assert seen["preamble"] == "be brief"
+    assert seen["message"] == "c"
+    assert seen["chat_history"] == [{"role": "USER", "message": "a"}, {"role": "CHATBOT", "message": "b"}]
+
+def test_code_generation_is_admitted_as_device_work(monkeypatch):
+    import test_model
+    seen = {}
+
+    async def complete(messages, **kwargs):
+        seen.update(kwargs)
+        return "```python\nprint('hi')\n```"
+
+    monkeypatch.setattr(test_model, "Complete", complete)
+    assert asyncio.run(test_model.generate_code("say hi")) == "print('hi')"
+    assert seen["priority"] == "device"
@@ -0,0 +1,92 @@
+# ======================== test_loadtest.py ========================
+# Load test tooling: the fake upstreams answer like the real APIs and the open-loop generator reports.
+
+import asyncio
+import json
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+
+import pytest
+
+from loadtest import fake_upstreams
+from loadtest.loadgen import LoadGenerator
+
+@pytest.fixture(scope="module")
+def upstreams():
+    stats = fake_upstreams.UpstreamStats()
+    servers, env = fake_upstreams.StartFakeUpstreams({"search": {"error_rate": 1.0, "error_status": 503}}, stats=stats)
+    yield servers, env, stats
+    fake_upstreams.StopFakeUpstreams(servers)
+
+def _post(url, body):
+    request = urllib.request.Request(url, json.dumps(body).encode(), {"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=5) as response:
+        return response.headers.get("Content-Type"), response.read().decode()
+
+def test_fake_groq_answers_plain_and_streamed(upstreams):
+    _, env, _ = upstreams
+    url = f"{env['GROQ_BASE_URL']}/openai/v1/chat/completions"
+    messages = [{"role": "user", "content": "hello there"}]
+    _, body = _post(url, {"model": "m", "messages": messages})
+    assert json.loads(body)["choices"][0]["message"]["content"] == "Fake answer to: hello there"
+
+    content_type, body = _post(url, {"model": "m", "messages": messages, "stream": True})
+    assert content_type == "text/event-stream"
+    events = [line[6:] for line in body.splitlines() if line.startswith("data: ")]
+    assert events[-1] == "[DONE]"
+    text = "".join(json.loads(e)["choices"][0]["delta"].get("content", "") for e in events[:-1])
+    assert text == "Fake answer to: hello there"
+
+def test_fake_cohere_youtube_and_translate_respond(upstreams):
+    _, env, stats = upstreams
+    before = stats.snapshot().get("cohere", {"calls": 0})["calls"]
+    _, body = _post(f"{env['CO_API_URL']}/v1/chat", {"message": "hi"})
+    assert [json.loads(line)["event_type"] for line in body.splitlines()][-1] == "stream-end"
+
+    with urllib.request.urlopen(f"{env['YOUTUBE_API_ENDPOINT']}?q=despacito", timeout=5) as response:
+        assert len(json.loads(response.read())["items"][0]["id"]["videoId"]) == 11
+    with urllib.request.urlopen(f"{env['TRANSLATE_BASE_URL']}?q=namaste", timeout=5) as response:
+        assert "namaste" in response.read().decode()
+    assert stats.snapshot()["cohere"] == {"calls": before + 1, "errors": 0}
+
+def test_fake_upstream_error_rate(upstreams):
+    _, env, stats = upstreams
+    with pytest.raises(urllib.error.HTTPError) as error:
+        urllib.request.urlopen(f"{env['SEARCH_BACKEND_URL']}?q=x", timeout=5)
+    assert error.value.code == 503
+    assert stats.snapshot()["search"] == {"calls": 1, "errors": 1}
+
+def test_latency_models_are_seeded():
+    first = fake_upstreams.Latency("lognormal", seed=3, median=50, sigma=0.5)
+    second = fake_upstreams.Latency("lognormal", seed=3, median=50, sigma=0.5)
+    assert [first.sample() for _ in range(5)] == [second.sample() for _ in range(5)]
+    assert fake_upstreams.Latency("fixed", value=20).sample() == (0.02, False)
+
+class AskHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        status = 200 if self.path == "/ask" else 404
+        self.send_response(status)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+def test_load_generator_reports_by_category():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), AskHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        generator = LoadGenerator(f"http://127.0.0.1:{server.server_address[1]}", qps=40, duration=0.5,
+                                  capacity=4, poisson=False)
+        report = asyncio.run(generator.run())
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert report["overall"]["requests"] == 20
+    assert report["overall"]["error_rate"] == 0.0
+    assert sum(r["requests"] for r in report["by_category"].values()) == 20
+    assert report["saturation"]["capacity"] == 4
@@ -0,0 +1,64 @@
+# ======================== test_logger.py ========================
+# Logger: request-id stamping, JSON lines and the non-blocking queue handler.
+
+import contextvars
+import json
+import logging
+import queue
+
+from Backend import Logger
+
+def _capture(name, maxsize=100):
+    records = queue.Queue(maxsize=maxsize)
+    handler = Logger._RequestQueueHandler(records)
+    log = logging.getLogger(f"test-logger.{name}")
+    log.propagate = False
+    log.setLevel(logging.DEBUG)
+    log.handlers[:] = [handler]
+    return log, records
+
+def test_records_carry_the_request_id_and_resolved_message():
+    log, records = _capture("stamp")
+    context = contextvars.copy_context()
+    request_id = context.run(Logger.NewRequestId, "abc123")
+    context.run(log.info, "served %s in %dms", "/ask", 12, extra={"device_id": "d1"})
+
+    record = records.get_nowait()
+    assert request_id == "abc123"
+    assert record.request_id == "abc123"
+    assert record.msg == "served /ask in 12ms" and record.args is None
+
+    entry = json.loads(Logger.JSONFormatter().format(record))
+    assert entry["level"] == "INFO"
+    assert entry["request_id"] == "abc123"
+    assert entry["msg"] == "served /ask in 12ms"
+    assert entry["device_id"] == "d1"
+
+def test_request_ids_do_not_leak_between_contexts():
+    before = Logger.RequestId.get()
+    contextvars.copy_context().run(Logger.NewRequestId, "first")
+    assert Logger.RequestId.get() == before
+    generated = contextvars.copy_context().run(Logger.NewRequestId)
+    assert len(generated) == 16
+
+def test_exceptions_are_formatted_before_queueing():
+    log, records = _capture("exc")
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        log.exception("failed")
+    record = records.get_nowait()
+    assert record.exc_info is None
+    assert "ValueError: boom" in json.loads(Logger.JSONFormatter().format(record))["exc"]
+
+def test_full_queue_drops_instead_of_blocking():
+    log, records = _capture("full", maxsize=1)
+    log.info("one")
+    log.info("two")
+    assert records.qsize() == 1
+    assert records.get_nowait().msg == "one"
+
+def test_shared_hierarchy_filters_below_the_level():
+    log = Logger.GetLogger("test")
+    assert log.name == "nexon.test"
+    assert not log.isEnabledFor(logging.DEBUG)
@@ -0,0 +1,77 @@
+# ======================== test_memory_handler.py ========================
+# Long-term memory: per-owner facts and tasks, ranked retrieval within a budget, legacy import.
+
+import json
+
+import pytest
+
+from Backend import MemoryHandler
+
+@pytest.fixture(params=[True, False], ids=["fts5", "like"])
+def memory(request, monkeypatch, tmp_path):
+    monkeypatch.setattr(MemoryHandler, "MEMORY_DB", str(tmp_path / "memory.sqlite3"))
+    monkeypatch.setattr(MemoryHandler, "MEMORY_FILE", str(tmp_path / "memory.json"))
+    monkeypatch.setattr(MemoryHandler, "_conn", None)
+    monkeypatch.setattr(MemoryHandler, "_fts", True)
+    MemoryHandler.init_memory()
+    if not request.param:
+        monkeypatch.setattr(MemoryHandler, "_fts", False)  # as on SQLite builds without FTS5
+    yield tmp_path
+    MemoryHandler._conn.close()
+
+def test_search_ranks_by_keywords_and_scopes_by_owner(memory):
+    MemoryHandler.remember_fact("alice", "My sister's birthday is on 12 March")
+    MemoryHandler.remember_fact("alice", "I am allergic to peanuts")
+    MemoryHandler.remember_fact("bob", "My birthday is in June")
+    found = MemoryHandler.search_memories("alice", "when is my sister birthday?")
+    assert [m["text"] for m in found] == ["My sister's birthday is on 12 March"]
+    assert MemoryHandler.search_memories("alice", "what is the") == []  # only stopwords
+
+def test_done_tasks_drop_out_of_search(memory):
+    task_id = MemoryHandler.add_task("alice", "buy groceries")
+    assert MemoryHandler.relevant_memories("alice", "groceries") == ["Pending task: buy groceries"]
+    assert MemoryHandler.complete_task("alice", task_id)
+    assert not MemoryHandler.complete_task("bob", task_id)
+    assert MemoryHandler.search_memories("alice", "groceries") == []
+
+def test_tasks_are_listed_by_due_time(memory):
+    MemoryHandler.add_task("alice", "undated")
+    MemoryHandler.add_task("alice", "later", due_at=200)
+    MemoryHandler.add_task("alice", "sooner", due_at=100)
+    assert [t["text"] for t in MemoryHandler.list_tasks("alice")] == ["sooner", "later", "undated"]
+    assert [t["text"] for t in MemoryHandler.list_tasks("alice", due_before=150)] == ["sooner"]
+
+def test_prompt_respects_the_token_budget(memory):
+    MemoryHandler.remember_fact("alice", "coffee " * 100)
+    assert MemoryHandler.relevant_memories("alice", "coffee", max_tokens=30) == []
+    MemoryHandler.remember_fact("bob", "takes coffee black")
+    MemoryHandler.remember_fact("bob", "coffee mug is blue")
+    selected = MemoryHandler.relevant_memories("bob", "coffee", max_tokens=5)  # room for one of the two
+    assert len(selected) == 1 and selected[0] in {"takes coffee black", "coffee mug is blue"}
+    prompt = MemoryHandler.memory_prompt("alice", "coffee")
+    assert prompt.startswith("Things you know about the user")
+    assert MemoryHandler.memory_prompt("alice", "tea") is None
+
+def test_forget_removes_from_the_index(memory):
+    fact_id = MemoryHandler.remember_fact("alice", "parking spot is B12")
+    assert not MemoryHandler.forget("bob", fact_id)
+    assert MemoryHandler.forget("alice", fact_id)
+    assert MemoryHandler.search_memories("alice", "parking") == []
+
+def test_legacy_file_is_imported_once(monkeypatch, tmp_path):
+    legacy = tmp_path / "memory.json"
+    legacy.write_text(json.dumps({"last_task": "open maps", "last_session_time": "then", "pending_tasks": ["call mom"]}))
+    monkeypatch.setattr(MemoryHandler, "MEMORY_DB", str(tmp_path / "memory.sqlite3"))
+    monkeypatch.setattr(MemoryHandler, "MEMORY_FILE", str(legacy))
+    monkeypatch.setattr(MemoryHandler, "_conn", None)
+    try:
+        memory = MemoryHandler.load_memory()
+        assert memory == {"pending_tasks": ["call mom"], "last_task": "open maps", "last_session_time": "then"}
+        assert not legacy.exists() and (tmp_path / "memory.json.imported").exists()
+
+        MemoryHandler.save_task("play music", pending=["water plants"])
+        memory = MemoryHandler.load_memory()
+        assert memory["last_task"] == "play music"
+        assert memory["pending_tasks"] == ["call mom", "water plants"]
+    finally:
+        MemoryHandler._conn.close()
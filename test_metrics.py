@@ -0,0 +1,74 @@
+# ======================== test_metrics.py ========================
+# Metrics: counters, histograms, spans and the Prometheus exposition merged across workers.
+
+import asyncio
+import json
+
+import pytest
+
+from Backend import Metrics
+
+@pytest.fixture
+def registry(monkeypatch):
+    monkeypatch.setattr(Metrics, "_registry", [])
+    monkeypatch.setattr(Metrics, "MetricsDir", None)
+
+def test_counter_renders_labelled_samples(registry):
+    hits = Metrics.Counter("test_hits_total", "Hits", ["cache", "result"])
+    hits.inc(cache="search", result="hit")
+    hits.inc(2, cache="search", result="hit")
+    hits.inc(cache="search", result='mi"ss')
+    text = Metrics.RenderMetrics()
+    assert "# TYPE test_hits_total counter" in text
+    assert 'test_hits_total{cache="search",result="hit"} 3' in text
+    assert 'test_hits_total{cache="search",result="mi\\"ss"} 1' in text
+
+def test_histogram_buckets_are_cumulative(registry):
+    latency = Metrics.Histogram("test_seconds", "Latency", buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 5.0):
+        latency.observe(value)
+    text = Metrics.RenderMetrics()
+    assert 'test_seconds_bucket{le="0.1"} 1' in text
+    assert 'test_seconds_bucket{le="1.0"} 3' in text
+    assert 'test_seconds_bucket{le="+Inf"} 4' in text
+    assert "test_seconds_count 4" in text
+    assert "test_seconds_sum 6.25" in text
+
+def test_span_and_timed_record_stages_and_upstream_errors(registry, monkeypatch):
+    stages = Metrics.Histogram("test_stage_seconds", "Stages", ["stage"])
+    errors = Metrics.Counter("test_upstream_errors_total", "Errors", ["upstream"])
+    monkeypatch.setattr(Metrics, "StageLatency", stages)
+    monkeypatch.setattr(Metrics, "UpstreamErrors", errors)
+
+    @Metrics.timed("sync")
+    def work():
+        return 1
+
+    @Metrics.timed("async", upstream="groq")
+    async def fail():
+        raise RuntimeError("down")
+
+    assert work() == 1
+    with pytest.raises(RuntimeError):
+        asyncio.run(fail())
+    assert stages.snapshot()["sync"]["count"] == 1
+    assert stages.snapshot()["async"]["count"] == 1
+    assert errors.snapshot() == {"groq": 1}
+
+def test_render_merges_other_workers(registry, monkeypatch, tmp_path):
+    hits = Metrics.Counter("test_merged_total", "Hits", ["cache"])
+    latency = Metrics.Histogram("test_merged_seconds", "Latency", buckets=(1.0,))
+    hits.inc(cache="search")
+    latency.observe(0.5)
+    (tmp_path / "999999.json").write_text(json.dumps({
+        "test_merged_total": {"search": 4, "youtube": 1},
+        "test_merged_seconds": {"": {"buckets": [2], "count": 3, "sum": 9.0}}
+    }))
+    (tmp_path / "broken.json").write_text("{not json")
+    monkeypatch.setattr(Metrics, "MetricsDir", str(tmp_path))
+
+    text = Metrics.RenderMetrics()
+    assert 'test_merged_total{cache="search"} 5' in text
+    assert 'test_merged_total{cache="youtube"} 1' in text
+    assert 'test_merged_seconds_bucket{le="1.0"} 3' in text
+    assert "test_merged_seconds_count 4" in text
@@ -4,6 +4,16 @@ from Backend.RealtimeSearchEngine import RealtimeSearchEngine
 from Backend.Chatbot import ChatBot
 from Backend.PC_Automation import TranslateCommand as PCTranslateCommand
 from Backend.Andriod_Automation import TranslateAndroidCommand, human_friendly_responses
+from Backend.Metrics import span, timed, UpstreamErrors, RecordCache
+from Backend.Logger import GetLogger
+from Backend.SingleFlight import SingleFlight
+from Backend.LLMGateway import Complete
+from Backend import YouTubeCache
+from Backend import CodeArtifacts
+from Backend import MemoryHandler
+from Backend import Scheduler
+from Backend import Routines
+from Backend.ResponseTemplates import Render, DetectLocale
 from dotenv import dotenv_values
 import spacy
 from fuzzywuzzy import process
@@ -12,21 +22,34 @@ from deep_translator import GoogleTranslator
 
 import asyncio
 import aiohttp
-from groq import Groq
+from contextvars import ContextVar
+from datetime import datetime
 from googleapiclient.discovery import build
+import os
+
+log = GetLogger("engine")
 
 # Load Environment Variables
 env_vars = dotenv_values(".env")
 Username = env_vars.get("Username")
 Assistantname = env_vars.get("Assistantname")
 GroqAPIKey = env_vars.get("GroqAPIKey")
-YouTubeAPIKey = env_vars.get("YouTubeAPIKey")
+YouTubeAPIKey = env_vars.get("YouTubeAPIKey") or os.getenv("YOUTUBE_API_KEY")
+# Optional endpoint overrides (point these at local stand-ins for load testing)
+YouTubeAPIEndpoint = env_vars.get("YouTubeAPIEndpoint") or os.getenv("YOUTUBE_API_ENDPOINT")
+TranslateBaseURL = env_vars.get("TranslateBaseURL") or os.getenv("TRANSLATE_BASE_URL")
+BatchConcurrency = int(env_vars.get("BatchConcurrency", 4))
+MaxBatchSize = int(env_vars.get("MaxBatchSize", 32))
 
-# Initialize Groq for code generation
-groq_client = Groq(api_key=GroqAPIKey)
+# Identical concurrent upstream calls (from any request/thread) share one in-flight call
+ChatBot = SingleFlight("chatbot").wrap(ChatBot)
+RealtimeSearchEngine = SingleFlight("realtime_search").wrap(RealtimeSearchEngine)
 
 # Initialize YouTube API client
-youtube = build('youtube', 'v3', developerKey=YouTubeAPIKey) if YouTubeAPIKey else None
+youtube = build(
+    'youtube', 'v3', developerKey=YouTubeAPIKey,
+    client_options={"api_endpoint": YouTubeAPIEndpoint} if YouTubeAPIEndpoint else None
+) if YouTubeAPIKey else None
 
 # Load NLP models
 import spacy
@@ -37,25 +60,67 @@ def load_nlp_model():
 def load_multilang_model():     
     return spacy.load("xx_ent_wiki_sm")
 translator = GoogleTranslator(source='auto', target='en')
+if TranslateBaseURL:
+    translator._base_url = TranslateBaseURL
 
 
 # Supported Automation Tasks
 AutomationTypes = ["open", "close", "play", "system", "content", "google search", "youtube search", "code"]
 
+# Decisions that schedule a reminder/alarm, by prefix
+TIMER_DECISIONS = {"device_reminder": "reminder", "set reminder": "reminder", "remind": "reminder",
+                   "device_alarm": "alarm", "set alarm": "alarm"}
+ROUTINE_SAVE_PATTERN = re.compile(r"^(?:create|save|make)\s+(?:a\s+)?routine\s+(?:called\s+|named\s+)?(.+?)\s*(?::|\bto\b|\bas\b)\s*(.+)$", re.IGNORECASE)
+ROUTINE_RUN_PATTERN = re.compile(r"^(?:run|start)\s+(?:the\s+|my\s+)?(?:routine\s+)?(.+?)(?:\s+routine)?$", re.IGNORECASE)
+# "remember (that) ..." stores a long-term fact for the device's owner
+REMEMBER_PATTERN = re.compile(r"^(?:please\s+)?remember\s+(?:that\s+)?(.+)$", re.IGNORECASE)
+
 # Music app aliases
 MUSIC_APPS = {
     "youtube": ["youtube", "yutube", "youtub", "yt"],
     "spotify": ["spotify", "spotfy", "spsficsfic", "spoti", "spotfiy"]
 }
 
+# ----------------------- Batch Sharing ------------------------ #
+
+# Set by BatchExecution; maps (kind, key) -> task so identical work inside one batch runs once
+_batch_memo = ContextVar("batch_memo", default=None)
+
+async def shared(kind, key, call):
+    """Await call(), reusing the result of an identical (kind, key) call from the same batch."""
+    memo = _batch_memo.get()
+    if memo is None:
+        return await call()
+    task = memo.get((kind, key))
+    if task is None:
+        task = memo[(kind, key)] = asyncio.ensure_future(call())
+    return await asyncio.shield(task)
+
+async def BatchExecution(items, handler=None, concurrency=BatchConcurrency):
+    """
+    Run [(query, device_id), ...] through handler (MainExecution by default) with at most
+    `concurrency` in flight, sharing translation, intent and LLM calls across the batch.
+    Results come back in input order; a failing item yields its exception instead of a result.
+    """
+    handler = handler or MainExecution
+    _batch_memo.set({})
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(query, device_id):
+        async with semaphore:
+            return await handler(query, device_id)
+
+    return await asyncio.gather(*(run(query, device_id) for query, device_id in items), return_exceptions=True)
+
 # ----------------------- Utility Functions ------------------------ #
 
 async def translate_to_english(query):
     try:
-        translated = await asyncio.to_thread(translator.translate, query)
+        with span("translation", upstream="google_translate"):
+            translated = await shared("translate", query, lambda: asyncio.to_thread(translator.translate, query))
         return translated
     except Exception as e:
-        print(f"[ERROR] Translation failed: {e}")
+        log.error("Translation failed: %s", e)
         return query
 
 
@@ -81,28 +146,40 @@ def detect_music_app(query):
                 return app
     return "youtube"  # Default to YouTube
 
+@timed("code_generation")
 async def generate_code(description):
     """Generate code using Grok."""
     prompt = f"Write a Python program to {description}. Provide only the code in a code block:\n```python\n```"
-    completion = groq_client.chat.completions.create(
-        model="llama3-70b-8192",
-        messages=[{"role": "user", "content": prompt}],
-        max_tokens=2048,
-        temperature=0.7,
-        top_p=1,
-        stream=False
-    )
-    code = completion.choices[0].message.content.strip()
+    # The program ends up in device_command, so it is admitted as device work, not shed like chat
+    code = (await Complete([{"role": "user", "content": prompt}], max_tokens=2048, priority="device")).strip()
     # Extract code block
     code_match = re.search(r"```python\n([\s\S]*?)\n```", code)
     return code_match.group(1) if code_match else code
 
+@SingleFlight("code", key=CodeArtifacts.NormalizeDescription).wrap
+async def code_artifact(description):
+    """Stored artifact for a code request; the program is only generated on a cache miss."""
+    artifact = await asyncio.to_thread(CodeArtifacts.FindArtifact, description)
+    RecordCache("code_artifact", artifact is not None)
+    if artifact is None:
+        code = await generate_code(description)
+        artifact = await asyncio.to_thread(CodeArtifacts.StoreArtifact, description, code)
+    return artifact
+
 
+@SingleFlight("youtube", key=YouTubeCache.NormalizeSong).wrap
 async def get_youtube_video_id(query):
-    """Get the first YouTube video ID for a query."""
+    """Get the first YouTube video ID for a query, from the cache when possible."""
+    cached = await asyncio.to_thread(YouTubeCache.Lookup, query)
+    RecordCache("youtube", cached is not None)
+    if cached:
+        return cached
     if not youtube:
-        print("[ERROR] YouTube API key missing")
+        log.error("YouTube API key missing")
         return None, query
+    if not await asyncio.to_thread(YouTubeCache.ChargeQuota):
+        stale = await asyncio.to_thread(YouTubeCache.Lookup, query, True)
+        return stale or (None, query)
     try:
         request = youtube.search().list(
             part="id,snippet",
@@ -110,79 +187,160 @@ async def get_youtube_video_id(query):
             type="video",
             maxResults=1
         )
-        response = await asyncio.to_thread(request.execute)
+        with span("youtube_lookup"):
+            response = await asyncio.to_thread(request.execute)
         if response.get("items"):
             video_id = response["items"][0]["id"]["videoId"]
             video_title = response["items"][0]["snippet"]["title"]
-            print(f"[INFO] Found YouTube video: {video_title} (ID: {video_id})")
+            log.info("Found YouTube video: %s (ID: %s)", video_title, video_id)
+            await asyncio.to_thread(YouTubeCache.Store, query, video_id, video_title)
             return video_id, video_title
-        print(f"[WARNING] No YouTube videos found for query: {query}")
+        log.warning("No YouTube videos found for query: %s", query)
         return None, query
     except Exception as e:
-        print(f"[ERROR] YouTube API failed: {e}")
+        UpstreamErrors.inc(upstream="youtube")
+        log.error("YouTube API failed: %s", e)
         return None, query
 
+# ------------------- Reminders & Alarms ------------------- #
+
+def schedule_timer(kind, query, device_id, locale="en", fallback=None):
+    """
+    Schedule a reminder/alarm server-side; it is pushed to the device when it fires.
+    query is the step's own text; fallback (the whole utterance) is only read when it has no time.
+    """
+    if not device_id:
+        return Render("timer_no_device", locale)
+    scheduler = Scheduler.GetScheduler()
+    tz = scheduler.timezone(device_id)
+    when = Scheduler.ParseWhen(query, tz=tz)
+    if when is None and fallback:
+        when = Scheduler.ParseWhen(fallback, tz=tz)
+    if when is None:
+        return Render(f"{kind}_no_time", locale)
+    due_at, text = when
+    scheduler.schedule(device_id, kind, text or kind.capitalize(), due_at)
+    MemoryHandler.add_task(device_id, text or kind, due_at=due_at)
+    at = datetime.fromtimestamp(due_at, tz).strftime("%I:%M %p").lstrip("0")
+    return Render(f"{kind}_set_text", locale, at=at, text=text) if text else Render(f"{kind}_set", locale, at=at)
+
+async def execute_decision(decision, music_app, device_id, query_translated, locale="en"):
+    """Run one plan step; returns (answers, android commands, pc commands)"""
+    answers, android, pc = [], [], []
+    decision_lower = decision.lower().strip()
+
+    if decision_lower.startswith("general"):
+        general_query = await translate_to_english(decision.replace("general", "").strip())
+        with span("chatbot"):
+            answer = await shared("chatbot", (general_query, device_id), lambda: asyncio.to_thread(ChatBot, general_query, device_id))
+        answers.append(Render("general", locale, answer=answer))
+
+    elif decision_lower.startswith("realtime"):
+        realtime_query = await translate_to_english(decision.replace("realtime", "").strip())
+        with span("realtime_search"):
+            answer = await shared("realtime", realtime_query, lambda: asyncio.to_thread(RealtimeSearchEngine, realtime_query))
+        answers.append(Render("realtime", locale, answer=answer))
+
+    elif decision_lower.startswith("play"):
+        song_name = clean_query(decision.replace("play", "").strip(), music_app)
+        if song_name:
+            if music_app == "youtube":
+                video_id, video_title = await shared("youtube", song_name, lambda: get_youtube_video_id(song_name))
+                cmd = f"play::video_id::{video_id}" if video_id else f"play::{song_name}"
+                tts_response = Render("play_youtube", locale, title=video_title) if video_id else Render("search_youtube", locale, query=song_name)
+            else:
+                cmd = f"play::{song_name} on spotify"
+                tts_response = Render("play_spotify", locale, query=song_name)
+            if device_id:
+                android.append(cmd)
+                answers.append(tts_response)
+            else:
+                pc.append(cmd)
+                answers.append(Render("play_pc", locale, query=song_name))
+
+    elif decision_lower.startswith("open"):
+        app_name = clean_query(decision.replace("open", "").strip())
+        if app_name:
+            android.append(f"open::{app_name}")
+            answers.append(Render("open", locale, app=app_name.capitalize()))
+
+    elif decision_lower.startswith("code"):
+        code_desc = clean_query(decision.replace("code", "").strip())
+        if code_desc:
+            artifact = await shared("code", code_desc, lambda: code_artifact(code_desc))
+            android.append(f"code::{code_desc}::artifact::{artifact['id']}")
+            answers.append(Render("code", locale, description=code_desc))
+
+    elif any(decision_lower.startswith(t) for t in TIMER_DECISIONS):
+        trigger, kind = next((t, k) for t, k in TIMER_DECISIONS.items() if decision_lower.startswith(t))
+        step_text = decision.strip()[len(trigger):].lstrip(":").strip() if trigger.startswith("device_") else decision
+        answers.append(await asyncio.to_thread(schedule_timer, kind, step_text, device_id, locale, query_translated))
+
+    elif any(decision_lower.startswith(t) for t in AutomationTypes):
+        android.append(decision)
+
+    return answers, android, pc
+
+def find_routine(device_id, query):
+    """Stored routine named by "run <name>" or by the whole query"""
+    running = ROUTINE_RUN_PATTERN.match(query.strip())
+    if running:
+        routine = Routines.GetRoutine(device_id, running.group(1))
+        if routine:
+            return routine
+    return Routines.GetRoutine(device_id, query)
+
 # ------------------- Main Core Decision + Dispatcher ------------------- #
 
 async def MainExecution(Query, device_id=None):
-    print(f"[INFO] Incoming Query → {Query} from {device_id}")
+    log.info("Incoming Query → %s from %s", Query, device_id)
 
     # Translate Hindi to English
     query_translated = await translate_to_english(Query)
-    print(f"[DEBUG] Translated Query → {query_translated}")
-
-    # Get intent from FirstLayerDMM
-    decisions = FirstLayerDMM(query_translated)
-    print(f"[DEBUG] Decision Tree → {decisions}")
+    log.debug("Translated Query → %s", query_translated)
+    locale = DetectLocale(Query)
+
+    remember = REMEMBER_PATTERN.match(query_translated.strip())
+    if remember:
+        await asyncio.to_thread(MemoryHandler.remember_fact, device_id, remember.group(1))
+        reply = Render("remember", locale)
+        return reply, {"tts_text": reply, "device_command": "", "commands": []}
+
+    saving = ROUTINE_SAVE_PATTERN.match(query_translated.strip())
+    if saving:
+        name, commands = saving.groups()
+        decisions = await shared("intent", commands, lambda: asyncio.to_thread(FirstLayerDMM, commands))
+        await asyncio.to_thread(Routines.SaveRoutine, device_id, name, Routines.BuildPlan(decisions), commands)
+        reply = Render("routine_saved", locale, name=name, steps=len(decisions))
+        return reply, {"tts_text": reply, "device_command": "", "commands": []}
+
+    # A stored routine replays its plan; anything else goes through FirstLayerDMM
+    routine = await asyncio.to_thread(find_routine, device_id, query_translated)
+    if routine:
+        plan, source = routine["plan"], routine["source"] or query_translated
+    else:
+        with span("first_layer_dmm"):
+            decisions = await shared("intent", query_translated, lambda: asyncio.to_thread(FirstLayerDMM, query_translated))
+        plan, source = Routines.BuildPlan(decisions), query_translated
+    log.debug("Plan → %s", plan)
+
+    music_app = detect_music_app(source)
+
+    async def run_step(step):
+        return await execute_decision(step["decision"], music_app, device_id, source, locale)
 
     device_tasks = {"android": [], "pc": []}
     final_answers = []
-
-    music_app = detect_music_app(query_translated)
-
-    for decision in decisions:
-        decision_lower = decision.lower().strip()
-
-        if decision_lower.startswith("general"):
-            answer = ChatBot(await translate_to_english(decision.replace("general", "").strip()))
-            final_answers.append(f"[General] {answer}")
-
-        elif decision_lower.startswith("realtime"):
-            answer = RealtimeSearchEngine(await translate_to_english(decision.replace("realtime", "").strip()))
-            final_answers.append(f"[Realtime] {answer}")
-
-        elif decision_lower.startswith("play"):
-            song_name = clean_query(decision.replace("play", "").strip(), music_app)
-            if song_name:
-                if music_app == "youtube":
-                    video_id, video_title = await get_youtube_video_id(song_name)
-                    cmd = f"play::video_id::{video_id}" if video_id else f"play::{song_name}"
-                    tts_response = f"Playing {video_title} on YouTube." if video_id else f"Searching {song_name} on YouTube."
-                else:
-                    cmd = f"play::{song_name} on spotify"
-                    tts_response = f"Playing {song_name} on Spotify."
-                if device_id:
-                    device_tasks["android"].append(cmd)
-                    final_answers.append(tts_response)
-                else:
-                    device_tasks["pc"].append(cmd)
-                    final_answers.append(f"Playing {song_name} on your computer.")
-
-        elif decision_lower.startswith("open"):
-            app_name = clean_query(decision.replace("open", "").strip())
-            if app_name:
-                device_tasks["android"].append(f"open::{app_name}")
-                final_answers.append(f"Opening {app_name.capitalize()} on your phone.")
-
-        elif decision_lower.startswith("code"):
-            code_desc = clean_query(decision.replace("code", "").strip())
-            if code_desc:
-                code = await generate_code(code_desc)
-                device_tasks["android"].append(f"code::{code_desc}::{code}")
-                final_answers.append(f"Generated code for {code_desc} and sent to your device.")
-
-        elif any(decision_lower.startswith(t) for t in AutomationTypes):
-            device_tasks["android"].append(decision)
+    with span("execute_plan"):
+        results = await Routines.ExecutePlan(plan, run_step)
+    for step, result in zip(plan, results):
+        if isinstance(result, Exception):
+            log.error("Step %s (%s) failed: %s", step["id"], step["decision"], result)
+            continue
+        answers, android, pc = result
+        final_answers.extend(answers)
+        device_tasks["android"].extend(android)
+        device_tasks["pc"].extend(pc)
 
     # Execution Phase (async)
     if device_tasks["android"] and device_id:
@@ -191,15 +349,17 @@ async def MainExecution(Query, device_id=None):
     if device_tasks["pc"]:
         PCTranslateCommand(device_tasks["pc"])
 
+    await asyncio.to_thread(MemoryHandler.save_task, Query, owner=device_id)
+
     # Human-like reply
-    final_output = "\n".join(final_answers) or human_friendly_responses(device_tasks) or "Done."
+    final_output = "\n".join(final_answers) or human_friendly_responses(device_tasks, locale) or Render("done", locale)
 
     # Generate device_action
 # Generate device_action
     # Generate device_action
     flatten_android_commands = []
     for cmd in device_tasks["android"]:
-        if cmd.lower().strip().startswith("play::") or cmd.lower().strip().startswith("open::"):
+        if cmd.lower().strip().startswith(("play::", "open::", "code::")):
             flatten_android_commands.append(cmd.strip())  # ✅ as-is, no lowercase
         else:
             cmd_lower = cmd.lower().strip()
@@ -213,7 +373,8 @@ async def MainExecution(Query, device_id=None):
     # ✅ Yeh loop khatam hone ke baad hi return karo
     return final_output, {
         "tts_text": final_output,
-        "device_command": ";".join(flatten_android_commands) if flatten_android_commands else ""
+        "device_command": ";".join(flatten_android_commands) if flatten_android_commands else "",
+        "commands": flatten_android_commands
     }
 
 # ------------------ END MODULE ------------------ #
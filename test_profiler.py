@@ -0,0 +1,106 @@
+# ======================== test_profiler.py ========================
+# Per-request sampling profiler: what gets sampled and how it is stored.
+
+import asyncio
+import os
+import threading
+import time
+
+from Backend import Profiler
+
+def spin_in_worker(seconds=0.3):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        sum(range(1000))
+
+def spin_elsewhere(seconds=0.3):
+    spin_in_worker(seconds)
+
+def _read(result):
+    with open(Profiler.ProfilePath(result["name"])) as f:
+        return f.read()
+
+def test_samples_to_thread_workers_and_labels_threads():
+    with Profiler.ProfileRequest(True, label="worker") as result:
+        asyncio.run(Profiler.RunProfiled(asyncio.to_thread(spin_in_worker)))
+    collapsed = _read(result)
+    worker_lines = [line for line in collapsed.splitlines() if "spin_in_worker" in line]
+    assert worker_lines, collapsed
+    assert all(line.startswith("[asyncio_") for line in worker_lines)
+    assert any(line.startswith("[MainThread]") for line in collapsed.splitlines())
+
+def test_other_requests_threads_are_not_sampled():
+    # Another request's executor thread, busy at the same time under the same naming scheme
+    other = threading.Thread(target=lambda: asyncio.run(asyncio.to_thread(spin_elsewhere, 0.5)))
+    other.start()
+    with Profiler.ProfileRequest(True, label="isolated") as result:
+        asyncio.run(Profiler.RunProfiled(asyncio.to_thread(spin_in_worker)))
+    other.join()
+    collapsed = _read(result)
+    assert "spin_in_worker" in collapsed
+    assert "spin_elsewhere" not in collapsed
+
+def test_shared_loop_samples_only_the_requests_task():
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="shared-loop", daemon=True).start()
+
+    async def step(fn):
+        with Profiler.ProfileHelper():
+            for _ in range(60):
+                fn(0.005)
+                await asyncio.sleep(0)
+
+    try:
+        other = []
+        thread = threading.Thread(target=lambda: other.append(asyncio.run_coroutine_threadsafe(step(spin_elsewhere), loop)))
+        thread.start()
+        thread.join()
+        with Profiler.ProfileRequest(True, label="gateway") as result:
+            asyncio.run_coroutine_threadsafe(step(spin_in_worker), loop).result(timeout=10)
+        other[0].result(timeout=10)
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+    collapsed = _read(result)
+    assert any(line.startswith("[shared-loop]") and "spin_in_worker" in line for line in collapsed.splitlines())
+    assert "spin_elsewhere" not in collapsed
+
+def test_idle_helper_threads_are_not_sampled():
+    sampler = Profiler.StackSampler(0, interval=0.001).start()
+    idle = threading.Event()
+    helper = threading.Thread(target=lambda: Profiler._attached(sampler, idle.wait, 5))
+    helper.start()
+    time.sleep(0.05)
+    idle.set()
+    helper.join()
+    sampler.stop()
+    for stack in sampler.samples:
+        assert stack[0][0] != "[profile-sampler]"
+        leaf = stack[-1]
+        assert (leaf[0], os.path.basename(leaf[1])) not in Profiler.IDLE_LEAVES
+
+def test_should_profile_honours_header_and_token(monkeypatch):
+    monkeypatch.setattr(Profiler, "ProfileSampleRate", 0)
+    monkeypatch.setattr(Profiler, "ProfileToken", None)
+    assert Profiler.ShouldProfile({"X-Nexon-Profile": "1"})
+    assert not Profiler.ShouldProfile({})
+    monkeypatch.setattr(Profiler, "ProfileToken", "secret")
+    assert not Profiler.ShouldProfile({"X-Nexon-Profile": "1"})
+    assert Profiler.ShouldProfile({"X-Nexon-Profile": "secret"})
+
+def test_profile_path_rejects_unsafe_names():
+    assert Profiler.ProfilePath("../app.py") is None
+    assert Profiler.ProfilePath("missing.collapsed") is None
+
+def test_profile_endpoints_require_the_token(monkeypatch):
+    import app
+    client = app.app.test_client()
+    with Profiler.ProfileRequest(True, label="guarded") as result:
+        spin_in_worker(0.02)
+    monkeypatch.setattr(Profiler, "ProfileToken", "secret")
+    assert client.get("/profiles").status_code == 403
+    assert client.get(f"/profiles/{result['name']}", headers={"X-Nexon-Profile": "wrong"}).status_code == 403
+    headers = {"X-Nexon-Profile": "secret"}
+    assert result["name"] in [p["name"] for p in client.get("/profiles", headers=headers).get_json()]
+    assert client.get(f"/profiles/{result['name']}", headers=headers).status_code == 200
+    monkeypatch.setattr(Profiler, "ProfileToken", None)
+    assert client.get("/profiles").status_code == 200
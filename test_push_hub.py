@@ -0,0 +1,104 @@
+# ======================== test_push_hub.py ========================
+# Push hub delivery, acknowledgements, presence and outbox purging.
+
+import json
+import queue
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from Backend import PushHub
+
+class FakeSocket:
+    """Blocking receive() like simple-websocket; sent frames are recorded"""
+
+    def __init__(self):
+        self.incoming = queue.Queue()
+        self.sent = queue.Queue()
+
+    def receive(self, timeout=None):
+        return self.incoming.get(timeout=timeout)
+
+    def send(self, data):
+        self.sent.put(json.loads(data))
+
+    def close(self):
+        self.incoming.put(None)
+
+@pytest.fixture(autouse=True)
+def fast_polling(monkeypatch):
+    monkeypatch.setattr(PushHub, "PushPollInterval", 0.05)
+
+@pytest.fixture
+def socket():
+    ws = FakeSocket()
+    thread = threading.Thread(target=PushHub.ServeWebSocket, args=(ws, "ws-device"), daemon=True)
+    thread.start()
+    yield ws
+    ws.close()
+    thread.join(timeout=2)
+
+def test_websocket_gets_pushes_and_acks_them(socket):
+    message_id = PushHub.Push("ws-device", "open", {"app": "maps"})
+    frame = socket.sent.get(timeout=2)
+    assert frame == {"type": "command", "id": message_id, "command": "open", "payload": {"app": "maps"}}
+    socket.incoming.put(json.dumps({"type": "ack", "id": message_id, "result": {"ok": True}}))
+    acked = PushHub.WaitForAck(message_id, timeout=2)
+    assert acked["status"] == "ok" and acked["result"] == {"ok": True}
+
+def test_pushes_from_another_worker_reach_the_socket(socket):
+    PushHub.IsConnected("ws-device")  # make sure the hub's connection exists
+    other = sqlite3.connect(PushHub.PushHubPath, isolation_level=None)
+    other.execute("INSERT INTO outbox (device_id, command, payload, created_at) VALUES ('ws-device', 'close', NULL, ?)", (time.time(),))
+    assert socket.sent.get(timeout=2)["command"] == "close"
+
+def test_presence_follows_connect_and_disconnect():
+    ws = FakeSocket()
+    thread = threading.Thread(target=PushHub.ServeWebSocket, args=(ws, "short-lived"), daemon=True)
+    thread.start()
+    for _ in range(100):
+        if PushHub.IsConnected("short-lived"):
+            break
+        time.sleep(0.01)
+    assert PushHub.IsConnected("short-lived")
+    ws.close()
+    thread.join(timeout=2)
+    assert not PushHub.IsConnected("short-lived")
+
+def test_touch_only_writes_when_presence_changes(monkeypatch):
+    writes = []
+    real_db = PushHub._db
+
+    class CountingDb:
+        def execute(self, sql, *args):
+            if sql.startswith("INSERT OR REPLACE INTO presence"):
+                writes.append(args)
+            return real_db().execute(sql, *args)
+    monkeypatch.setattr(PushHub, "_db", CountingDb)
+    for _ in range(50):
+        PushHub.Touch("poller", "poll")
+    PushHub.Touch("poller", "websocket")
+    assert len(writes) == 2
+
+def test_long_poll_wakes_on_push():
+    results = []
+    thread = threading.Thread(target=lambda: results.append(PushHub.WaitForMessages("poller-2", timeout=5)))
+    thread.start()
+    time.sleep(0.1)
+    PushHub.Push("poller-2", "play", {"query": "news"})
+    thread.join(timeout=2)
+    assert results and results[0][0]["command"] == "play"
+
+def test_purge_removes_acked_and_expired_rows(monkeypatch):
+    kept = PushHub.Push("purge-device", "keep")
+    acked = PushHub.Push("purge-device", "done")
+    PushHub.Ack("purge-device", acked)
+    monkeypatch.setattr(PushHub, "PushAckedRetention", -1)
+    assert PushHub.Purge() >= 1
+    assert PushHub.GetMessage(acked) is None
+    assert PushHub.GetMessage(kept) is not None
+    monkeypatch.setattr(PushHub, "PushMessageTTL", -1)
+    PushHub.Purge()
+    assert PushHub.GetMessage(kept) is None
@@ -0,0 +1,131 @@
+# ======================== test_realtime_search_engine.py ========================
+# Real-time search: cached results, parallel snippet fetching against a local fixture server.
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from Backend import RealtimeSearchEngine as engine
+
+PAGE = """<html><head><meta name="description" content="Fixture page about {topic}.">
+<script>var ignored = "script text";</script></head>
+<body><nav>menu</nav><p>{topic} paragraph with enough words in it to count as real readable content.</p></body></html>"""
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    searches = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/search":
+            query = parse_qs(url.query)["q"][0]
+            FixtureHandler.searches.append(query)
+            base = f"http://127.0.0.1:{self.server.server_port}"
+            body = json.dumps([
+                {"title": "Fast", "description": "fast result", "url": f"{base}/page/fast"},
+                {"title": "Other", "description": "other result", "url": f"{base}/page/other"},
+                {"title": "Broken", "description": "broken result", "url": f"{base}/missing"},
+            ])
+            content_type = "application/json"
+        elif url.path.startswith("/page/"):
+            topic = url.path.rsplit("/", 1)[1]
+            if topic == "slow":
+                time.sleep(1.0)
+            body, content_type = PAGE.format(topic=topic), "text/html"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.end_headers()
+        self.wfile.write(body.encode())
+
+@pytest.fixture(scope="module")
+def fixture_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+@pytest.fixture(autouse=True)
+def fixture_backend(fixture_server):
+    engine.SetSearchBackend(engine.HTTPSearchBackend(f"{fixture_server}/search"))
+    FixtureHandler.searches = []
+    yield
+    engine.ClearSearchCache()
+
+def test_snippets_fetched_in_parallel_within_the_deadline(fixture_server):
+    results = [{"url": f"{fixture_server}/page/{topic}"} for topic in ("fast", "slow", "other")] + [{"url": f"{fixture_server}/missing"}]
+    started = time.monotonic()
+    snippets = engine.FetchSnippets(results, deadline=0.5)
+    assert time.monotonic() - started < 0.9  # the slow page is dropped, not waited for
+    assert sorted(snippets) == [0, 2]
+    assert snippets[0].startswith("Fixture page about fast.")
+
+def test_search_answer_lists_results_with_content():
+    answer = engine.GoogleSearch("python release")
+    assert answer.startswith("The search results for 'python release' are:")
+    assert "Content: Fixture page about fast." in answer
+    assert "Title: Broken" in answer and "script text" not in answer
+
+def test_repeat_queries_are_served_from_cache():
+    first = engine.GoogleSearch("Python release?")
+    second = engine.GoogleSearch("python   release")
+    assert first == second
+    assert FixtureHandler.searches == ["Python release?"]
+
+def test_hot_queries_expire_sooner(monkeypatch):
+    monkeypatch.setattr(engine, "SearchHotCacheTTL", 0)
+    engine.GoogleSearch("weather today")
+    engine.GoogleSearch("weather today")
+    assert len(FixtureHandler.searches) == 2
+
+def test_extract_snippet_skips_boilerplate():
+    snippet = engine.ExtractSnippet(PAGE.format(topic="cats"))
+    assert snippet.startswith("Fixture page about cats.")
+    assert "menu" not in snippet and "script text" not in snippet
+
+# ==================== PROMPT ASSEMBLY ====================
+
+def test_build_prompt_leaves_the_static_prefix_untouched():
+    before = [dict(message) for message in engine.SystemChatBot]
+    first = engine.BuildPrompt("q1", [], "results one")
+    second = engine.BuildPrompt("q2", [], "results two")
+    assert [dict(message) for message in engine.SystemChatBot] == before
+    assert first is not second
+    assert "results one" not in str(second)
+
+def test_build_prompt_stays_within_budget(monkeypatch):
+    monkeypatch.setattr(engine, "MaxPromptTokens", 2000)
+    history = [{"role": "user", "content": f"turn {i} " + "x" * 200} for i in range(100)]
+    prompt = engine.BuildPrompt("latest?", history, "line\n" * 5000)
+    assert sum(engine.EstimateTokens(m["content"]) for m in prompt) <= 2000
+    assert prompt[-1] == {"role": "user", "content": "latest?"}
+    assert history[-1] in prompt and history[0] not in prompt
+    assert prompt[len(engine.SystemChatBot)]["content"].endswith("[end]")
+
+def test_concurrent_requests_get_their_own_search_context(monkeypatch):
+    seen = {}
+    barrier = threading.Barrier(2)
+
+    def complete(messages, **kwargs):
+        barrier.wait(timeout=5)  # both prompts are assembled before either answers
+        question = messages[-1]["content"]
+        seen[question] = [m["content"] for m in messages if m["role"] == "system"]
+        return f"answer to {question}"
+    monkeypatch.setattr(engine, "CompleteSync", complete)
+    monkeypatch.setattr(engine, "GoogleSearch", lambda query: f"results for {query}")
+
+    threads = [threading.Thread(target=engine.RealtimeSearchEngine, args=(q,)) for q in ("alpha", "beta")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    assert "results for alpha" in seen["alpha"] and "results for beta" not in seen["alpha"]
+    assert "results for beta" in seen["beta"] and "results for alpha" not in seen["beta"]
@@ -0,0 +1,54 @@
+# ======================== test_response_templates.py ========================
+# Reply templates: locale detection, rendering with fallback and describing device commands.
+
+import pytest
+
+from Backend import ResponseTemplates
+from Backend.ResponseTemplates import DescribeCommand, DescribeTasks, DetectLocale, Render
+
+def test_every_locale_uses_the_english_fields():
+    for (locale, opcode), parts in ResponseTemplates._compiled.items():
+        english = ResponseTemplates._compiled[("en", opcode)]
+        assert ResponseTemplates._fields(parts) == ResponseTemplates._fields(english), (locale, opcode)
+
+def test_detect_locale(monkeypatch):
+    monkeypatch.setattr(ResponseTemplates, "DefaultLocale", "en")
+    assert DetectLocale("व्हाट्सएप खोलो") == "hi"
+    assert DetectLocale("whatsapp kholo") == "en"
+    assert DetectLocale("") == "en"
+
+def test_render_fills_fields_and_falls_back_to_english():
+    assert Render("open", "en", app="WhatsApp") == "Opening WhatsApp on your phone."
+    assert Render("open", "hi", app="WhatsApp") == "आपके फ़ोन पर WhatsApp खोल रहा हूँ।"
+    assert Render("routine_saved", "fr", name="morning", steps=3) == "Saved routine morning with 3 steps."
+    assert Render("done", "hi") == "हो गया।"
+    with pytest.raises(KeyError):
+        Render("open", "en")
+
+@pytest.mark.parametrize("command, expected", [
+    ("open::whatsapp", "open whatsapp"),
+    ("app::open::whatsapp", "open whatsapp"),
+    ("open whatsapp", "open whatsapp"),
+    ("play::video_id::abc123", "play the video"),
+    ("media::play_song::despacito", "play despacito"),
+    ("google search weather today", "search Google for weather today"),
+    ("device::brightness::80", "set brightness to 80"),
+    ("device::volume::up::60", "turn volume up to 60"),
+    ({"op": "content", "topic": "dogs"}, "write about dogs"),
+    ("screenshot::now", "screenshot now"),
+    ("device::flashlight::on", "device flashlight on"),
+    ("device_silent_on", "device silent on"),
+])
+def test_describe_command(command, expected):
+    assert DescribeCommand(command, "en") == expected
+
+def test_describe_tasks_per_device():
+    tasks = {"android": ["open::whatsapp", "play::video_id::x"], "pc": ["open notepad"]}
+    assert DescribeTasks(tasks, "en") == "On your phone, I'll: open whatsapp, play the video. On your computer: open notepad."
+    assert DescribeTasks({"android": ["open::maps"]}, "hi") == "आपके फ़ोन पर मैं: maps खोलूँगा।"
+    assert DescribeTasks({"android": [], "pc": []}, "en") == "No valid tasks were found for your devices."
+
+def test_android_automation_delegates_to_templates():
+    from Backend.Andriod_Automation import human_friendly_responses
+    tasks = {"android": ["open::youtube"]}
+    assert human_friendly_responses(tasks, "en") == DescribeTasks(tasks, "en")
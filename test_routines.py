@@ -0,0 +1,102 @@
+# ======================== test_routines.py ========================
+# Routines: dependency plans for multi-command utterances, their execution and named replays.
+
+import asyncio
+
+import pytest
+
+from Backend import Routines
+
+DECISIONS = ["open whatsapp", "general how are you", "play despacito", "set brightness 80"]
+
+@pytest.fixture
+def store(monkeypatch, tmp_path):
+    monkeypatch.setattr(Routines, "RoutinesPath", str(tmp_path / "routines.sqlite3"))
+    monkeypatch.setattr(Routines, "_conn", None)
+    yield
+    if Routines._conn is not None:
+        Routines._conn.close()
+
+def test_foreground_steps_form_a_chain():
+    plan = Routines.BuildPlan(DECISIONS)
+    assert [step["after"] for step in plan] == [[], [], [0], []]
+    assert Routines.ValidatePlan(plan) is plan
+
+@pytest.mark.parametrize("plan", [
+    [{"id": 0, "decision": "open maps", "after": [1]}, {"id": 1, "decision": "play x", "after": []}],
+    [{"id": 1, "decision": "open maps", "after": []}],
+    [{"id": 0, "after": []}],
+])
+def test_invalid_plans_are_rejected(plan):
+    with pytest.raises(ValueError):
+        Routines.ValidatePlan(plan)
+
+def test_execution_respects_dependencies_and_overlaps_the_rest():
+    events = []
+
+    async def run_step(step):
+        events.append(("start", step["id"]))
+        await asyncio.sleep(0.02 if step["id"] == 0 else 0)
+        if step["decision"] == "set brightness 80":
+            raise RuntimeError("no permission")
+        events.append(("end", step["id"]))
+        return step["decision"].upper()
+
+    results = asyncio.run(Routines.ExecutePlan(Routines.BuildPlan(DECISIONS), run_step))
+    assert results[:3] == ["OPEN WHATSAPP", "GENERAL HOW ARE YOU", "PLAY DESPACITO"]
+    assert isinstance(results[3], RuntimeError)
+    assert events.index(("end", 0)) < events.index(("start", 2))
+    assert events.index(("start", 1)) < events.index(("end", 0))  # chat did not wait for the app
+
+def test_failed_step_fails_its_dependents():
+    async def run_step(step):
+        if step["id"] == 0:
+            raise RuntimeError("app missing")
+        return "ok"
+
+    results = asyncio.run(Routines.ExecutePlan(Routines.BuildPlan(DECISIONS), run_step))
+    assert isinstance(results[0], RuntimeError) and isinstance(results[2], RuntimeError)
+    assert results[1] == results[3] == "ok"
+
+def test_named_routines_are_stored_per_owner(store):
+    plan = Routines.BuildPlan(DECISIONS)
+    assert Routines.SaveRoutine("d1", "Good Morning!", plan, source="open whatsapp and ...") == "good morning"
+    assert Routines.GetRoutine("d1", "good   morning")["plan"] == plan
+    assert Routines.GetRoutine("d2", "good morning") is None
+    assert [r["name"] for r in Routines.ListRoutines("d1")] == ["Good Morning!"]
+    with pytest.raises(ValueError):
+        Routines.SaveRoutine("d1", "!!!", plan)
+    assert Routines.DeleteRoutine("d1", "GOOD MORNING")
+    assert Routines.ListRoutines("d1") == []
+
+def test_saved_routine_replays_without_intent_classification(store, monkeypatch):
+    import test_model
+
+    classified = []
+    executed = []
+
+    async def translate(query):
+        return query
+
+    def classify(query):
+        classified.append(query)
+        return ["open whatsapp", "play despacito"]
+
+    async def execute(decision, music_app, device_id, query, locale="en"):
+        executed.append(decision)
+        return [], [f"{decision.replace(' ', '::', 1)}"], []
+
+    monkeypatch.setattr(test_model, "translate_to_english", translate)
+    monkeypatch.setattr(test_model, "FirstLayerDMM", classify)
+    monkeypatch.setattr(test_model, "execute_decision", execute)
+    monkeypatch.setattr(test_model, "TranslateAndroidCommand", lambda tasks: None)
+    monkeypatch.setattr(test_model.MemoryHandler, "save_task", lambda *args, **kwargs: None)
+
+    reply, _ = asyncio.run(test_model.MainExecution("save routine wake up: open whatsapp and play despacito", "d1"))
+    assert "wake up" in reply.lower()
+    assert classified == ["open whatsapp and play despacito"]
+
+    _, action = asyncio.run(test_model.MainExecution("run wake up", "d1"))
+    assert len(classified) == 1  # the stored plan was replayed
+    assert executed == ["open whatsapp", "play despacito"]
+    assert action["commands"] == ["open::whatsapp", "play::despacito"]
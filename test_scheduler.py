@@ -0,0 +1,172 @@
+# ======================== test_scheduler.py ========================
+# Reminder/alarm scheduler driven by ManualClock: nothing here sleeps waiting for a timer.
+
+import threading
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from Backend import Scheduler
+
+START = 1_800_000_000.0
+
+@pytest.fixture
+def clock():
+    return Scheduler.ManualClock(START)
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "scheduler.sqlite3")
+
+@pytest.fixture
+def fired():
+    return []
+
+def make(db_path, clock, fired, name="a"):
+    return Scheduler.Scheduler(db_path, clock, lambda job_id, device_id, kind, text, due_at: fired.append((name, text)))
+
+def test_jobs_fire_in_due_order_once_due(db_path, clock, fired):
+    scheduler = make(db_path, clock, fired)
+    scheduler.schedule("phone", "reminder", "second", START + 20)
+    scheduler.schedule("phone", "alarm", "first", START + 10)
+    assert scheduler.run_due() == 0
+    clock.advance(15)
+    assert scheduler.run_due() == 1
+    clock.advance(10)
+    scheduler.run_due()
+    assert fired == [("a", "first"), ("a", "second")]
+    assert scheduler.jobs("phone") == []
+    assert [job["text"] for job in scheduler.jobs("phone", "fired")] == ["first", "second"]
+
+def test_cancelled_jobs_never_fire(db_path, clock, fired):
+    scheduler = make(db_path, clock, fired)
+    job_id = scheduler.schedule("phone", "reminder", "cancel me", START + 5)
+    assert scheduler.cancel(job_id, "phone")
+    assert not scheduler.cancel(job_id, "phone")
+    clock.advance(10)
+    assert scheduler.run_due() == 0 and fired == []
+
+def test_snooze_fires_again_later(db_path, clock, fired):
+    scheduler = make(db_path, clock, fired)
+    job_id = scheduler.schedule("phone", "alarm", "wake up", START + 5)
+    clock.advance(5)
+    scheduler.run_due()
+    new_id = scheduler.snooze(job_id, 600, "phone")
+    assert new_id and new_id != job_id
+    assert scheduler.snooze(job_id, 600, "phone") is None  # already snoozed
+    clock.advance(599)
+    assert scheduler.run_due() == 0
+    clock.advance(1)
+    assert scheduler.run_due() == 1
+    assert fired == [("a", "wake up"), ("a", "wake up")]
+
+def test_restart_recovers_overdue_jobs_without_refiring(db_path, clock, fired):
+    before = make(db_path, clock, fired, "before")
+    before.schedule("phone", "reminder", "already fired", START + 1)
+    before.schedule("phone", "reminder", "missed while down", START + 30)
+    before.schedule("phone", "reminder", "far future", START + 3 * 86400)
+    clock.advance(1)
+    before.run_due()
+
+    clock.advance(3600)  # server was down past the second job's due time
+    after = make(db_path, clock, fired, "after")
+    assert after.run_due() == 1
+    assert fired == [("before", "already fired"), ("after", "missed while down")]
+    clock.advance(3 * 86400)
+    after.run_due()
+    assert fired[-1] == ("after", "far future")
+
+def test_workers_share_jobs_and_claim_each_once(db_path, clock, fired):
+    a, b = make(db_path, clock, fired, "a"), make(db_path, clock, fired, "b")
+    a.run_due(), b.run_due()  # both have loaded their horizon
+    for i in range(5):
+        b.schedule("phone", "reminder", f"job {i}", START + 10 + i)
+    clock.advance(Scheduler.SchedulerPollInterval + 20)
+    a.run_due(), b.run_due()
+    assert sorted(text for _, text in fired) == [f"job {i}" for i in range(5)]
+    assert any(worker == "a" for worker, _ in fired)  # a saw b's jobs through the incremental refill
+
+def test_background_thread_fires_on_manual_clock(db_path, clock, fired):
+    import time
+    scheduler = make(db_path, clock, fired).start()
+    scheduler.schedule("phone", "alarm", "bg", START + 30)
+    clock.advance(31)
+    for _ in range(100):
+        if fired:
+            break
+        time.sleep(0.01)
+    scheduler.stop()
+    scheduler._thread.join(timeout=5)
+    assert fired == [("a", "bg")]
+
+def test_clock_times_use_the_device_timezone(db_path, clock, fired):
+    scheduler = make(db_path, clock, fired)
+    scheduler.set_timezone("phone", "Asia/Kolkata")
+    with pytest.raises(ValueError):
+        scheduler.set_timezone("phone", "Mars/Olympus")
+    tz = scheduler.timezone("phone")
+    now = datetime(2026, 10, 19, 15, 0, tzinfo=ZoneInfo("Asia/Kolkata")).timestamp()
+    due_at, text = Scheduler.ParseWhen("remind me to call mom at 5 pm", now, tz)
+    assert datetime.fromtimestamp(due_at, tz).strftime("%Y-%m-%d %H:%M") == "2026-10-19 17:00"
+    assert text == "call mom"
+    due_at, _ = Scheduler.ParseWhen("set alarm at 7 am", now, ZoneInfo("America/New_York"))
+    assert datetime.fromtimestamp(due_at, ZoneInfo("America/New_York")).hour == 7
+
+@pytest.mark.parametrize("query, expected", [
+    ("set a reminder to call mom in 10 minutes", ("2026-10-19 15:10", "call mom")),
+    ("remind me to drink water at 5:30 pm", ("2026-10-19 17:30", "drink water")),
+    ("set alarm tomorrow at 6:30", ("2026-10-20 06:30", "")),
+    ("set alarm at 7 am", ("2026-10-20 07:00", "")),
+])
+def test_parse_when(query, expected):
+    tz = ZoneInfo("UTC")
+    now = datetime(2026, 10, 19, 15, 0, tzinfo=tz).timestamp()
+    due_at, text = Scheduler.ParseWhen(query, now, tz)
+    assert (datetime.fromtimestamp(due_at, tz).strftime("%Y-%m-%d %H:%M"), text) == expected
+
+def test_parse_when_without_a_time():
+    assert Scheduler.ParseWhen("set a reminder") is None
+    assert Scheduler.ParseWhen("at 25 pm") is None
+
+def _scheduler_threads():
+    return [thread for thread in threading.enumerate() if thread.name == "scheduler" and thread.is_alive()]
+
+def test_disabled_scheduler_stores_jobs_without_firing(monkeypatch, tmp_path):
+    import app
+    before = _scheduler_threads()
+    monkeypatch.setattr(Scheduler, "SchedulerEnabled", False)
+    monkeypatch.setattr(Scheduler, "_default", Scheduler.Scheduler(str(tmp_path / "jobs.sqlite3")))
+    assert Scheduler.StartScheduler() is None
+
+    client = app.app.test_client()
+    created = client.post("/reminders/phone", json={"text": "stretch", "due_at": 0})
+    assert created.status_code == 201
+    assert [job["text"] for job in client.get("/reminders/phone").get_json()["jobs"]] == ["stretch"]
+    assert _scheduler_threads() == before == []
+
+def test_enabled_scheduler_starts_its_thread(monkeypatch, tmp_path):
+    scheduler = Scheduler.Scheduler(str(tmp_path / "jobs.sqlite3"), dispatch=lambda *args: None)
+    monkeypatch.setattr(Scheduler, "SchedulerEnabled", True)
+    monkeypatch.setattr(Scheduler, "_default", scheduler)
+    try:
+        assert Scheduler.StartScheduler() is scheduler
+        assert _scheduler_threads()
+    finally:
+        scheduler.stop()
+        scheduler._thread.join(timeout=5)
+
+@pytest.mark.parametrize("decision, text", [
+    ("set reminder at 5 pm to call mom", "call mom"),  # the step's own text wins
+    ("device_reminder", "call mom and open whatsapp"),  # no time in the step: read the utterance
+])
+def test_timer_steps_read_their_own_decision(monkeypatch, tmp_path, decision, text):
+    import asyncio
+    import test_model
+    scheduler = Scheduler.Scheduler(str(tmp_path / "jobs.sqlite3"))
+    monkeypatch.setattr(Scheduler, "_default", scheduler)
+    monkeypatch.setattr(test_model.MemoryHandler, "add_task", lambda *args, **kwargs: None)
+    utterance = "remind me at 5 pm to call mom and open whatsapp"
+    answers, android, _ = asyncio.run(test_model.execute_decision(decision, None, "phone", utterance))
+    assert [job["text"] for job in scheduler.jobs("phone")] == [text]
+    assert answers[0].startswith("Reminder set for 5:00 PM") and android == []
@@ -0,0 +1,107 @@
+# ======================== test_single_flight.py ========================
+# SingleFlight: concurrent identical calls share one upstream call, results and errors.
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from Backend.SingleFlight import NormalizeKey, SingleFlight
+
+def test_normalized_keys():
+    assert NormalizeKey("  What IS   the time?? ") == "what is the time"
+    assert NormalizeKey("Hello.") == NormalizeKey("hello")
+
+def _run_threads(target, count):
+    threads = [threading.Thread(target=target) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+
+def test_concurrent_threads_share_one_call():
+    flight = SingleFlight("test")
+    calls = []
+    release = threading.Event()
+    results = []
+
+    def upstream(query):
+        calls.append(query)
+        release.wait(timeout=5)
+        return f"answer {len(calls)}"
+
+    def caller():
+        results.append(flight.do("What is AI?", upstream, "what is ai"))
+
+    threading.Timer(0.1, release.set).start()
+    _run_threads(caller, 5)
+    assert len(calls) == 1
+    assert results == ["answer 1"] * 5
+
+    # Once finished the key is free again
+    assert flight.do("what is ai", upstream, "again") == "answer 2"
+
+def test_followers_get_the_leaders_exception():
+    flight = SingleFlight("test")
+    release = threading.Event()
+    errors = []
+
+    def upstream():
+        release.wait(timeout=5)
+        raise ValueError("upstream down")
+
+    def caller():
+        try:
+            flight.do("key", upstream)
+        except ValueError as e:
+            errors.append(e)
+
+    threading.Timer(0.1, release.set).start()
+    _run_threads(caller, 3)
+    assert len(errors) == 3 and len({id(e) for e in errors}) == 1
+
+def test_async_calls_coalesce_across_event_loops():
+    flight = SingleFlight("test")
+    calls = []
+
+    @flight.wrap
+    async def search(query):
+        calls.append(query)
+        await asyncio.sleep(0.1)
+        return query.upper()
+
+    results = []
+    _run_threads(lambda: results.append(asyncio.run(search("Weather today?"))), 4)
+    assert results == ["WEATHER TODAY?"] * 4
+    assert len(calls) == 1
+
+def test_extra_arguments_are_part_of_the_key():
+    flight = SingleFlight("test")
+    calls = []
+
+    @flight.wrap
+    def answer(query, owner=None):
+        calls.append(owner)
+        time.sleep(0.05)
+        return owner
+
+    results = []
+    threads = [threading.Thread(target=lambda o=o: results.append(answer("Hi", owner=o))) for o in ("a", "b", "a")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    assert sorted(results) == ["a", "a", "b"]
+    assert sorted(calls) == ["a", "b"]
+
+def test_followers_stop_waiting_after_the_timeout():
+    flight = SingleFlight("test", timeout=0.05)
+    release = threading.Event()
+    leader = threading.Thread(target=flight.do, args=("slow", release.wait, 5))
+    leader.start()
+    time.sleep(0.02)
+    with pytest.raises(TimeoutError):
+        flight.do("slow", lambda: "never")
+    release.set()
+    leader.join(timeout=5)
@@ -0,0 +1,107 @@
+# ======================== test_speech_capture.py ========================
+# VAD-gated capture service replayed from WAV fixtures (no microphone needed).
+
+import math
+import struct
+import time
+import wave
+
+import pytest
+import speech_recognition as sr
+
+from Backend import SpeechToText
+
+RATE = 16000
+
+def tone(seconds, amplitude=8000):
+    return b"".join(struct.pack("<h", int(amplitude * math.sin(2 * math.pi * 440 * i / RATE)))
+                    for i in range(int(seconds * RATE)))
+
+def silence(seconds):
+    return b"\x00\x00" * int(seconds * RATE)
+
+@pytest.fixture
+def two_utterances(tmp_path):
+    path = tmp_path / "two_utterances.wav"
+    with wave.open(str(path), "wb") as writer:
+        writer.setnchannels(1)
+        writer.setsampwidth(2)
+        writer.setframerate(RATE)
+        writer.writeframes(silence(0.5) + tone(0.8) + silence(1.2) + tone(0.8) + silence(1.2))
+    return str(path)
+
+class Backend:
+    def __init__(self, *replies):
+        self.replies = list(replies)
+        self.calls = 0
+
+    def __call__(self, recognizer, audio):
+        self.calls += 1
+        reply = self.replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+def service(source, backend):
+    return SpeechToText.SpeechCaptureService(source=source, backend=backend, energy_threshold=300, calibration=0)
+
+def test_wav_fixture_yields_one_query_per_utterance(two_utterances):
+    capture = service(sr.AudioFile(two_utterances), Backend("first thing", "second thing")).start()
+    assert capture.listen(timeout=5) == "First thing."
+    assert capture.listen(timeout=5) == "Second thing."
+    assert capture.listen(timeout=5) is None  # source exhausted
+    capture.stop()
+
+def test_recognizer_errors_do_not_kill_the_worker(two_utterances):
+    backend = Backend(RuntimeError("backend crashed"), "still alive")
+    capture = service(sr.AudioFile(two_utterances), backend).start()
+    assert capture.listen(timeout=5) == "Still alive."
+    assert backend.calls == 2
+    capture.stop()
+
+def test_speech_while_paused_is_never_returned(two_utterances):
+    backend = Backend("should not be heard", "nor this")
+    capture = service(sr.AudioFile(two_utterances), backend)
+    capture.pause()
+    capture.start()
+    assert capture.listen(timeout=5) is None
+    assert backend.calls == 0
+    capture.stop()
+
+def test_resume_discards_queries_heard_before_it(two_utterances):
+    capture = service(sr.AudioFile(two_utterances), Backend("stale one", "stale two")).start()
+    for thread in capture._threads:
+        thread.join(timeout=5)
+    capture.resume()
+    assert capture.listen(timeout=1) is None
+    capture.stop()
+
+class EndlessSilence:
+    SAMPLE_RATE, SAMPLE_WIDTH, CHUNK = RATE, 2, 1600
+
+    def __init__(self):
+        self.stream = self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def read(self, size):
+        time.sleep(size / RATE)
+        return b"\x00\x00" * size
+
+def test_listen_times_out():
+    capture = service(EndlessSilence(), Backend()).start()
+    started = time.monotonic()
+    assert capture.listen(timeout=0.3) is None
+    assert time.monotonic() - started < 2
+    capture.stop()
+
+def test_speech_recognition_pauses_between_calls(monkeypatch):
+    capture = service(EndlessSilence(), Backend())
+    monkeypatch.setattr(SpeechToText, "_capture_service", capture.start())
+    assert SpeechToText.SpeechRecognition(timeout=0.2) is None
+    assert not capture._active.is_set()
+    capture.stop()
@@ -0,0 +1,75 @@
+# ======================== test_speech_to_text.py ========================
+# Server-side audio ingestion (/ask_audio) and the streaming decoders behind it.
+
+import math
+import os
+import stat
+import struct
+import sys
+
+import pytest
+
+from Backend import SpeechToText
+
+RATE = 16000
+
+def tone(seconds, amplitude=8000, rate=RATE):
+    return b"".join(struct.pack("<h", int(amplitude * math.sin(2 * math.pi * 440 * i / rate)))
+                    for i in range(int(seconds * rate)))
+
+def silence(seconds, rate=RATE):
+    return b"\x00\x00" * int(seconds * rate)
+
+@pytest.fixture
+def fake_ffmpeg(tmp_path, monkeypatch):
+    """Stand-in ffmpeg that copies stdin to stdout, so the 'Opus' body is treated as PCM"""
+    script = tmp_path / "ffmpeg"
+    script.write_text(f"#!{sys.executable}\nimport shutil, sys\nshutil.copyfileobj(sys.stdin.buffer, sys.stdout.buffer)\n")
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setattr(SpeechToText.shutil, "which", lambda name: str(script))
+    return script
+
+@pytest.fixture
+def heard(monkeypatch):
+    calls = []
+
+    def backend(recognizer, audio):
+        calls.append(len(audio.frame_data))
+        return "play music"
+    monkeypatch.setitem(SpeechToText.RecognizerBackends, SpeechToText.RecognizerBackend, backend)
+    return calls
+
+def test_ffmpeg_decode_streams_all_chunks(fake_ffmpeg):
+    body = tone(0.5) + silence(1.0)
+    pcm = b"".join(SpeechToText._ffmpeg_decode(iter([body[:5000], body[5000:]]), RATE))
+    assert pcm == body
+
+def test_ffmpeg_decode_reraises_feeder_errors(fake_ffmpeg):
+    def broken_upload():
+        yield tone(0.1)
+        raise RuntimeError("client went away")
+
+    with pytest.raises(RuntimeError, match="client went away"):
+        b"".join(SpeechToText._ffmpeg_decode(broken_upload(), RATE))
+
+def test_ask_audio_accepts_ogg_opus(fake_ffmpeg, heard, monkeypatch):
+    import app
+    monkeypatch.setattr(app, "answer_query", lambda query, device_id: ({"response": query, "tts_text": query}, 200))
+    body = tone(0.6) + silence(1.0)
+    response = app.app.test_client().post("/ask_audio", data=body, content_type="audio/ogg; codecs=opus")
+    assert response.status_code == 200, response.get_data(as_text=True)
+    assert response.get_json()["transcript"] == "Play music."
+    assert heard
+
+def test_ask_audio_rejects_unknown_type():
+    import app
+    response = app.app.test_client().post("/ask_audio", data=b"abc", content_type="audio/flac")
+    assert response.status_code == 415
+
+@pytest.mark.parametrize("body", [b"RIFF\x10\x00\x00\x00WAVE", b"not a wav file at all", b""])
+def test_ask_audio_rejects_malformed_wav(heard, body):
+    import app
+    response = app.app.test_client().post("/ask_audio", data=body, content_type="audio/wav")
+    assert response.status_code == 415
+    assert response.get_json()["error"] == "Malformed WAV upload"
+    assert heard == []
@@ -0,0 +1,54 @@
+# ======================== test_text_to_speech.py ========================
+# TTS phrase cache: pinned fixed phrases, LRU for everything else, split long answers.
+
+import os
+import threading
+
+import pytest
+
+pytest.importorskip("edge_tts")
+pytest.importorskip("playsound")
+
+from Backend import TextToSpeech as tts
+
+LONG_ANSWER = "First sentence here. Second one follows. " + "More detail that goes on and on. " * 10
+
+class FakeCommunicate:
+    rendered = []
+
+    def __init__(self, text, **kwargs):
+        self.text = text
+
+    async def save(self, path):
+        FakeCommunicate.rendered.append(self.text)
+        with open(path, "wb") as f:
+            f.write(b"mp3" * 100)
+
+@pytest.fixture
+def speech(tmp_path, monkeypatch):
+    monkeypatch.setattr(tts, "PhraseCacheDir", str(tmp_path))
+    monkeypatch.setattr(tts, "PinnedCacheDir", str(tmp_path / "pinned"))
+    monkeypatch.setattr(tts.edge_tts, "Communicate", FakeCommunicate)
+    played = []
+    monkeypatch.setattr(tts, "playsound", played.append)
+    FakeCommunicate.rendered = []
+    return played
+
+def test_import_does_not_start_prewarm():
+    assert not any(thread.name == "tts-prewarm" for thread in threading.enumerate())
+
+def test_long_answer_plays_prefix_and_cached_suffix_separately(speech, monkeypatch):
+    monkeypatch.setattr(tts.random, "choice", lambda options: options[0])
+    tts.TextToSpeech(LONG_ANSWER)
+    tts.TextToSpeech(LONG_ANSWER)
+    assert len(speech) == 4
+    assert os.path.dirname(speech[1]) == tts.PinnedCacheDir
+    assert FakeCommunicate.rendered == ["First sentence here  Second one follows.", tts.ChatScreenMessages[0]]
+
+def test_eviction_never_drops_pinned_phrases(speech, monkeypatch):
+    monkeypatch.setattr(tts, "PhraseCacheMaxFiles", 2)
+    tts.TTS(tts.ChatScreenMessages[0])
+    for i in range(5):
+        tts.TTS(f"one-off answer number {i}")
+    assert os.path.exists(tts.PhraseCachePath(tts.ChatScreenMessages[0]))
+    assert len([name for name in os.listdir(tts.PhraseCacheDir) if name.endswith(".mp3")]) == 2
@@ -0,0 +1,69 @@
+# ======================== test_wire_format.py ========================
+# Command wire formats: parsing legacy strings, compressed code fields and format negotiation.
+
+import base64
+import json
+import zlib
+
+import pytest
+
+from Backend import WireFormat
+
+CODE = "\n".join(f"print({i})" for i in range(300))
+
+@pytest.mark.parametrize("command, expected", [
+    ("open::whatsapp", {"op": "open", "app": "whatsapp"}),
+    ("play::video_id::abc123", {"op": "play", "video_id": "abc123"}),
+    ("play::ham mere safar", {"op": "play", "query": "ham mere safar"}),
+    ("google_search::a::b", {"op": "google_search", "query": "a::b"}),
+    ("code::reverse a string::artifact::f00d", {"op": "code", "description": "reverse a string", "artifact_id": "f00d"}),
+    ("code::hello::print('a::b')", {"op": "code", "description": "hello", "code": "print('a::b')"}),
+    ("brightness::80", {"op": "brightness", "arg": "80"}),
+    ("screenshot", {"op": "screenshot"}),
+])
+def test_parse_command(command, expected):
+    assert WireFormat.ParseCommand(command) == expected
+
+def test_large_code_is_compressed_for_each_format():
+    as_json = WireFormat.EncodeCommands([f"code::numbers::{CODE}"], WireFormat.JSON)[0]
+    assert "code" not in as_json
+    assert zlib.decompress(base64.b64decode(as_json["code_z"])).decode() == CODE
+
+    as_msgpack = WireFormat.EncodeCommands([f"code::numbers::{CODE}"], WireFormat.MSGPACK)[0]
+    assert zlib.decompress(as_msgpack["code_z"]).decode() == CODE
+
+    small = WireFormat.EncodeCommands(["code::tiny::print(1)"], WireFormat.JSON)[0]
+    assert small["code"] == "print(1)"
+
+@pytest.mark.parametrize("headers, expected", [
+    ({}, WireFormat.LEGACY),
+    ({"Accept": "application/json"}, WireFormat.LEGACY),
+    ({"X-Command-Format": "JSON"}, WireFormat.JSON),
+    ({"Accept": WireFormat.JSON_MIMETYPE}, WireFormat.JSON),
+    ({"Accept": f"{WireFormat.MSGPACK_MIMETYPE}, */*"}, WireFormat.MSGPACK),
+])
+def test_negotiate(headers, expected):
+    assert WireFormat.Negotiate(headers) == expected
+
+def test_msgpack_falls_back_to_json_when_unavailable(monkeypatch):
+    monkeypatch.setattr(WireFormat, "msgpack", None)
+    assert WireFormat.Negotiate({"X-Command-Format": "msgpack"}) == WireFormat.JSON
+
+def test_shape_and_serialize():
+    answer = {"tts_text": "Opening", "device_command": "open::maps", "commands": ["open::maps"]}
+    legacy = WireFormat.Shape(answer, WireFormat.LEGACY)
+    assert legacy == {"tts_text": "Opening", "device_command": "open::maps"}
+    assert WireFormat.Serialize(legacy, WireFormat.LEGACY)[1] == "application/json"
+
+    structured = WireFormat.Shape(answer, WireFormat.JSON)
+    assert structured == {"tts_text": "Opening", "commands": [{"op": "open", "app": "maps"}]}
+    body, mimetype = WireFormat.Serialize(structured, WireFormat.JSON)
+    assert mimetype == WireFormat.JSON_MIMETYPE and json.loads(body) == structured
+    assert answer["commands"] == ["open::maps"]  # the caller's dict is not modified
+
+def test_msgpack_round_trip():
+    msgpack = pytest.importorskip("msgpack")
+    data = WireFormat.Shape({"tts_text": "x", "commands": [f"code::numbers::{CODE}"]}, WireFormat.MSGPACK)
+    body, mimetype = WireFormat.Serialize(data, WireFormat.MSGPACK)
+    assert mimetype == WireFormat.MSGPACK_MIMETYPE
+    assert msgpack.unpackb(body, raw=False) == data
@@ -0,0 +1,49 @@
+# ======================== test_youtube_cache.py ========================
+# Song -> video cache matching and the daily quota budget.
+
+import pytest
+
+from Backend import YouTubeCache
+
+@pytest.fixture(autouse=True)
+def fresh_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(YouTubeCache, "YouTubeCachePath", str(tmp_path / "youtube.sqlite3"))
+    monkeypatch.setattr(YouTubeCache, "_conn", None)
+    monkeypatch.setattr(YouTubeCache, "_index", None)
+
+def test_normalized_requests_hit_the_same_entry():
+    YouTubeCache.Store("Shape of You", "vid1", "Ed Sheeran - Shape of You")
+    assert YouTubeCache.Lookup("play the shape of you song") == ("vid1", "Ed Sheeran - Shape of You")
+    assert YouTubeCache.Lookup("Shape Of You (Official Video)") == ("vid1", "Ed Sheeran - Shape of You")
+
+@pytest.mark.parametrize("stored, requested", [
+    ("believer", "believe"),
+    ("faded", "fade"),
+    ("perfect", "perfect 2"),
+    ("perfect 2", "perfect 3"),
+])
+def test_near_miss_titles_do_not_match(stored, requested):
+    YouTubeCache.Store(stored, "stored-id", stored)
+    assert YouTubeCache.Lookup(requested) is None
+
+def test_typo_in_a_long_title_still_matches():
+    YouTubeCache.Store("bohemian rhapsody", "queen", "Bohemian Rhapsody")
+    assert YouTubeCache.Lookup("bohemian rhapsodyy") == ("queen", "Bohemian Rhapsody")
+
+def test_index_is_rebuilt_from_disk():
+    YouTubeCache.Store("bohemian rhapsody", "queen", "Bohemian Rhapsody")
+    YouTubeCache._index = None
+    assert YouTubeCache.Lookup("bohemian rapsody") == ("queen", "Bohemian Rhapsody")
+
+def test_stale_entries_need_allow_stale(monkeypatch):
+    YouTubeCache.Store("believer", "id", "Believer")
+    monkeypatch.setattr(YouTubeCache, "YouTubeCacheTTL", -1)
+    assert YouTubeCache.Lookup("believer") is None
+    assert YouTubeCache.Lookup("believer", allow_stale=True) == ("id", "Believer")
+
+def test_quota_stops_before_the_reserve(monkeypatch):
+    monkeypatch.setattr(YouTubeCache, "YouTubeDailyQuota", 350)
+    monkeypatch.setattr(YouTubeCache, "YouTubeQuotaReserve", 50)
+    assert YouTubeCache.ChargeQuota() and YouTubeCache.ChargeQuota() and YouTubeCache.ChargeQuota()
+    assert not YouTubeCache.ChargeQuota()
+    assert YouTubeCache.QuotaUsed() == 300